@@ -0,0 +1,108 @@
+"""
+API sunucusu için yük testi
+
+Çalışan bir api_server.py'ye çok sayıda el terminali benzetir: her istemci
+WebSocket'e bağlanır ve rastgele masalara ürün ekler. Sonunda masalardaki
+adetlerin gönderilen eklemelerle birebir tuttuğu (kayıp güncelleme olmadığı)
+doğrulanır. Sunucu boş masalarla, ayrı bir veritabanında çalıştırılmalıdır.
+Sunucuda RESTORAN_API_TOKEN tanımlıysa aynı değer buradan da gönderilir.
+
+Kullanım:
+    RESTORAN_DB=restoran_load python api_server.py --port 8080
+    python api_load_test.py --url http://localhost:8080 --clients 300 --requests 20
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import time
+import uuid
+from collections import Counter
+import aiohttp
+from api_server import API_TOKEN_HEADER
+
+
+async def handheld(session, url, tables, products, requests, latencies, added, errors, ws_messages):
+    """Tek bir el terminali: WebSocket'i dinlerken ürün ekler"""
+    async def listen(ws):
+        async for msg in ws:
+            if msg.type == aiohttp.WSMsgType.TEXT:
+                ws_messages[0] += 1
+    
+    async with session.ws_connect(f"{url}/ws") as ws:
+        listener = asyncio.create_task(listen(ws))
+        for _ in range(requests):
+            table_number = random.choice(tables)
+            product = random.choice(products)
+            started = time.perf_counter()
+            async with session.post(
+                f"{url}/api/tables/{table_number}/items",
+                json={"product_id": product["_id"], "quantity": 1}
+            ) as response:
+                await response.read()
+                latencies.append(time.perf_counter() - started)
+                if response.status == 200:
+                    added[table_number] += 1
+                else:
+                    errors.append(response.status)
+        listener.cancel()
+
+
+async def run(args):
+    connector = aiohttp.TCPConnector(limit=args.clients)
+    token = os.environ.get("RESTORAN_API_TOKEN")
+    headers = {API_TOKEN_HEADER: token} if token else None
+    async with aiohttp.ClientSession(connector=connector, headers=headers) as session:
+        async with session.get(f"{args.url}/api/tables") as response:
+            tables = [t["table_number"] for t in await response.json() if t["status"] == "Boş"]
+        async with session.get(f"{args.url}/api/products") as response:
+            products = await response.json()
+        if not tables or not products:
+            raise SystemExit("HATA: boş masa veya ürün bulunamadı")
+        
+        latencies = []
+        added = Counter()
+        errors = []
+        ws_messages = [0]
+        started = time.perf_counter()
+        await asyncio.gather(*(
+            handheld(session, args.url, tables, products, args.requests,
+                     latencies, added, errors, ws_messages)
+            for _ in range(args.clients)
+        ))
+        duration = time.perf_counter() - started
+        
+        # Kayıp güncelleme kontrolü ve masaların kapatılması
+        lost = 0
+        for table_number, count in added.items():
+            async with session.get(f"{args.url}/api/tables/{table_number}") as response:
+                table = await response.json()
+            lost += count - sum(item["quantity"] for item in table["items"])
+            await session.post(
+                f"{args.url}/api/tables/{table_number}/close",
+                json={"checkout_id": uuid.uuid4().hex}
+            )
+    
+    latencies.sort()
+    print(f"İstek            : {len(latencies)} ({len(errors)} hata)")
+    print(f"Süre             : {duration:.2f} sn ({len(latencies) / duration:.0f} istek/sn)")
+    print(f"Gecikme p50/p99  : {statistics.median(latencies) * 1000:.2f} / "
+          f"{latencies[int(len(latencies) * 0.99) - 1] * 1000:.2f} ms")
+    print(f"WebSocket mesajı : {ws_messages[0]}")
+    print(f"Kayıp ekleme     : {lost}")
+    if lost:
+        raise SystemExit("HATA: kayıp güncelleme tespit edildi")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="API sunucusu yük testi")
+    parser.add_argument("--url", default="http://localhost:8080")
+    parser.add_argument("--clients", type=int, default=200)
+    parser.add_argument("--requests", type=int, default=20)
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
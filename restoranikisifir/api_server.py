@@ -0,0 +1,470 @@
+"""
+El terminalleri için yerel REST/WebSocket API sunucusu
+
+Masaüstü uygulamasıyla aynı veritabanını kullanır; garsonlar yerel ağdaki
+cihazlardan eşzamanlı sipariş alabilir:
+    RESTORAN_API_TOKEN=... python api_server.py --host 0.0.0.0 --port 8080
+
+Varsayılan olarak sadece bu bilgisayardan (127.0.0.1) erişilir. Başka bir
+arayüze bağlanmak için RESTORAN_API_TOKEN tanımlanmalıdır; her istek bu
+değeri X-Restoran-Token başlığında göndermelidir.
+
+Uç noktalar:
+    GET  /api/tables?zone=...          Masa durumları (toplamlarla)
+    GET  /api/tables/{n}               Masanın adisyonu
+    GET  /api/products?q=...           Menü (stok adetleriyle); q verilirse ürün adı araması
+    GET  /api/stock/alerts?since=...   Stok uyarıları (ISO tarihten sonrakiler)
+    GET  /api/occupancy                Anlık dolu masa ve koltuk sayıları
+    POST /api/tables/{n}/items         {"product_id": str, "quantity": int}
+    PUT  /api/tables/{n}/order         {"items": [{"product_id": str, "quantity": int}]}
+    POST /api/tables/{n}/payments      {"payment_id": str, "split": str, "method": str,
+                                        "items": {satır: adet}, "seat": int, "parts": int}
+    POST /api/tables/{n}/close         {"checkout_id": str}
+    GET  /ws                           Masa durumu değişiklikleri (WebSocket)
+"""
+import argparse
+import asyncio
+import hmac
+import ipaddress
+import json
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from functools import partial
+from typing import Dict, List, Optional
+from aiohttp import web, WSMsgType
+from bson import ObjectId
+from bson.errors import InvalidId
+from pymongo.errors import PyMongoError
+from database import Database, PAYMENT_METHODS
+
+logger = logging.getLogger(__name__)
+
+# Masaüstü uygulamasından gelen değişiklikleri yakalamak için yoklama aralığı (sn)
+STATUS_POLL_SECONDS = 2.0
+# RESTORAN_API_TOKEN değerinin gönderildiği istek başlığı
+API_TOKEN_HEADER = "X-Restoran-Token"
+
+
+def json_default(value):
+    """ObjectId ve tarihleri JSON'a çevir"""
+    if isinstance(value, ObjectId):
+        return str(value)
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"JSON'a çevrilemeyen tür: {type(value).__name__}")
+
+
+json_dumps = partial(json.dumps, default=json_default, ensure_ascii=False)
+
+
+def json_response(data, status: int = 200) -> web.Response:
+    return web.json_response(data, status=status, dumps=json_dumps)
+
+
+class DatabaseBridge:
+    """
+    Senkron Database çağrılarını iş parçacığı havuzunda çalıştır
+    
+    pymongo bağlantı havuzu iş parçacıkları arasında paylaşılır; havuzdaki
+    iş parçacığı sayısı bağlantı sayısını aşmayacak şekilde seçilir.
+    """
+    
+    def __init__(self, db: Database, workers: int):
+        self.db = db
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="db")
+    
+    async def call(self, method: str, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        func = partial(getattr(self.db, method), *args, **kwargs)
+        return await loop.run_in_executor(self.executor, func)
+    
+    def shutdown(self):
+        self.executor.shutdown(wait=True)
+
+
+class StatusBroadcaster:
+    """Masa durumlarını izler ve değişenleri bağlı WebSocket istemcilerine gönderir"""
+    
+    def __init__(self, bridge: DatabaseBridge):
+        self.bridge = bridge
+        self.clients = set()
+        # table_number -> durum kaydı (son gönderilen hali)
+        self.statuses: Dict[int, Dict] = {}
+        self._wake = asyncio.Event()
+    
+    def request_refresh(self):
+        """Yazma isteklerinden sonra çağrılır; art arda gelen istekler tek okumada birleşir"""
+        self._wake.set()
+    
+    async def refresh(self):
+        """Durumları yeniden oku, sadece değişen masaları yayınla"""
+        current = await self.bridge.call("get_table_statuses", None, True)
+        current = {row["table_number"]: row for row in current}
+        
+        changed = [
+            row for number, row in current.items()
+            if self.statuses.get(number) != row
+        ]
+        removed = [number for number in self.statuses if number not in current]
+        self.statuses = current
+        
+        if changed or removed:
+            await self.broadcast({"type": "tables", "tables": changed, "removed": removed})
+    
+    async def broadcast(self, message: Dict):
+        """Mesajı tüm istemcilere gönder, kopan bağlantıları düşür"""
+        if not self.clients:
+            return
+        payload = json_dumps(message)
+        clients = list(self.clients)
+        results = await asyncio.gather(
+            *(ws.send_str(payload) for ws in clients),
+            return_exceptions=True
+        )
+        for ws, result in zip(clients, results):
+            if isinstance(result, Exception):
+                self.clients.discard(ws)
+    
+    async def poll(self):
+        """
+        Durumları tek bir döngüde yenile
+        
+        Yazma isteği gelince hemen, yoksa masaüstü uygulamasının yaptığı
+        değişiklikleri yakalamak için düzenli aralıklarla çalışır.
+        """
+        while True:
+            self._wake.clear()
+            try:
+                await self.refresh()
+            except PyMongoError as e:
+                logger.error(f"Masa durumları alınamadı: {e}")
+            try:
+                await asyncio.wait_for(self._wake.wait(), STATUS_POLL_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+
+
+def parse_object_id(value) -> ObjectId:
+    try:
+        return ObjectId(value)
+    except (InvalidId, TypeError):
+        raise web.HTTPBadRequest(text="Geçersiz ürün kimliği")
+
+
+def parse_quantity(value) -> int:
+    if not isinstance(value, int) or isinstance(value, bool) or value < 1:
+        raise web.HTTPBadRequest(text="Adet pozitif bir tam sayı olmalı")
+    return value
+
+
+async def read_json(request: web.Request) -> Dict:
+    try:
+        body = await request.json()
+    except ValueError:
+        raise web.HTTPBadRequest(text="Geçersiz JSON")
+    if not isinstance(body, dict):
+        raise web.HTTPBadRequest(text="İstek gövdesi bir nesne olmalı")
+    return body
+
+
+def table_number_of(request: web.Request) -> int:
+    try:
+        return int(request.match_info["table_number"])
+    except ValueError:
+        raise web.HTTPBadRequest(text="Geçersiz masa numarası")
+
+
+def serialize_table(table: Dict) -> Dict:
+    """Adisyonu istemciye gönderilecek biçime getir (tutarlar kuruş)"""
+    items = table.get("current_order", [])
+    total = sum(item["total"] for item in items)
+    return {
+        "table_number": table["table_number"],
+        "status": table.get("status", "Boş"),
+        "zone": table.get("zone"),
+        "opened_at": table.get("opened_at"),
+        "closing": "checkout_id" in table,
+        "items": [
+            {
+                "key": Database.line_key(item),
+                "product_id": item["product"].get("_id"),
+                "name": item["product"].get("name", ""),
+                "seat": item.get("seat"),
+                "price": item["product"].get("price", 0),
+                "unit_price": item.get("unit_price", item["product"].get("price", 0)),
+                "quantity": item["quantity"],
+                "total": item["total"],
+                "paid_quantity": table.get("paid_items", {}).get(Database.line_key(item), 0)
+            }
+            for item in items
+        ],
+        "total": total,
+        "paid": table.get("paid_total", 0),
+        "balance": total - table.get("paid_total", 0)
+    }
+
+
+@web.middleware
+async def token_middleware(request: web.Request, handler):
+    """Token tanımlıysa X-Restoran-Token başlığı eşleşmeyen istekleri 401 ile reddet"""
+    token = request.app["token"]
+    if token and not hmac.compare_digest(request.headers.get(API_TOKEN_HEADER, ""), token):
+        return json_response({"error": "Yetkisiz istek"}, status=401)
+    return await handler(request)
+
+
+@web.middleware
+async def error_middleware(request: web.Request, handler):
+    """İş kuralı hatalarını 409, veritabanı hatalarını 503 olarak döndür"""
+    try:
+        return await handler(request)
+    except ValueError as e:
+        return json_response({"error": str(e)}, status=409)
+    except PyMongoError as e:
+        logger.error(f"API isteği başarısız ({request.path}): {e}")
+        return json_response({"error": "Veritabanı hatası"}, status=503)
+
+
+async def list_tables(request: web.Request):
+    bridge: DatabaseBridge = request.app["bridge"]
+    zone = request.query.get("zone")
+    return json_response(await bridge.call("get_table_statuses", zone, True))
+
+
+async def get_table(request: web.Request):
+    bridge: DatabaseBridge = request.app["bridge"]
+    table = await bridge.call("get_table", table_number_of(request))
+    if not table:
+        raise web.HTTPNotFound(text="Masa bulunamadı")
+    return json_response(serialize_table(table))
+
+
+async def list_products(request: web.Request):
+    bridge: DatabaseBridge = request.app["bridge"]
+    query = request.query.get("q", "").strip()
+    # El terminalindeki arama kutusu: search_keys indeksi üzerinden kelime öneki araması
+    if query:
+        products = await bridge.call("search_products", query)
+    else:
+        products = await bridge.call("get_all_products")
+    return json_response([
+        {
+            "_id": product["_id"],
+            "name": product["name"],
+            "price": product["price"],
+            "category": product.get("category", "Diğer"),
+            "stock": product.get("stock")
+        }
+        for product in products
+    ])
+
+
+async def list_stock_alerts(request: web.Request):
+    bridge: DatabaseBridge = request.app["bridge"]
+    since = request.query.get("since")
+    if since:
+        try:
+            since = datetime.fromisoformat(since)
+        except ValueError:
+            raise web.HTTPBadRequest(text="Geçersiz tarih")
+    return json_response(await bridge.call("get_stock_alerts", since or None))
+
+
+async def get_occupancy(request: web.Request):
+    bridge: DatabaseBridge = request.app["bridge"]
+    return json_response(await bridge.call("get_occupancy"))
+
+
+async def load_product(bridge: DatabaseBridge, product_id) -> Dict:
+    product = await bridge.call("get_product", parse_object_id(product_id))
+    if not product:
+        raise web.HTTPNotFound(text="Ürün bulunamadı")
+    # Arama anahtarları ve stok adetleri adisyona kopyalanmaz
+    for field in ("search_keys", "stock", "low_stock"):
+        product.pop(field, None)
+    return product
+
+
+async def add_item(request: web.Request):
+    bridge: DatabaseBridge = request.app["bridge"]
+    table_number = table_number_of(request)
+    body = await read_json(request)
+    
+    product = await load_product(bridge, body.get("product_id"))
+    quantity = parse_quantity(body.get("quantity", 1))
+    await bridge.call("add_item_to_table", table_number, product, quantity)
+    
+    request.app["broadcaster"].request_refresh()
+    return await get_table(request)
+
+
+async def save_order(request: web.Request):
+    bridge: DatabaseBridge = request.app["bridge"]
+    table_number = table_number_of(request)
+    body = await read_json(request)
+    
+    lines = body.get("items")
+    if not isinstance(lines, list):
+        raise web.HTTPBadRequest(text="items bir liste olmalı")
+    
+    # Fiyatlar istemciden değil menüden ve fiyat kurallarından alınır
+    order_items: List[Dict] = []
+    for line in lines:
+        if not isinstance(line, dict):
+            raise web.HTTPBadRequest(text="Geçersiz sipariş kalemi")
+        product = await load_product(bridge, line.get("product_id"))
+        quantity = parse_quantity(line.get("quantity", 1))
+        order_items.append({"product": product, "quantity": quantity})
+    
+    table = await bridge.call("get_table", table_number)
+    if not table:
+        raise web.HTTPNotFound(text="Masa bulunamadı")
+    # Masada zaten olan satırlar açıldıkları fiyatı korur
+    order_items = await bridge.call("price_order_items", table, order_items)
+    await bridge.call("save_order_to_table", table_number, order_items)
+    
+    request.app["broadcaster"].request_refresh()
+    return await get_table(request)
+
+
+async def close_table(request: web.Request):
+    bridge: DatabaseBridge = request.app["bridge"]
+    table_number = table_number_of(request)
+    body = await read_json(request)
+    
+    # Aynı checkout_id ile tekrar denemek güvenlidir (ağ kopmalarında)
+    checkout_id: Optional[str] = body.get("checkout_id")
+    if not isinstance(checkout_id, str) or not checkout_id:
+        raise web.HTTPBadRequest(text="checkout_id gerekli")
+    
+    # Toplam, sahiplenilen adisyondan sunucuda hesaplanır
+    if not await bridge.call("close_order", table_number, None, checkout_id):
+        return json_response({"error": "Masa açık değil veya başka bir cihazda kapatılıyor"}, status=409)
+    
+    request.app["broadcaster"].request_refresh()
+    return json_response({"table_number": table_number, "closed": True})
+
+
+async def add_payment(request: web.Request):
+    bridge: DatabaseBridge = request.app["bridge"]
+    table_number = table_number_of(request)
+    body = await read_json(request)
+    
+    # Aynı payment_id ile tekrar denemek güvenlidir
+    payment_id: Optional[str] = body.get("payment_id")
+    if not isinstance(payment_id, str) or not payment_id:
+        raise web.HTTPBadRequest(text="payment_id gerekli")
+    items = body.get("items")
+    if items is not None and (
+        not isinstance(items, dict) or not all(isinstance(q, int) for q in items.values())
+    ):
+        raise web.HTTPBadRequest(text="items {satır anahtarı: adet} biçiminde olmalı")
+    seat, parts = body.get("seat"), body.get("parts")
+    for name, value in (("seat", seat), ("parts", parts)):
+        if value is not None and (not isinstance(value, int) or isinstance(value, bool)):
+            raise web.HTTPBadRequest(text=f"{name} tam sayı olmalı")
+    
+    result = await bridge.call(
+        "record_payment", table_number,
+        body.get("split", "full"),
+        body.get("method", PAYMENT_METHODS[0]),
+        items=items,
+        seat=seat,
+        parts=parts,
+        payment_id=payment_id
+    )
+    
+    request.app["broadcaster"].request_refresh()
+    return json_response(result)
+
+
+async def websocket_handler(request: web.Request):
+    broadcaster: StatusBroadcaster = request.app["broadcaster"]
+    ws = web.WebSocketResponse(heartbeat=30)
+    await ws.prepare(request)
+    
+    # Bağlanan istemciye önce tüm masaların son hali gönderilir
+    await ws.send_str(json_dumps({
+        "type": "snapshot",
+        "tables": list(broadcaster.statuses.values())
+    }))
+    broadcaster.clients.add(ws)
+    try:
+        async for msg in ws:
+            if msg.type == WSMsgType.ERROR:
+                logger.warning(f"WebSocket hatası: {ws.exception()}")
+    finally:
+        broadcaster.clients.discard(ws)
+    return ws
+
+
+async def on_startup(app: web.Application):
+    app["status_poller"] = asyncio.create_task(app["broadcaster"].poll())
+
+
+async def on_cleanup(app: web.Application):
+    app["status_poller"].cancel()
+    for ws in list(app["broadcaster"].clients):
+        await ws.close()
+    app["bridge"].shutdown()
+
+
+def create_app(db: Database, workers: int = 32, token: Optional[str] = None) -> web.Application:
+    """API uygulamasını oluştur (token verilirse her istekte başlıkta aranır)"""
+    app = web.Application(middlewares=[token_middleware, error_middleware])
+    app["token"] = token
+    app["bridge"] = DatabaseBridge(db, workers)
+    app["broadcaster"] = StatusBroadcaster(app["bridge"])
+    
+    app.router.add_get("/api/tables", list_tables)
+    app.router.add_get("/api/tables/{table_number}", get_table)
+    app.router.add_get("/api/products", list_products)
+    app.router.add_get("/api/stock/alerts", list_stock_alerts)
+    app.router.add_get("/api/occupancy", get_occupancy)
+    app.router.add_post("/api/tables/{table_number}/items", add_item)
+    app.router.add_put("/api/tables/{table_number}/order", save_order)
+    app.router.add_post("/api/tables/{table_number}/payments", add_payment)
+    app.router.add_post("/api/tables/{table_number}/close", close_table)
+    app.router.add_get("/ws", websocket_handler)
+    
+    app.on_startup.append(on_startup)
+    app.on_cleanup.append(on_cleanup)
+    return app
+
+
+def is_loopback(host: str) -> bool:
+    """Adres sadece bu bilgisayardan erişilebilir mi"""
+    if host == "localhost":
+        return True
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return False
+
+
+def main():
+    """API sunucusunu başlat"""
+    parser = argparse.ArgumentParser(description="El terminalleri için sipariş API sunucusu")
+    parser.add_argument("--host", default="127.0.0.1",
+                        help="Yerel ağa açmak için 0.0.0.0 (RESTORAN_API_TOKEN gerekir)")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--workers", type=int, default=32,
+                        help="Veritabanı iş parçacığı sayısı (bağlantı havuzunu aşmamalı)")
+    args = parser.parse_args()
+    token = os.environ.get("RESTORAN_API_TOKEN") or None
+    if not token and not is_loopback(args.host):
+        parser.error(f"{args.host} adresine bağlanmak için RESTORAN_API_TOKEN tanımlanmalı")
+    
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+    
+    db = Database.from_env(max_pool_size=max(args.workers, 10))
+    web.run_app(create_app(db, args.workers, token), host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""
+Eşzamanlı hesap kapatma kıyaslaması
+
+Birden fazla terminalin aynı masaları aynı anda kapatmaya çalıştığı durumu
+benzetir; her masanın tam olarak bir kez arşivlendiğini doğrular ve
+kapatma gecikmesini ölçer. Son turda terminaller, sahiplenmeden sonra çökmüş
+bir kapatmanın bıraktığı masaları kapatır; her masanın çöken kapatmanın
+anahtarıyla bir kez arşivlenmesi beklenir.
+
+Ayrı bir veritabanı kullanır ve işini bitirince siler; bu yüzden adı
+BENCH_DB_PREFIX ile başlamayan veritabanlarında çalışmaz.
+
+Kullanım:
+    python bench_close_order.py --tables 50 --terminals 8 --rounds 20
+"""
+import argparse
+import statistics
+import threading
+import time
+from datetime import timedelta
+from database import Database, CLAIM_TTL_SECONDS
+
+# Silinecek veritabanının adı bununla başlamalı (restoran_db'yi korur)
+BENCH_DB_PREFIX = "restoran_bench"
+
+ITEM = {"product": {"name": "Çay", "price": 1500, "category": "İçecekler"},
+        "quantity": 1, "total": 1500}
+
+
+def close_all(db: Database, table_numbers, terminals: int, latencies, lock):
+    """Terminallerin tüm masaları aynı anda kapatmasını sağla"""
+    barrier = threading.Barrier(terminals)
+    
+    def terminal():
+        barrier.wait()
+        for table_number in table_numbers:
+            started = time.perf_counter()
+            db.close_order(table_number, 1500)
+            elapsed = time.perf_counter() - started
+            with lock:
+                latencies.append(elapsed)
+    
+    threads = [threading.Thread(target=terminal) for _ in range(terminals)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+
+def run_round(db: Database, table_numbers, terminals: int, latencies, lock):
+    """Tüm masaları doldur ve terminallerin aynı anda kapatmasını sağla"""
+    for table_number in table_numbers:
+        db.save_order_to_table(table_number, [ITEM])
+    close_all(db, table_numbers, terminals, latencies, lock)
+
+
+def run_crashed_round(db: Database, table_numbers, terminals: int, latencies, lock):
+    """Sahiplendikten sonra çöken kapatmaların masalarını terminallere kapattır"""
+    claimed_at = db.calendar.utc_now() - timedelta(seconds=CLAIM_TTL_SECONDS + 1)
+    for table_number in table_numbers:
+        db.save_order_to_table(table_number, [ITEM])
+        # close_order'ın sahiplenme adımı yazılmış, süreç arşivlemeden çökmüş
+        db.tables.update_one({"table_number": table_number}, {"$set": {
+            "checkout_id": f"crashed-{table_number}", "claimed_at": claimed_at,
+            "checkout_method": "Kart", "checkout_total": 1500
+        }})
+    close_all(db, table_numbers, terminals, latencies, lock)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Eşzamanlı close_order kıyaslaması")
+    parser.add_argument("--connection", default="mongodb://localhost:27017/")
+    parser.add_argument("--db-name", default=BENCH_DB_PREFIX)
+    parser.add_argument("--tables", type=int, default=50)
+    parser.add_argument("--terminals", type=int, default=8)
+    parser.add_argument("--rounds", type=int, default=20)
+    args = parser.parse_args()
+    if not args.db_name.startswith(BENCH_DB_PREFIX):
+        parser.error(f"Kıyaslama veritabanı siler; --db-name '{BENCH_DB_PREFIX}' ile başlamalı")
+    
+    db = Database(args.connection, args.db_name)
+    db.client.drop_database(args.db_name)
+    db = Database(args.connection, args.db_name)
+    db.tables.insert_many([
+        {"table_number": i, "status": "Boş", "current_order": []}
+        for i in range(1, args.tables + 1)
+    ])
+    table_numbers = list(range(1, args.tables + 1))
+    
+    latencies = []
+    lock = threading.Lock()
+    started = time.perf_counter()
+    for _ in range(args.rounds):
+        run_round(db, table_numbers, args.terminals, latencies, lock)
+    run_crashed_round(db, table_numbers, args.terminals, latencies, lock)
+    duration = time.perf_counter() - started
+    
+    expected = args.tables * (args.rounds + 1)
+    archived = db.orders.count_documents({})
+    resumed = db.orders.count_documents({"checkout_id": {"$regex": "^crashed-"}})
+    still_open = db.tables.count_documents({"status": "Dolu"})
+    latencies.sort()
+    
+    print(f"Kapatma denemesi : {len(latencies)}")
+    print(f"Arşivlenen       : {archived} (beklenen {expected})")
+    print(f"Devralınan       : {resumed} (beklenen {args.tables})")
+    print(f"Açık kalan masa  : {still_open}")
+    print(f"Süre             : {duration:.2f} sn ({len(latencies) / duration:.0f} deneme/sn)")
+    print(f"Gecikme p50/p99  : {statistics.median(latencies) * 1000:.2f} / "
+          f"{latencies[int(len(latencies) * 0.99) - 1] * 1000:.2f} ms")
+    
+    db.client.drop_database(args.db_name)
+    if archived != expected or resumed != args.tables or still_open:
+        raise SystemExit("HATA: kayıp, mükerrer veya yarıda kalmış hesap tespit edildi")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+İş günü takvimi - saat dilimi ve gün dönüm saati ile tarih sınırları
+"""
+from datetime import date, datetime, time, timedelta, timezone
+from zoneinfo import ZoneInfo
+
+
+class BusinessCalendar:
+    """
+    Gece servisine uygun iş günü modeli
+    
+    Bir iş günü, yerel saatle gün dönüm saatinde (ör. 04:00) başlar ve ertesi
+    gün aynı saatte biter. Tüm sınırlar UTC olarak ve yarı açık [başlangıç,
+    bitiş) aralıklar şeklinde üretilir.
+    """
+    
+    def __init__(self, tz_name: str = "Europe/Istanbul", rollover_hour: int = 4):
+        """
+        Args:
+            tz_name: IANA saat dilimi adı
+            rollover_hour: İş gününün başladığı yerel saat (0-23)
+        """
+        if not 0 <= rollover_hour <= 23:
+            raise ValueError("Gün dönüm saati 0-23 arasında olmalı")
+        self.tz_name = tz_name
+        self.tz = ZoneInfo(tz_name)
+        self.rollover_hour = rollover_hour
+        self.rollover = timedelta(hours=rollover_hour)
+    
+    def utc_now(self) -> datetime:
+        """Şu anki zaman (UTC)"""
+        return datetime.now(timezone.utc)
+    
+    def to_local(self, moment: datetime) -> datetime:
+        """Zamanı yerel saat dilimine çevir (naive ise yerel kabul edilir)"""
+        if moment.tzinfo is None:
+            return moment.replace(tzinfo=self.tz)
+        return moment.astimezone(self.tz)
+    
+    def business_date(self, moment: datetime) -> date:
+        """Verilen anın ait olduğu iş günü"""
+        return (self.to_local(moment) - self.rollover).date()
+    
+    def business_day(self, moment: datetime) -> str:
+        """İş günü anahtarı (YYYY-MM-DD), indeksli eşitlik sorguları için"""
+        return self.business_date(moment).isoformat()
+    
+    def today(self) -> date:
+        """Şu anki iş günü"""
+        return self.business_date(self.utc_now())
+    
+    def day_start(self, day: date) -> datetime:
+        """İş gününün başlangıç anı (UTC)"""
+        local_start = datetime.combine(day, time(self.rollover_hour), tzinfo=self.tz)
+        return local_start.astimezone(timezone.utc)
+    
+    def day_range(self, day: date):
+        """İş günü için yarı açık [başlangıç, bitiş) UTC aralığı"""
+        return self.day_start(day), self.day_start(day + timedelta(days=1))
+    
+    def month_start(self, day: date = None) -> datetime:
+        """İş gününün ait olduğu ayın başlangıç anı (UTC)"""
+        day = day or self.today()
+        return self.day_start(day.replace(day=1))
+    
+    def local_wall_time(self, moment: datetime) -> datetime:
+        """Saat dilimsiz yerel duvar saati (saatlik dilim etiketleri için)"""
+        return self.to_local(moment).replace(tzinfo=None)
+    
+    def business_wall_time(self, moment: datetime) -> datetime:
+        """Gün dönüm saati kadar geri kaydırılmış yerel saat (gün/hafta/ay dilimleri için)"""
+        return self.local_wall_time(moment) - self.rollover
+
+
+def format_duration(seconds: int) -> str:
+    """Süreyi "42 dk" veya "1 sa 05 dk" biçiminde göster"""
+    minutes = max(0, int(seconds) // 60)
+    if minutes < 60:
+        return f"{minutes} dk"
+    return f"{minutes // 60} sa {minutes % 60:02d} dk"
@@ -0,0 +1,188 @@
+"""
+Yönetim komutları - zamanlanmış görevlerden (cron vb.) çalıştırılabilir
+
+Bağlantı ayarları ortam değişkenlerinden okunur (bkz. Database.from_env).
+
+Kullanım:
+    python cli.py rollover                 # Kapanmış ayları arşive taşı
+    python cli.py rollover --dry-run       # Sadece taşınacak ayları listele
+    python cli.py export siparisler.csv --start 2024-01-01 --end 2024-12-31
+    python cli.py export siparisler.parquet --format parquet   # pyarrow gerekir
+    python cli.py close-day                # Açık iş gününü kapat (Z raporu)
+    python cli.py close-day --day 2024-05-01 --force
+    python cli.py pricing list             # Fiyat kurallarını listele
+    python cli.py pricing add kural.json   # Fiyat kuralı ekle (bkz. pricing.py)
+    python cli.py pricing remove <kural id>
+"""
+import argparse
+import json
+import logging
+import sys
+from datetime import date, timedelta
+from bson import ObjectId
+from bson.errors import InvalidId
+from database import Database, DEFAULT_HOT_MONTHS
+from money import format_tl
+from order_export import export_orders, EXPORT_FORMATS
+
+logger = logging.getLogger(__name__)
+
+
+def cmd_rollover(db: Database, args) -> int:
+    """Sıcak orders koleksiyonundaki kapanmış ayları aylık arşivlere taşı"""
+    months = db.rollover_orders(hot_months=args.hot_months, dry_run=args.dry_run)
+    if not months:
+        print("Arşivlenecek ay yok")
+        return 0
+    
+    for month in months:
+        if args.dry_run:
+            print(f"{month['month']}: taşınacak")
+        else:
+            print(f"{month['month']}: {month['orders']} sipariş, {format_tl(month['revenue'])}")
+    return 0
+
+
+def parse_day(value: str) -> date:
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Geçersiz tarih (YYYY-AA-GG bekleniyor): {value}")
+
+
+def cmd_export(db: Database, args) -> int:
+    """Sipariş geçmişini CSV/Parquet dosyasına aktar"""
+    start_date = db.calendar.day_start(args.start) if args.start else None
+    end_date = db.calendar.day_start(args.end + timedelta(days=1)) if args.end else None
+    
+    def progress(done, total):
+        print(f"\r{done} / {total} sipariş", end="", file=sys.stderr, flush=True)
+    
+    count = export_orders(
+        db, args.output, args.format, start_date, end_date,
+        lines=not args.summary,
+        batch_size=args.batch_size,
+        progress=progress
+    )
+    print(file=sys.stderr)
+    print(f"{count} sipariş aktarıldı: {args.output}")
+    return 0
+
+
+def cmd_close_day(db: Database, args) -> int:
+    """İş gününü kapat ve Z raporunu yazdır"""
+    try:
+        report = db.close_business_day(args.day.isoformat() if args.day else None, force=args.force)
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        return 1
+    
+    print(f"Z raporu {report['_id']}")
+    print(f"  Sipariş: {report['orders']}  Ciro: {format_tl(report['revenue'])}  "
+          f"Ortalama: {format_tl(report['average'])}")
+    for method, amount in report["payments"].items():
+        print(f"  {method}: {format_tl(amount)}")
+    for category in report["categories"]:
+        print(f"  {category['category']}: {category['quantity']} adet, {format_tl(category['revenue'])}")
+    for table in report["open_tables"]:
+        print(f"  Açık masa {table['table_number']}: {format_tl(table['total'])}")
+    return 0
+
+
+def describe_rule(rule) -> str:
+    """Fiyat kuralının tek satırlık özeti"""
+    if rule.get("percent") is not None:
+        value = f"%{rule['percent']}"
+    elif rule.get("amount") is not None:
+        value = format_tl(rule["amount"])
+    else:
+        value = f"{format_tl(rule['price'])} sabit"
+    target = rule.get("category") or (str(rule["product_id"]) if rule.get("product_id") else "tüm ürünler")
+    hours = f"{rule.get('start_hour', 0):02d}-{rule.get('end_hour', 24):02d}"
+    parts = [str(rule["_id"]), rule.get("name", ""), rule["kind"], value, target, hours]
+    if rule.get("days"):
+        parts.append("günler " + ",".join(str(day) for day in rule["days"]))
+    if rule.get("zone"):
+        parts.append(f"bölge {rule['zone']}")
+    if not rule.get("active", True):
+        parts.append("(pasif)")
+    return "  ".join(parts)
+
+
+def cmd_pricing(db: Database, args) -> int:
+    """Fiyat kurallarını listele, ekle veya sil"""
+    if args.action == "list":
+        for rule in db.get_pricing_rules():
+            print(describe_rule(rule))
+        return 0
+    
+    try:
+        if args.action == "add":
+            with open(args.target, encoding="utf-8") as f:
+                rule = json.load(f)
+            # Ürün kimlikleri JSON'da metin olarak yazılır
+            if rule.get("product_id"):
+                rule["product_id"] = ObjectId(rule["product_id"])
+            rule["with"] = [ObjectId(product_id) for product_id in rule.get("with", [])]
+            if not rule["with"]:
+                del rule["with"]
+            print(f"Kural eklendi: {db.add_pricing_rule(rule)}")
+        else:
+            db.delete_pricing_rule(ObjectId(args.target))
+            print("Kural silindi")
+    except (OSError, ValueError, InvalidId) as e:
+        print(e, file=sys.stderr)
+        return 1
+    return 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Restoran yönetim komutları")
+    commands = parser.add_subparsers(dest="command", required=True)
+    
+    rollover = commands.add_parser("rollover", help="Kapanmış ayları arşiv koleksiyonlarına taşı")
+    rollover.add_argument("--hot-months", type=int, default=DEFAULT_HOT_MONTHS,
+                          help="Sıcak koleksiyonda kalacak ay sayısı (içinde bulunulan ay dahil)")
+    rollover.add_argument("--dry-run", action="store_true", help="Değişiklik yapmadan listele")
+    rollover.set_defaults(func=cmd_rollover)
+    
+    export = commands.add_parser("export", help="Sipariş geçmişini dosyaya aktar")
+    export.add_argument("output", help="Hedef dosya")
+    export.add_argument("--format", choices=EXPORT_FORMATS, default="csv")
+    export.add_argument("--start", type=parse_day, help="İlk iş günü (YYYY-AA-GG, dahil)")
+    export.add_argument("--end", type=parse_day, help="Son iş günü (YYYY-AA-GG, dahil)")
+    export.add_argument("--summary", action="store_true",
+                        help="Kalemler yerine sipariş başına tek satır yaz")
+    export.add_argument("--batch-size", type=int, default=1000)
+    export.set_defaults(func=cmd_export)
+    
+    close_day = commands.add_parser("close-day", help="İş gününü kapat ve Z raporu oluştur")
+    close_day.add_argument("--day", type=parse_day, help="Kapatılacak iş günü (varsayılan: açık gün)")
+    close_day.add_argument("--force", action="store_true", help="Açık masa varken de kapat")
+    close_day.set_defaults(func=cmd_close_day)
+    
+    pricing = commands.add_parser("pricing", help="Happy hour ve diğer fiyat kuralları")
+    pricing.add_argument("action", choices=("list", "add", "remove"))
+    pricing.add_argument("target", nargs="?", help="add: kural JSON dosyası, remove: kural id")
+    pricing.set_defaults(func=cmd_pricing)
+    
+    return parser
+
+
+def main(argv=None) -> int:
+    args = build_parser().parse_args(argv)
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+    
+    try:
+        db = Database.from_env()
+        return args.func(db, args)
+    except Exception as e:
+        logger.error(f"Komut başarısız ({args.command}): {e}")
+        return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,36 +1,329 @@
 """
 MongoDB veritabanı bağlantısı ve işlemleri
 """
-from pymongo import MongoClient
-from typing import List, Dict, Optional
+from bson import ObjectId
+from pymongo import MongoClient, ASCENDING, DESCENDING, ReturnDocument, UpdateOne
+from pymongo.errors import DuplicateKeyError, OperationFailure
+from typing import List, Dict, Optional, Tuple
 import logging
+import os
+import re
+import time
+import uuid
+from product_search import name_tokens, rank_key
+from report_cache import ReportCache
+from business_day import BusinessCalendar
+from money import to_kurus, format_tl, split_amount
+from pricing import PricingEngine, RULE_REFRESH_SECONDS, validate_rule
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Veritabanı şema sürümü (bkz. Database.migrate)
+SCHEMA_VERSION = 3
+
+# Bölgesi belirtilmemiş masaların varsayılan bölgesi ve kapasitesi
+DEFAULT_ZONE = "Salon"
+DEFAULT_CAPACITY = 4
+
+# Mutfak fişi durumları (sırasıyla)
+KITCHEN_STATUSES = ("Yeni", "Hazırlanıyor", "Tamamlandı")
+
+# Hesap kapatma/taşıma sahiplenmesi bu kadar saniyedir tamamlanmadıysa yarıda
+# kalmış sayılır ve sonraki bir çağrı (veya açılış) tarafından tamamlanır
+CLAIM_TTL_SECONDS = 60
+# Sahiplenmeyle birlikte masaya yazılan alanlar (sahiplenme bitince silinir);
+# transfer_to sadece masa taşımada yazılır
+CLAIM_FIELDS = ("checkout_id", "claimed_at", "checkout_method", "checkout_total", "transfer_to")
+
+# Masa durum geçişleri (table_events): açılış, kapanış, başka masaya taşıma
+TABLE_EVENTS = ("opened", "closed", "moved")
+
+# Ödeme türleri
+PAYMENT_METHODS = ("Nakit", "Kart")
+# Hesap bölüşümü: kalanın tamamı, ürüne göre, koltuğa göre, eşit paylar
+PAYMENT_SPLITS = ("full", "item", "seat", "equal")
+
+# Masa planı çizimi için gereken alanlar (adisyon sadece toplam ve adet olarak)
+TABLE_LAYOUT_PROJECTION = {
+    "_id": 0, "table_number": 1, "status": 1, "zone": 1, "x": 1, "y": 1, "capacity": 1,
+    "version": 1, "opened_at": 1, "order_id": 1, "paid_total": 1,
+    "total": {"$sum": "$current_order.total"},
+    "item_count": {"$sum": "$current_order.quantity"}
+}
+
+# Masa belgesi her değiştiğinde artan sürüm (pipeline güncellemelerinde)
+TABLE_VERSION_BUMP = {"$add": [{"$ifNull": ["$version", 0]}, 1]}
+
+# Sipariş kaleminin liste fiyatıyla tutarı (fiyat kuralları uygulanmadan)
+ITEM_LIST_TOTAL = {"$multiply": ["$items.quantity", "$items.product.price"]}
+
+# Sipariş geçmişi listesinde gösterilen alanlar
+HISTORY_PROJECTION = {
+    "date": 1, "table_number": 1, "total": 1, "status": 1, "items.quantity": 1
+}
+
+# Arşivlenmiş ayların koleksiyon öneki (orders_2024_01 gibi)
+ORDER_ARCHIVE_PREFIX = "orders_"
+# Sıcak koleksiyonda tutulacak ay sayısı (içinde bulunulan ay dahil)
+DEFAULT_HOT_MONTHS = 2
+# Gün kilitlenmeden bu kadar saniye önce tarihlenmiş satırlar, kilidi görmeden
+# yazılıyor olabileceği için geç yazma sayılır ve ertesi güne taşınır (sn)
+CLOSE_GRACE_SECONDS = 2
+
 
 class Database:
     """MongoDB veritabanı sınıfı"""
     
-    def __init__(self, connection_string: str = "mongodb://localhost:27017/", db_name: str = "restoran_db"):
+    def __init__(self, connection_string: str = "mongodb://localhost:27017/", db_name: str = "restoran_db",
+                 report_cache_path: Optional[str] = None, timezone: str = "Europe/Istanbul",
+                 day_rollover_hour: int = 4, max_pool_size: int = 100, setup: bool = True):
         """
         Veritabanı bağlantısını başlat
         
         Args:
             connection_string: MongoDB bağlantı dizesi
             db_name: Veritabanı adı
+            report_cache_path: Kapanmış dönem rapor önbelleğinin yazılacağı dosya (isteğe bağlı)
+            timezone: İşletmenin saat dilimi
+            day_rollover_hour: İş gününün başladığı yerel saat (gece servisi için ör. 4)
+            max_pool_size: Bağlantı havuzundaki en fazla bağlantı (eşzamanlı istemciler için)
+            setup: False ise indeks ve şema kontrolü (setup) çağırana bırakılır;
+                bağlantı kurulmasını beklemeden nesne oluşturulur
         """
         try:
-            self.client = MongoClient(connection_string)
+            self.calendar = BusinessCalendar(timezone, day_rollover_hour)
+            # Tarihler UTC saklanır, okunurken yerel saate çevrilir
+            self.client = MongoClient(
+                connection_string,
+                tz_aware=True,
+                tzinfo=self.calendar.tz,
+                maxPoolSize=max_pool_size
+            )
             self.db = self.client[db_name]
             self.tables = self.db["tables"]
             self.products = self.db["products"]
             self.orders = self.db["orders"]
-            logger.info(f"MongoDB bağlantısı başarılı: {db_name}")
+            self.meta = self.db["meta"]
+            self.counters = self.db["counters"]
+            self.kitchen_tickets = self.db["kitchen_tickets"]
+            # Açık adisyonlara alınan (kısmi) ödemeler
+            self.payments = self.db["payments"]
+            # Stok eşiğinin altına düşen ürünler için uyarı akışı
+            self.stock_alerts = self.db["stock_alerts"]
+            # Arşivlenen aylar için günlük ciro ve ürün özetleri
+            self.daily_rollups = self.db["daily_rollups"]
+            # Gün sonu (Z) raporları: _id iş günü, yazıldıktan sonra değişmez
+            self.z_reports = self.db["z_reports"]
+            # Masaların açılış/kapanış geçişleri (oturma süresi ve devir raporları için)
+            self.table_events = self.db["table_events"]
+            # Happy hour, kategori indirimi, kombinasyon ve bölge farkı kuralları
+            self.pricing_rules = self.db["pricing_rules"]
+            self._pricing: Optional[PricingEngine] = None
+            self._pricing_checked = 0.0
+            # Kapanmış (geçmiş) tarih aralıkları için rapor önbelleği
+            self.report_cache = ReportCache(path=report_cache_path)
+            self.setup_pending = True
+            # İlk denemede belirlenir (tek sunucuda transaction yoktur)
+            self._transactions_supported: Optional[bool] = None
+            if setup:
+                self.setup()
+                logger.info(f"MongoDB bağlantısı başarılı: {db_name}")
         except Exception as e:
             logger.error(f"MongoDB bağlantı hatası: {e}")
             raise
     
+    @classmethod
+    def from_env(cls, **kwargs) -> "Database":
+        """
+        Ortam değişkenlerinden yapılandırılmış bağlantı oluştur
+        
+        RESTORAN_MONGO_URI, RESTORAN_DB, RESTORAN_REPORT_CACHE, RESTORAN_TZ,
+        RESTORAN_DAY_ROLLOVER ve RESTORAN_MONGO_POOL okunur; verilen argümanlar
+        bunları ezer.
+        """
+        config = {
+            "connection_string": os.environ.get("RESTORAN_MONGO_URI", "mongodb://localhost:27017/"),
+            "db_name": os.environ.get("RESTORAN_DB", "restoran_db"),
+            # Verilirse kapanmış dönem raporları dosyada saklanır
+            "report_cache_path": os.environ.get("RESTORAN_REPORT_CACHE"),
+            "timezone": os.environ.get("RESTORAN_TZ", "Europe/Istanbul"),
+            "day_rollover_hour": int(os.environ.get("RESTORAN_DAY_ROLLOVER", "4")),
+            "max_pool_size": int(os.environ.get("RESTORAN_MONGO_POOL", "100")),
+        }
+        config.update(kwargs)
+        return cls(**config)
+    
+    def setup(self):
+        """İndeksleri oluştur ve şemayı güncel sürüme taşı"""
+        self.ensure_indexes()
+        self.migrate()
+        # Çöken bir terminalin yarıda bıraktığı hesap kapatmaları
+        self.recover_stale_claims()
+        self.setup_pending = False
+    
+    def ensure_indexes(self):
+        """Gerekli indeksleri oluştur ve eksik arama anahtarlarını doldur"""
+        # Aynı masa numarasının iki kez verilmesini engeller
+        try:
+            self.tables.create_index([("table_number", ASCENDING)], unique=True)
+        except OperationFailure as e:
+            logger.error(f"Masa numaraları tekil değil, lütfen mükerrer masaları düzeltin: {e}")
+        # Mutfak ekranı: aktif fişler ve son değişiklikleri izleme
+        self.kitchen_tickets.create_index([("status", ASCENDING), ("created_at", ASCENDING)])
+        self.kitchen_tickets.create_index([("updated_at", ASCENDING)])
+        # Masa durumu sorgularını indeksten karşılamak (covered query) için
+        self.tables.create_index([("table_number", ASCENDING), ("status", ASCENDING)])
+        self.tables.create_index(
+            [("zone", ASCENDING), ("table_number", ASCENDING), ("status", ASCENDING)]
+        )
+        # Anlık görüntü uzlaştırması: masa sürümleri indeksten okunur
+        self.tables.create_index([("table_number", ASCENDING), ("version", ASCENDING)])
+        
+        # Ürün adı önek araması için çok anahtarlı (multikey) indeks
+        self.products.create_index([("search_keys", ASCENDING)])
+        # Sipariş koleksiyonları (arşivlenmiş aylar dahil)
+        self._ensure_order_indexes(self.orders)
+        for month in self._archive_state().get("months", {}):
+            self._ensure_order_indexes(self.db[archive_collection_name(month)])
+        # Aynı hesabın iki kez arşivlenmesini engeller
+        self.orders.create_index(
+            [("checkout_id", ASCENDING)],
+            unique=True,
+            partialFilterExpression={"checkout_id": {"$exists": True}}
+        )
+        # Yarıda kalan masa taşımalarının hedefe yazılıp yazılmadığını bulmak için
+        self.orders.create_index([("transfers_in", ASCENDING)], sparse=True)
+        self.daily_rollups.create_index([("month", ASCENDING)])
+        # Aynı ödemenin iki kez kaydedilmesini engeller
+        self.payments.create_index([("payment_id", ASCENDING)], unique=True)
+        self.payments.create_index([("order_id", ASCENDING)])
+        self.payments.create_index([("date", ASCENDING)])
+        self.payments.create_index([("business_day", ASCENDING)])
+        self.stock_alerts.create_index([("created_at", ASCENDING)])
+        self.table_events.create_index([("event", ASCENDING), ("business_day", ASCENDING)])
+        self.table_events.create_index([("table_number", ASCENDING), ("at", ASCENDING)])
+        
+        # Eksik arama anahtarları tek bulk_write ile doldurulur (çoğu açılışta hiç ürün eşleşmez)
+        backfill = [
+            UpdateOne({"_id": product["_id"]}, {"$set": {"search_keys": name_tokens(product.get("name", ""))}})
+            for product in self.products.find({"search_keys": {"$exists": False}}, {"name": 1})
+        ]
+        if backfill:
+            self.products.bulk_write(backfill, ordered=False)
+        
+        # Masa numarası sayacı en az mevcut en büyük numara olmalı
+        max_table = self.tables.find_one(sort=[("table_number", -1)], projection={"table_number": 1})
+        self.counters.update_one(
+            {"_id": "table_number"},
+            {"$max": {"seq": max_table["table_number"] if max_table else 0}},
+            upsert=True
+        )
+    
+    @staticmethod
+    def _ensure_order_indexes(collection):
+        """Sipariş (sıcak veya arşiv) koleksiyonunun rapor ve arama indeksleri"""
+        # Tarih aralığı raporları için
+        collection.create_index([("status", ASCENDING), ("date", ASCENDING)])
+        # İş günü eşitlik sorguları için
+        collection.create_index([("status", ASCENDING), ("business_day", ASCENDING)])
+        # Sipariş geçmişi aramaları: masaya ve ürüne göre, tarihe göre sıralı
+        collection.create_index(
+            [("status", ASCENDING), ("table_number", ASCENDING), ("date", ASCENDING)]
+        )
+        collection.create_index(
+            [("status", ASCENDING), ("items.product._id", ASCENDING), ("date", ASCENDING)]
+        )
+    
+    # Şema taşıma işlemleri
+    def migrate(self):
+        """Eksik şema taşımalarını sırayla uygula"""
+        state = self.meta.find_one({"_id": "schema"})
+        version = state["version"] if state else 0
+        
+        # Boş veritabanında taşınacak veri yok
+        if version == 0 and self.orders.estimated_document_count() == 0 \
+                and self.products.estimated_document_count() == 0:
+            version = SCHEMA_VERSION
+        
+        migrations = {
+            1: self._migrate_v1_utc_dates,
+            2: self._migrate_v2_kurus,
+            3: self._migrate_v3_table_zones,
+        }
+        for target in range(version + 1, SCHEMA_VERSION + 1):
+            logger.info(f"Şema taşıması uygulanıyor: v{target}")
+            migrations[target]()
+            # Geçmiş rapor sonuçları eski verilere dayanıyor
+            self.report_cache.clear()
+        
+        self.meta.update_one(
+            {"_id": "schema"},
+            {"$set": {"version": max(version, SCHEMA_VERSION)}},
+            upsert=True
+        )
+    
+    def _migrate_v1_utc_dates(self):
+        """Yerel saatle (naive) saklanan sipariş tarihlerini UTC'ye çevir, business_day ekle"""
+        tz_name = self.calendar.tz_name
+        rollover_ms = self.calendar.rollover_hour * 3600 * 1000
+        result = self.orders.update_many(
+            {"business_day": {"$exists": False}},
+            [
+                # Saklanan duvar saatini işletmenin saat diliminde yorumla
+                {"$set": {"date": {"$dateFromString": {
+                    "dateString": {"$dateToString": {
+                        "date": "$date", "format": "%Y-%m-%dT%H:%M:%S.%L"
+                    }},
+                    "timezone": tz_name
+                }}}},
+                {"$set": {"business_day": {"$dateToString": {
+                    "date": {"$subtract": ["$date", rollover_ms]},
+                    "format": "%Y-%m-%d",
+                    "timezone": tz_name
+                }}}}
+            ]
+        )
+        logger.info(f"{result.modified_count} sipariş UTC tarihine taşındı")
+    
+    def _migrate_v2_kurus(self):
+        """Float TL tutarlarını tam sayı kuruşa çevir (ürünler, açık adisyonlar, arşiv)"""
+        def kurus(expr):
+            # Sadece henüz çevrilmemiş (double) değerleri dönüştür
+            return {"$cond": [
+                {"$eq": [{"$type": expr}, "double"]},
+                {"$toLong": {"$round": [{"$multiply": [expr, 100]}, 0]}},
+                expr
+            ]}
+        
+        def items_kurus(field):
+            return {"$map": {
+                "input": {"$ifNull": [field, []]},
+                "as": "item",
+                "in": {"$mergeObjects": ["$$item", {
+                    "total": kurus("$$item.total"),
+                    "product": {"$mergeObjects": [
+                        "$$item.product", {"price": kurus("$$item.product.price")}
+                    ]}
+                }]}
+            }}
+        
+        self.products.update_many({}, [{"$set": {"price": kurus("$price")}}])
+        self.tables.update_many({}, [{"$set": {"current_order": items_kurus("$current_order")}}])
+        self.orders.update_many({}, [{"$set": {
+            "total": kurus("$total"),
+            "items": items_kurus("$items")
+        }}])
+        logger.info("Tutarlar kuruşa çevrildi")
+    
+    def _migrate_v3_table_zones(self):
+        """Mevcut masalara varsayılan bölge ve kapasite ata (konumlar otomatik yerleşir)"""
+        result = self.tables.update_many(
+            {"zone": {"$exists": False}},
+            {"$set": {"zone": DEFAULT_ZONE, "capacity": DEFAULT_CAPACITY, "x": None, "y": None}}
+        )
+        logger.info(f"{result.modified_count} masaya varsayılan bölge atandı")
+    
     def seed_database(self):
         """Veritabanını 10 masa ve 30 ürün ile başlangıç verileriyle doldur"""
         
@@ -40,11 +333,7 @@ class Database:
             return
         
         # 10 masa oluştur
-        tables_data = [
-            {"table_number": i, "status": "Boş", "current_order": []}
-            for i in range(1, 11)
-        ]
-        self.tables.insert_many(tables_data)
+        self.add_tables(10)
         logger.info("10 masa oluşturuldu")
         
         # 30 ürün oluştur (çeşitli kategorilerde)
@@ -88,7 +377,11 @@ class Database:
             {"name": "Tiramisu", "price": 50.0, "category": "Tatlılar"},
         ]
         
+        for product in products_data:
+            product["price"] = to_kurus(product["price"])
+            product["search_keys"] = name_tokens(product["name"])
         self.products.insert_many(products_data)
+        self._bump_catalog_version()
         logger.info("30 ürün oluşturuldu")
     
     # Tablo işlemleri
@@ -96,22 +389,122 @@ class Database:
         """Tüm masaları getir"""
         return list(self.tables.find().sort("table_number", 1))
     
+    def get_table_statuses(self, zone: Optional[str] = None, with_totals: bool = False) -> List[Dict]:
+        """
+        Masa planı için sadece numara ve durum bilgisini getir
+        
+        Adisyon içeriği istemciye gönderilmez. with_totals=False iken sorgu
+        tamamen indeksten karşılanır; with_totals=True iken açılış zamanı ve
+        adisyon toplamı sunucuda hesaplanır.
+        
+        Returns:
+            [{"table_number": int, "status": str, ("opened_at", "total", "item_count")}, ...]
+        """
+        match_query = {"zone": zone} if zone is not None else {}
+        
+        if not with_totals:
+            return list(
+                self.tables.find(match_query, {"_id": 0, "table_number": 1, "status": 1})
+                .sort("table_number", 1)
+            )
+        
+        pipeline = [
+            {"$match": match_query},
+            {"$sort": {"table_number": 1}},
+            {"$project": {
+                "_id": 0,
+                "table_number": 1,
+                "status": 1,
+                "opened_at": 1,
+                "total": {"$sum": "$current_order.total"},
+                "item_count": {"$sum": "$current_order.quantity"}
+            }}
+        ]
+        return list(self.tables.aggregate(pipeline))
+    
+    def update_table_layout(self, table_number: int, x: float, y: float,
+                            zone: Optional[str] = None, capacity: Optional[int] = None):
+        """Masanın plan üzerindeki konumunu (ve isteğe bağlı bölge/kapasitesini) güncelle"""
+        fields = {"x": x, "y": y}
+        if zone is not None:
+            fields["zone"] = zone
+        if capacity is not None:
+            fields["capacity"] = capacity
+        self.tables.update_one(
+            {"table_number": table_number},
+            {"$set": fields, "$inc": {"version": 1}}
+        )
+    
     def get_table(self, table_number: int) -> Optional[Dict]:
         """Belirli bir masayı getir"""
         return self.tables.find_one({"table_number": table_number})
     
-    def add_table(self) -> int:
-        """Yeni masa ekle (bir sonraki numarayı otomatik atar)"""
-        max_table = self.tables.find_one(sort=[("table_number", -1)])
-        next_number = (max_table["table_number"] + 1) if max_table else 1
+    def get_table_layouts(self, table_numbers: List[int]) -> List[Dict]:
+        """
+        Verilen masaları sadece plan için gereken alanlarla getir
         
-        self.tables.insert_one({
-            "table_number": next_number,
-            "status": "Boş",
-            "current_order": []
-        })
-        logger.info(f"Masa {next_number} eklendi")
-        return next_number
+        Adisyon kalemleri istemciye gönderilmez; toplam ve adet sunucuda hesaplanır.
+        """
+        pipeline = [
+            {"$match": {"table_number": {"$in": list(table_numbers)}}},
+            {"$sort": {"table_number": 1}},
+            {"$project": TABLE_LAYOUT_PROJECTION}
+        ]
+        return list(self.tables.aggregate(pipeline))
+    
+    def get_table_versions(self) -> Dict[int, int]:
+        """
+        Masa numarası -> belge sürümü
+        
+        Sürüm masa belgesini değiştiren her işlemde artar; anlık görüntüden
+        açılan terminal sadece sürümü değişen masaları yeniden çeker.
+        """
+        return {
+            table["table_number"]: table.get("version", 0)
+            for table in self.tables.find({}, {"_id": 0, "table_number": 1, "version": 1})
+        }
+    
+    def _allocate_table_numbers(self, count: int) -> List[int]:
+        """Sayaçtan tek işlemde ardışık masa numaraları ayır"""
+        counter = self.counters.find_one_and_update(
+            {"_id": "table_number"},
+            {"$inc": {"seq": count}},
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+        last = counter["seq"]
+        return list(range(last - count + 1, last + 1))
+    
+    def add_table(self, zone: str = DEFAULT_ZONE) -> int:
+        """Yeni masa ekle (bir sonraki numarayı atomik olarak atar)"""
+        return self.add_tables(1, zone)[0]
+    
+    def add_tables(self, count: int, zone: str = DEFAULT_ZONE,
+                   capacity: int = DEFAULT_CAPACITY) -> List[int]:
+        """
+        Birden fazla masayı tek seferde ekle (büyük salon kurulumu için)
+        
+        Konumu verilmeyen masalar plan üzerinde otomatik yerleştirilir.
+        """
+        if count < 1:
+            raise ValueError("Eklenecek masa sayısı en az 1 olmalı")
+        
+        numbers = self._allocate_table_numbers(count)
+        self.tables.insert_many([
+            {
+                "table_number": number,
+                "status": "Boş",
+                "current_order": [],
+                "zone": zone,
+                "capacity": capacity,
+                "x": None,
+                "y": None,
+                "version": 1
+            }
+            for number in numbers
+        ])
+        logger.info(f"{count} masa eklendi: {numbers[0]}-{numbers[-1]}")
+        return numbers
     
     def delete_table(self, table_number: int) -> bool:
         """Masayı sil (sadece boşsa)"""
@@ -122,7 +515,15 @@ class Database:
         if table["status"] == "Dolu":
             raise ValueError("Dolu masa silinemez!")
         
-        self.tables.delete_one({"table_number": table_number})
+        result = self.tables.delete_one({"table_number": table_number, "status": {"$ne": "Dolu"}})
+        if result.deleted_count != 1:
+            # Kontrolden sonra başka bir terminal masayı açtı
+            raise ValueError("Dolu masa silinemez!")
+        # En son verilen numara silindiyse sayacı geri al (numara tekrar kullanılabilsin)
+        self.counters.update_one(
+            {"_id": "table_number", "seq": table_number},
+            {"$inc": {"seq": -1}}
+        )
         logger.info(f"Masa {table_number} silindi")
         return True
     
@@ -130,38 +531,873 @@ class Database:
         """Masa durumunu güncelle"""
         self.tables.update_one(
             {"table_number": table_number},
-            {"$set": {"status": status}}
+            {"$set": {"status": status}, "$inc": {"version": 1}}
         )
     
     def save_order_to_table(self, table_number: int, order_items: List[Dict]):
-        """Siparişi masaya kaydet"""
-        self.tables.update_one(
-            {"table_number": table_number},
-            {"$set": {"current_order": order_items, "status": "Dolu"}}
-        )
+        """
+        Siparişi masaya kaydet ve yeni eklenen kalemler için mutfak fişi oluştur
+        
+        Ödemesi alınmış adetler azaltılamaz; kontrol okunan paid_total
+        üzerinden karşılaştır-ve-değiştir ile yapılır, araya giren bir ödeme
+        varsa kontrol tekrarlanır.
+        """
+        now = self.calendar.utc_now()
+        for _ in range(3):
+            table = self.tables.find_one(
+                {"table_number": table_number}, {"checkout_id": 1, "paid_total": 1, "paid_items": 1}
+            )
+            if table is None:
+                return
+            # Hesabı kapatılmakta olan masaya yazılmaz (kalemler kaybolmasın)
+            if "checkout_id" in table:
+                raise ValueError("Masanın hesabı şu anda kapatılıyor!")
+            self._check_paid_lines(table.get("paid_items", {}), order_items)
+            
+            paid = table.get("paid_total") or 0
+            previous = self.tables.find_one_and_update(
+                {
+                    "table_number": table_number,
+                    "checkout_id": {"$exists": False},
+                    # Araya giren bir ödeme ödenen adetleri değiştirdiyse eşleşmez
+                    "paid_total": paid or {"$in": [0, None]}
+                },
+                [{"$set": {
+                    "current_order": {"$literal": order_items},
+                    "status": "Dolu",
+                    # Masanın açıldığı an ve adisyon kimliği sadece ilk kayıtta yazılır
+                    "opened_at": {"$ifNull": ["$opened_at", now]},
+                    "order_id": {"$ifNull": ["$order_id", uuid.uuid4().hex]},
+                    "version": TABLE_VERSION_BUMP
+                }}],
+                projection={"current_order": 1, "opened_at": 1},
+                return_document=ReturnDocument.BEFORE
+            )
+            if previous is not None:
+                break
+        else:
+            raise ValueError("Adisyon kaydedilemedi, lütfen tekrar deneyin")
+        
+        if previous.get("opened_at") is None:
+            self._log_table_event(table_number, "opened", now)
+        self._create_kitchen_ticket(table_number, previous.get("current_order", []), order_items)
     
-    def close_order(self, table_number: int, total: float):
-        """Siparişi kapat ve arşivle"""
-        table = self.get_table(table_number)
-        if not table:
+    def _check_paid_lines(self, paid_items: Dict[str, int], order_items: List[Dict]):
+        """Yeni adisyonda ödenmiş adetlerden az kalan satır varsa ValueError"""
+        if not paid_items:
             return
+        quantities = {}
+        for item in order_items:
+            key = self.line_key(item)
+            quantities[key] = quantities.get(key, 0) + item.get("quantity", 0)
+        if any(quantities.get(key, 0) < paid for key, paid in paid_items.items()):
+            raise ValueError("Ödemesi alınmış ürünler adisyondan çıkarılamaz!")
+    
+    def add_item_to_table(self, table_number: int, product: Dict, quantity: int = 1):
+        """
+        Masaya tek bir ürün ekle (adisyonu okumadan, atomik olarak)
+        
+        Ürün adisyonun ortak (koltuğa atanmamış) satırlarında aynı birim
+        fiyatla varsa adedi $inc ile artırılır, yoksa kalem eklenir. Aynı anda
+        farklı cihazlardan yapılan eklemeler birbirini ezmez. Birim fiyat
+        fiyat kurallarından çözülür; masaya veya adisyona bağlı kural yoksa
+        masa okunmaz.
+        """
+        if quantity < 1:
+            raise ValueError("Adet en az 1 olmalı")
+        
+        shared_line = {"product._id": product["_id"], "seat": None}
+        open_filter = {"table_number": table_number, "checkout_id": {"$exists": False}}
+        
+        zone, order_products = None, ()
+        if self.pricing.depends_on_table(product):
+            table = self.tables.find_one(
+                {"table_number": table_number}, {"zone": 1, "current_order.product._id": 1}
+            ) or {}
+            zone = table.get("zone", DEFAULT_ZONE)
+            order_products = [item["product"]["_id"] for item in table.get("current_order", [])]
+        unit_price = line_price = self.price_product(product, zone, order_products)
+        
+        # Her iki koşul da eşzamanlı bir değişiklikle kaçırılabilir; kısa bir tekrar yeterli
+        for _ in range(3):
+            result = self.tables.update_one(
+                dict(open_filter, current_order={"$elemMatch": dict(shared_line, unit_price=line_price)}),
+                {
+                    "$inc": {
+                        "current_order.$.quantity": quantity,
+                        "current_order.$.total": quantity * unit_price,
+                        "version": 1
+                    },
+                    "$set": {"status": "Dolu"}
+                }
+            )
+            if result.matched_count:
+                break
+            
+            new_item = {
+                "product": product, "quantity": quantity,
+                "unit_price": unit_price, "total": quantity * unit_price
+            }
+            now = self.calendar.utc_now()
+            previous = self.tables.find_one_and_update(
+                dict(open_filter, current_order={"$not": {"$elemMatch": shared_line}}),
+                [{"$set": {
+                    "current_order": {"$concatArrays": [
+                        {"$ifNull": ["$current_order", []]}, {"$literal": [new_item]}
+                    ]},
+                    "status": "Dolu",
+                    "opened_at": {"$ifNull": ["$opened_at", now]},
+                    "order_id": {"$ifNull": ["$order_id", uuid.uuid4().hex]},
+                    "version": TABLE_VERSION_BUMP
+                }}],
+                projection={"opened_at": 1},
+                return_document=ReturnDocument.BEFORE
+            )
+            if previous is not None:
+                if previous.get("opened_at") is None:
+                    self._log_table_event(table_number, "opened", now)
+                break
+            
+            table = self.tables.find_one(
+                {"table_number": table_number},
+                {"checkout_id": 1, "current_order": {"$elemMatch": shared_line}}
+            )
+            if not table:
+                raise ValueError("Masa bulunamadı!")
+            if "checkout_id" in table:
+                raise ValueError("Masanın hesabı şu anda kapatılıyor!")
+            if table.get("current_order"):
+                # Satır başka bir fiyatla açılmış: fiyat satır açılırken kilitlenir
+                # (birim fiyatı olmayan eski satırlar liste fiyatıyla artar)
+                line_price = table["current_order"][0].get("unit_price")
+                unit_price = product["price"] if line_price is None else line_price
+        else:
+            raise ValueError("Ürün eklenemedi, lütfen tekrar deneyin")
+        
+        self._insert_kitchen_ticket(table_number, [{
+            "name": product.get("name", ""),
+            "category": product.get("category", "Diğer"),
+            "quantity": quantity
+        }])
+    
+    def close_order(self, table_number: int, total: Optional[int] = None,
+                    checkout_id: Optional[str] = None, method: str = PAYMENT_METHODS[0]) -> bool:
+        """
+        Siparişi kapat ve arşivle
+        
+        Adisyon önce find_one_and_update ile atomik olarak sahiplenilir, sonra
+        arşivlenir ve masa temizlenir. Her adım checkout_id ile idempotenttir:
+        yarıda kalan bir kapatma aynı checkout_id ile tekrar çağrılarak
+        tamamlanır, eşzamanlı ikinci bir kapatma ise siparişi tekrar arşivlemez.
+        Kısmi ödemelerden sonra kalan tutar (varsa) tek bir ödeme olarak kaydedilir.
+        Arşivlenen siparişin stok düşümü tek bir bulk_write ile yapılır.
+        
+        Sahiplenme zamanı, ödeme türü ve toplamla birlikte masaya yazılır;
+        sahibi çöken (CLAIM_TTL_SECONDS'dan eski) bir sahiplenme, başka bir
+        anahtarla gelen sonraki kapatma tarafından kendi anahtarıyla tamamlanır.
         
-        # Order'ı arşivle
-        from datetime import datetime
-        self.orders.insert_one({
+        Args:
+            table_number: Masa numarası
+            total: Hesap toplamı (kuruş); verilmezse sahiplenilen adisyondan hesaplanır
+            checkout_id: Hesap kapatma işleminin tekil anahtarı
+            method: Kalan tutarın ödeme türü
+        
+        Returns:
+            Bu çağrı (veya aynı anahtarla önceki bir çağrı) hesabı kapattıysa True
+        """
+        checkout_id = checkout_id or uuid.uuid4().hex
+        
+        # 1) Adisyonu sahiplen (başka bir kapatma sürüyorsa eşleşmez)
+        claim = {"checkout_id": checkout_id, "claimed_at": self.calendar.utc_now(), "checkout_method": method}
+        if total is not None:
+            claim["checkout_total"] = total
+        table = self.tables.find_one_and_update(
+            {
+                "table_number": table_number,
+                "status": "Dolu",
+                "$or": [
+                    {"checkout_id": {"$exists": False}},
+                    {"checkout_id": checkout_id}
+                ]
+            },
+            {"$set": claim, "$inc": {"version": 1}},
+            return_document=ReturnDocument.AFTER
+        )
+        if not table:
+            # Aynı anahtarla daha önce tamamlanmış olabilir
+            if self.orders.count_documents({"checkout_id": checkout_id}, limit=1) > 0:
+                return True
+            # Yarıda kalmış başka bir sahiplenme varsa onu tamamla
+            stale = self._stale_claim(table_number)
+            if not stale:
+                return False
+            if "transfer_to" in stale:
+                # Taşıma çözülünce adisyon ya hedefte ya da sahiplenilebilir halde kaynaktadır
+                self._resume_claim(stale)
+                return self.close_order(table_number, total, checkout_id, method)
+            return self._resume_claim(stale)
+        
+        # 2) Kalan tutarı öde ve order'ı arşivle
+        if total is None:
+            total = sum(item["total"] for item in table["current_order"])
+        payments = list(table.get("payments", []))
+        remaining = total - table.get("paid_total", 0)
+        if remaining > 0:
+            # Tekrar denemede aynı ödeme oluşsun diye anahtar checkout_id'den türetilir;
+            # kapatmayı başlatan kısmi ödemenin anahtarıyla (checkout_id) çakışmaz
+            payments.append(self._new_payment(table, remaining, method, "full", f"{checkout_id}:rest"))
+        self._insert_payments(payments)
+        
+        now = self.calendar.utc_now()
+        business_day = self.current_business_day(now)
+        order = {
             "table_number": table_number,
+            "order_id": table.get("order_id"),
             "items": table["current_order"],
             "total": total,
-            "date": datetime.now(),
-            "status": "Tamamlandı"
+            # Fiyat kuralları uygulanmadan (liste fiyatıyla) tutar
+            "list_total": sum(
+                item["quantity"] * item["product"]["price"] for item in table["current_order"]
+            ),
+            "paid": sum(payment["amount"] for payment in payments),
+            "date": now,
+            "business_day": business_day,
+            # Masanın dolu kaldığı aralık (oturma süresi raporları için)
+            "opened_at": table.get("opened_at"),
+            "closed_at": now,
+            "status": "Tamamlandı",
+            "checkout_id": checkout_id,
+            # Stok düşümünü sahiplenen çağrı "pending", düşüm bitince True yapar;
+            # kesilen bir kapatma tekrar denenince tamamlanır
+            "stock_applied": False
+        }
+        if table.get("transfers_in"):
+            # Bu adisyona taşınan masalar (yarıda kalan taşıma kurtarması için)
+            order["transfers_in"] = table["transfers_in"]
+        try:
+            self.orders.insert_one(order)
+        except DuplicateKeyError:
+            # Önceki deneme arşivleyip stoğu düşmeden kesilmiş olabilir; aşağıda tamamlanır
+            logger.info(f"Masa {table_number} siparişi zaten arşivlenmiş: {checkout_id}")
+        
+        # Stok düşümü ve kapanış kaydı, kesilen kapatmayı tamamlayan tekrar deneme
+        # dahil sadece stoğu sahiplenen çağrıda yapılır (eşzamanlı denemelerde bir kez)
+        archived = self._apply_order_stock(table["current_order"], checkout_id)
+        if archived is not None:
+            self._log_table_event(
+                table_number, "closed", archived["closed_at"],
+                order_id=table.get("order_id"), opened_at=table.get("opened_at"),
+                business_day=archived["business_day"]
+            )
+        
+        # 3) Masayı temizle ve sahipliği bırak
+        self._clear_table(table_number, checkout_id)
+        logger.info(f"Masa {table_number} kapatıldı, toplam: {format_tl(total)}")
+        return True
+    
+    def _clear_table(self, table_number: int, checkout_id: str, session=None):
+        """checkout_id ile sahiplenilmiş masanın adisyonunu ve ödemelerini temizle"""
+        self.tables.update_one(
+            {"table_number": table_number, "checkout_id": checkout_id},
+            {
+                "$set": {"current_order": [], "status": "Boş"},
+                "$inc": {"version": 1},
+                "$unset": dict(
+                    {field: "" for field in CLAIM_FIELDS},
+                    opened_at="", order_id="", paid_total="", paid_items="", payments="",
+                    transfers_in=""
+                )
+            },
+            session=session
+        )
+    
+    def _stale_claim(self, table_number: int) -> Optional[Dict]:
+        """Sahibi CLAIM_TTL_SECONDS içinde bitirmemiş sahiplenmeyi getir"""
+        from datetime import timedelta
+        expired = self.calendar.utc_now() - timedelta(seconds=CLAIM_TTL_SECONDS)
+        return self.tables.find_one({
+            "table_number": table_number,
+            "checkout_id": {"$exists": True},
+            # claimed_at'i olmayan eski sahiplenmeler de yarıda kalmış sayılır
+            "$or": [{"claimed_at": {"$lt": expired}}, {"claimed_at": {"$exists": False}}]
         })
+    
+    def _resume_claim(self, table: Dict) -> bool:
+        """Yarıda kalmış hesap kapatmayı kaydedilen anahtar, tür ve toplamla tamamla"""
+        if "transfer_to" in table:
+            return self._resume_transfer(table)
+        logger.warning(
+            f"Masa {table['table_number']} yarıda kalmış kapatma tamamlanıyor: {table['checkout_id']}"
+        )
+        return self.close_order(
+            table["table_number"], table.get("checkout_total"), table["checkout_id"],
+            table.get("checkout_method", PAYMENT_METHODS[0])
+        )
+    
+    def _resume_transfer(self, table: Dict) -> bool:
+        """
+        Yarıda kalmış masa taşımasını tamamla veya geri al
+        
+        Hedefe yazma, taşıma anahtarını hedefin transfers_in listesine ekler
+        (hedef sonradan kapatıldıysa arşivlenen siparişte durur). Anahtar
+        bulunursa kaynak temizlenir, bulunmazsa adisyon kaynakta bırakılır.
+        
+        Returns:
+            Taşıma tamamlandıysa True
+        """
+        source, target, transfer_id = table["table_number"], table["transfer_to"], table["checkout_id"]
+        dst = self.tables.find_one({"table_number": target, "transfers_in": transfer_id}, {"order_id": 1})
+        if dst is None and not self.orders.count_documents({"transfers_in": transfer_id}, limit=1):
+            logger.warning(f"Masa {source} yarıda kalmış taşıma geri alınıyor: {transfer_id}")
+            self._release_claim(source, transfer_id)
+            return False
+        
+        logger.warning(f"Masa {source} yarıda kalmış taşıma tamamlanıyor -> Masa {target}: {transfer_id}")
+        # Kaynağın kayıtlı ödemeleri hedef adisyona bağlanır (hedef kapandıysa arşivdekine)
+        order_id = (dst or {}).get("order_id") or (
+            self.orders.find_one({"transfers_in": transfer_id}, {"order_id": 1}) or {}
+        ).get("order_id")
+        if table.get("order_id") and order_id and table["order_id"] != order_id:
+            self.payments.update_many({"order_id": table["order_id"]}, {"$set": {"order_id": order_id}})
+        self._clear_table(source, transfer_id)
+        self._log_table_event(source, "moved", self.calendar.utc_now(), to=target, recovered=True)
+        return True
+    
+    def recover_stale_claims(self) -> int:
+        """Açılışta yarıda kalmış tüm sahiplenmeleri (kapatma, taşıma) tamamla; tamamlanan sayısını döndür"""
+        recovered = 0
+        for table in self.tables.find({"checkout_id": {"$exists": True}}, {"table_number": 1}):
+            stale = self._stale_claim(table["table_number"])
+            if stale and self._resume_claim(stale):
+                recovered += 1
+        return recovered
+    
+    def _log_table_event(self, table_number: int, event: str, at, opened_at=None, **fields):
+        """
+        Masa durum geçişini table_events'e ekle
+        
+        Kapanışlarda açılış anı ve oturma süresi (saniye) de yazılır; raporlar
+        sadece bu kısa belgeleri okur.
+        """
+        record = {
+            "table_number": table_number,
+            "event": event,
+            "at": at,
+            "business_day": self.current_business_day(at)
+        }
+        if opened_at is not None:
+            record["opened_at"] = opened_at
+            record["seconds"] = max(0, int((at - opened_at).total_seconds()))
+        record.update(fields)
+        self.table_events.insert_one(record)
+    
+    # Masa taşıma işlemleri
+    def _run_transaction(self, callback):
+        """
+        callback(session) işlemini transaction içinde çalıştır
+        
+        Sunucu transaction desteklemiyorsa (tek sunuculu kurulum) callback
+        session olmadan çalıştırılır; bu durumda callback kendi sahiplenme
+        adımlarıyla tutarlılığı sağlamalıdır.
+        """
+        if self._transactions_supported is not False:
+            try:
+                with self.client.start_session() as session:
+                    result = session.with_transaction(callback)
+                self._transactions_supported = True
+                return result
+            except NotImplementedError:
+                self._transactions_supported = False
+            except OperationFailure as e:
+                # 20: IllegalOperation (replica set olmayan sunucu)
+                if e.code != 20:
+                    raise
+                self._transactions_supported = False
+                logger.info("Sunucu transaction desteklemiyor, sahiplenme ile devam ediliyor")
+        return callback(None)
+    
+    @classmethod
+    def _merge_order_lines(cls, target: List[Dict], source: List[Dict]) -> List[Dict]:
+        """Aynı ürün ve koltuktaki satırların adetlerini birleştir"""
+        merged = [dict(item) for item in target]
+        index = {cls.line_key(item): item for item in merged}
+        for item in source:
+            line = index.get(cls.line_key(item))
+            if line is None:
+                line = dict(item)
+                merged.append(line)
+                index[cls.line_key(line)] = line
+            else:
+                line["quantity"] += item["quantity"]
+                line["total"] += item["total"]
+        return merged
+    
+    def _move_order(self, source: int, target: int, merge: bool) -> Dict:
+        """
+        Kaynak masanın adisyonunu (ödemeleriyle) hedef masaya taşı
+        
+        Kaynak önce close_order gibi bir anahtarla sahiplenilir, hedef ise
+        okunduğu sürümle koşullu güncellenir; araya başka bir yazma girerse
+        işlem geri alınır. Transaction varsa üç adım tek transaction'dır.
+        Yoksa hedefe yazma taşıma anahtarını da kaydeder; kaynak temizlenmeden
+        kesilen bir taşıma CLAIM_TTL_SECONDS sonra tamamlanır (_resume_transfer).
+        """
+        if source == target:
+            raise ValueError("Kaynak ve hedef masa aynı olamaz!")
+        transfer_id = uuid.uuid4().hex
+        # Önceki yarım kalmış sahiplenmeler bu taşımayı engellemesin
+        for table_number in (source, target):
+            stale = self._stale_claim(table_number)
+            if stale:
+                self._resume_claim(stale)
+        
+        def move(session):
+            dst = self.tables.find_one({"table_number": target}, session=session)
+            if not dst:
+                raise ValueError(f"Masa {target} bulunamadı!")
+            if "checkout_id" in dst:
+                raise ValueError(f"Masa {target} hesabı şu anda kapatılıyor!")
+            if dst.get("current_order") and not merge:
+                raise ValueError(f"Masa {target} dolu, masaları birleştirin!")
+            
+            # 1) Kaynak adisyonu sahiplen
+            src = self.tables.find_one_and_update(
+                {"table_number": source, "status": "Dolu", "checkout_id": {"$exists": False}},
+                {
+                    "$set": {
+                        "checkout_id": transfer_id,
+                        "claimed_at": self.calendar.utc_now(),
+                        "transfer_to": target
+                    },
+                    "$inc": {"version": 1}
+                },
+                return_document=ReturnDocument.AFTER,
+                session=session
+            )
+            if not src or not src.get("current_order"):
+                if src:
+                    self._release_claim(source, transfer_id, session)
+                raise ValueError(f"Masa {source} üzerinde taşınacak açık adisyon yok!")
+            
+            # 2) Hedefe birleştirilmiş adisyonu yaz (hedef okunduğundan beri değişmediyse)
+            order_id = dst.get("order_id") or src.get("order_id") or uuid.uuid4().hex
+            payments = dst.get("payments", []) + [
+                dict(payment, order_id=order_id) for payment in src.get("payments", [])
+            ]
+            paid_items = dict(dst.get("paid_items", {}))
+            for key, quantity in src.get("paid_items", {}).items():
+                paid_items[key] = paid_items.get(key, 0) + quantity
+            opened = [t["opened_at"] for t in (src, dst) if t.get("opened_at")]
+            
+            result = self.tables.update_one(
+                {
+                    "table_number": target,
+                    "version": dst.get("version"),
+                    "checkout_id": {"$exists": False}
+                },
+                {
+                    "$set": {
+                        "current_order": self._merge_order_lines(
+                            dst.get("current_order", []), src["current_order"]
+                        ),
+                        "status": "Dolu",
+                        "opened_at": min(opened) if opened else self.calendar.utc_now(),
+                        "order_id": order_id,
+                        "paid_total": dst.get("paid_total", 0) + src.get("paid_total", 0),
+                        "paid_items": paid_items,
+                        "payments": payments,
+                        # Taşıma niyeti hedefle aynı yazmada kaydedilir (kurtarma için)
+                        "transfers_in": dst.get("transfers_in", []) + src.get("transfers_in", []) + [transfer_id]
+                    },
+                    "$inc": {"version": 1}
+                },
+                session=session
+            )
+            if not result.matched_count:
+                self._release_claim(source, transfer_id, session)
+                raise ValueError(f"Masa {target} bu sırada değişti, lütfen tekrar deneyin")
+            
+            # Kaynağın kayıtlı ödemeleri hedef adisyona bağlanır
+            if src.get("order_id") and src["order_id"] != order_id:
+                self.payments.update_many(
+                    {"order_id": src["order_id"]},
+                    {"$set": {"order_id": order_id}},
+                    session=session
+                )
+            
+            # 3) Kaynak masayı temizle
+            self._clear_table(source, transfer_id, session)
+            return self.tables.find_one({"table_number": target}, session=session)
         
-        # Masayı temizle
+        table = self._run_transaction(move)
+        # Taşıma bir devir sayılmaz; oturma süresi adisyonun kapandığı masaya yazılır
+        self._log_table_event(source, "moved", self.calendar.utc_now(), to=target, merged=merge)
+        logger.info(
+            f"Masa {source} {'birleştirildi' if merge else 'taşındı'} -> Masa {target}, "
+            f"toplam: {format_tl(sum(item['total'] for item in table['current_order']))}"
+        )
+        return table
+    
+    def _release_claim(self, table_number: int, claim_id: str, session=None):
+        """Yarıda bırakılan sahiplenmeyi geri al (adisyon değişmeden kalır)"""
         self.tables.update_one(
-            {"table_number": table_number},
-            {"$set": {"current_order": [], "status": "Boş"}}
+            {"table_number": table_number, "checkout_id": claim_id},
+            {"$unset": {field: "" for field in CLAIM_FIELDS}, "$inc": {"version": 1}},
+            session=session
+        )
+    
+    def transfer_order(self, source: int, target: int) -> Dict:
+        """
+        Açık adisyonu boş bir masaya taşı
+        
+        Returns:
+            Hedef masanın güncel belgesi
+        """
+        return self._move_order(source, target, merge=False)
+    
+    def merge_tables(self, source: int, target: int) -> Dict:
+        """
+        Kaynak masanın adisyonunu hedef masanınkiyle birleştir
+        
+        Aynı ürün ve koltuktaki satırların adetleri toplanır, ödemeler ve
+        ödenen adetler hedef adisyona aktarılır; kaynak masa boşalır.
+        
+        Returns:
+            Hedef masanın güncel belgesi
+        """
+        return self._move_order(source, target, merge=True)
+    
+    # Ödeme işlemleri
+    @staticmethod
+    def line_key(item: Dict) -> str:
+        """Adisyon satırı anahtarı (aynı ürün farklı koltuklarda ayrı satırdır)"""
+        key = Database._item_key(item)
+        seat = item.get("seat")
+        return key if seat is None else f"{key}@{seat}"
+    
+    def _open_order(self, table_number: int) -> Dict:
+        """Ödeme alınabilecek açık adisyonu getir (eski adisyonlara order_id atanır)"""
+        table = self.get_table(table_number)
+        if not table:
+            raise ValueError("Masa bulunamadı!")
+        if table.get("status") != "Dolu" or not table.get("current_order"):
+            raise ValueError("Masada açık adisyon yok!")
+        if "checkout_id" in table:
+            raise ValueError("Masanın hesabı şu anda kapatılıyor!")
+        if not table.get("order_id"):
+            self.tables.update_one(
+                {"table_number": table_number, "order_id": None},
+                {"$set": {"order_id": uuid.uuid4().hex}, "$inc": {"version": 1}}
+            )
+            table = self.get_table(table_number)
+        return table
+    
+    def _payment_state(self, table: Dict) -> Dict:
+        """Masa belgesinden toplam, ödenen ve satır bazında ödenen adetleri çıkar"""
+        paid_items = table.get("paid_items", {})
+        items = table.get("current_order", [])
+        lines = []
+        for item in items:
+            key = self.line_key(item)
+            lines.append({
+                "key": key,
+                "name": item["product"].get("name", ""),
+                "seat": item.get("seat"),
+                "unit_price": item.get("unit_price", item["product"]["price"]),
+                "quantity": item["quantity"],
+                "paid_quantity": paid_items.get(key, 0)
+            })
+        total = sum(item["total"] for item in items)
+        paid = table.get("paid_total", 0)
+        return {
+            "table_number": table["table_number"],
+            "order_id": table.get("order_id"),
+            "total": total,
+            "paid": paid,
+            "balance": total - paid,
+            "lines": lines,
+            "payments": table.get("payments", [])
+        }
+    
+    def get_payment_state(self, table_number: int) -> Dict:
+        """
+        Açık adisyonun ödeme durumunu getir
+        
+        Returns:
+            {"order_id", "total", "paid", "balance" (kuruş), "payments": [...],
+             "lines": [{"key", "name", "seat", "unit_price", "quantity", "paid_quantity"}, ...]}
+        """
+        return self._payment_state(self._open_order(table_number))
+    
+    def _new_payment(self, table: Dict, amount: int, method: str, split: str,
+                     payment_id: str, **fields) -> Dict:
+        """Ödeme belgesi oluştur (kapatılmış güne yazılmaz, bkz. current_business_day)"""
+        now = self.calendar.utc_now()
+        payment = {
+            "payment_id": payment_id,
+            "order_id": table.get("order_id"),
+            "table_number": table["table_number"],
+            "amount": amount,
+            "method": method,
+            "split": split,
+            "items": [],
+            "date": now,
+            "business_day": self.current_business_day(now)
+        }
+        payment.update(fields)
+        return payment
+    
+    def _build_payment(self, table: Dict, state: Dict, split: str, method: str, payment_id: str,
+                       items: Optional[Dict[str, int]], seat: Optional[int],
+                       parts: Optional[int]) -> Dict:
+        """Bölüşüme göre ödeme tutarını ve ödenen satır adetlerini hesapla"""
+        lines = {line["key"]: line for line in state["lines"]}
+        paid_lines = {}
+        fields = {}
+        if split == "item":
+            if not items:
+                raise ValueError("Ödenecek ürün seçilmedi!")
+            for key, quantity in items.items():
+                line = lines.get(key)
+                if line is None:
+                    raise ValueError("Ürün adisyonda bulunamadı!")
+                unpaid = line["quantity"] - line["paid_quantity"]
+                if quantity < 1 or quantity > unpaid:
+                    raise ValueError(f"{line['name']} için en fazla {unpaid} adet ödenebilir!")
+                paid_lines[key] = quantity
+        elif split == "seat":
+            paid_lines = {
+                key: line["quantity"] - line["paid_quantity"]
+                for key, line in lines.items()
+                if line["seat"] == seat and line["quantity"] > line["paid_quantity"]
+            }
+            if not paid_lines:
+                raise ValueError(f"Koltuk {seat} için ödenecek ürün yok!")
+            fields["seat"] = seat
+        
+        if paid_lines:
+            amount = sum(lines[key]["unit_price"] * quantity for key, quantity in paid_lines.items())
+        elif split == "equal":
+            if not parts or parts < 1:
+                raise ValueError("Kişi sayısı en az 1 olmalı")
+            # Kalan tutar kalan kişilere bölünür; artan kuruşlar ilk paylara eklenir
+            amount = split_amount(state["balance"], parts)[0]
+            fields["parts"] = parts
+        else:
+            amount = state["balance"]
+        
+        if amount <= 0:
+            raise ValueError("Ödenecek tutar kalmadı!")
+        if amount > state["balance"]:
+            raise ValueError("Ödeme kalan tutarı aşıyor!")
+        
+        fields["items"] = [
+            {
+                "key": key,
+                "name": lines[key]["name"],
+                "seat": lines[key]["seat"],
+                "quantity": quantity,
+                "amount": lines[key]["unit_price"] * quantity
+            }
+            for key, quantity in paid_lines.items()
+        ]
+        return self._new_payment(table, amount, method, split, payment_id, **fields)
+    
+    def record_payment(self, table_number: int, split: str = "full", method: str = PAYMENT_METHODS[0],
+                       items: Optional[Dict[str, int]] = None, seat: Optional[int] = None,
+                       parts: Optional[int] = None, payment_id: Optional[str] = None) -> Dict:
+        """
+        Açık adisyona (kısmi) ödeme al
+        
+        Ödeme masadaki paid_total üzerinden karşılaştır-ve-değiştir ile
+        kaydedilir: eşzamanlı iki ödeme aynı tutarı veya aynı satırı iki kez
+        tahsil edemez. Ödeme ayrıca payments koleksiyonuna ayrı bir belge
+        olarak yazılır. Kalan tutar sıfırlanınca hesap kapatılır; yarıda kalan
+        bu kapatma aynı payment_id ile tekrar denenince tamamlanır.
+        
+        Args:
+            table_number: Masa numarası
+            split: "full" (kalanın tamamı), "item" (seçilen satır adetleri),
+                   "seat" (koltuğun ödenmemiş satırları) veya "equal" (kalanın eşit payı)
+            method: Ödeme türü (PAYMENT_METHODS)
+            items: split="item" için {satır anahtarı: adet}
+            seat: split="seat" için koltuk numarası
+            parts: split="equal" için henüz ödemeyen kişi sayısı
+            payment_id: Ödemenin tekil anahtarı; aynı anahtarla tekrar denemek güvenlidir
+        
+        Returns:
+            {"payment": dict, "balance": int (kuruş), "closed": bool}
+        """
+        if split not in PAYMENT_SPLITS:
+            raise ValueError(f"Geçersiz bölüşüm: {split}")
+        if method not in PAYMENT_METHODS:
+            raise ValueError(f"Geçersiz ödeme türü: {method}")
+        payment_id = payment_id or uuid.uuid4().hex
+        
+        # Hesap bu ödemeyle daha önce kapanmış olabilir
+        payment = self.payments.find_one({"payment_id": payment_id}, {"_id": 0})
+        if payment and not self.tables.count_documents({"payments.payment_id": payment_id}, limit=1):
+            return {"payment": payment, "balance": 0, "closed": True}
+        
+        # Bu ödemenin başlattığı kapatma yarıda kalmış; aynı anahtarla tamamla
+        table = self.get_table(table_number)
+        if table and table.get("checkout_id") == payment_id:
+            payment = next(
+                (p for p in table.get("payments", []) if p["payment_id"] == payment_id), payment
+            )
+            self._insert_payments([payment])
+            closed = self.close_order(
+                table_number, None, payment_id, table.get("checkout_method", method)
+            )
+            return {"payment": payment, "balance": 0, "closed": closed}
+        
+        for _ in range(3):
+            table = self._open_order(table_number)
+            payment = next(
+                (p for p in table.get("payments", []) if p["payment_id"] == payment_id), None
+            )
+            if payment:
+                break
+            
+            state = self._payment_state(table)
+            payment = self._build_payment(table, state, split, method, payment_id, items, seat, parts)
+            increments = {"paid_total": payment["amount"], "version": 1}
+            for line in payment["items"]:
+                increments[f"paid_items.{line['key']}"] = line["quantity"]
+            # Araya giren başka bir ödeme paid_total'ı değiştirdiyse eşleşmez
+            result = self.tables.update_one(
+                {
+                    "table_number": table_number,
+                    "order_id": state["order_id"],
+                    "checkout_id": {"$exists": False},
+                    "paid_total": state["paid"] or {"$in": [0, None]}
+                },
+                {"$inc": increments, "$push": {"payments": payment}}
+            )
+            if result.matched_count:
+                break
+        else:
+            raise ValueError("Ödeme kaydedilemedi, lütfen tekrar deneyin")
+        
+        self._insert_payments([payment])
+        table = self.get_table(table_number)
+        balance = 0
+        if table and table.get("order_id") == payment["order_id"]:
+            balance = self._payment_state(table)["balance"]
+        closed = False
+        if balance <= 0:
+            closed = self.close_order(table_number, None, payment_id, method)
+        logger.info(
+            f"Masa {table_number} ödeme alındı: {format_tl(payment['amount'])} "
+            f"({payment['method']}, {payment['split']}), kalan: {format_tl(max(balance, 0))}"
+        )
+        return {"payment": payment, "balance": max(balance, 0), "closed": closed}
+    
+    def _insert_payments(self, payments: List[Dict]):
+        """Ödemeleri payments koleksiyonuna yaz (daha önce yazılmış olanlar atlanır)"""
+        from pymongo.errors import BulkWriteError
+        
+        if not payments:
+            return
+        try:
+            self.payments.insert_many([dict(payment) for payment in payments], ordered=False)
+        except BulkWriteError as e:
+            if any(error["code"] != 11000 for error in e.details.get("writeErrors", [])):
+                raise
+    
+    # Mutfak işlemleri
+    @staticmethod
+    def _item_key(item: Dict) -> str:
+        """Sipariş kalemini ürününe göre eşleştirmek için anahtar"""
+        product = item.get("product", {})
+        return str(product.get("_id", product.get("name", "")))
+    
+    def _create_kitchen_ticket(self, table_number: int, previous_items: List[Dict],
+                               order_items: List[Dict]) -> Optional[Dict]:
+        """Önceki adisyona göre sadece yeni eklenen adetler için mutfak fişi oluştur"""
+        def quantities(items):
+            totals = {}
+            for item in items:
+                key = self._item_key(item)
+                totals[key] = totals.get(key, 0) + item.get("quantity", 0)
+            return totals
+        
+        previous_quantities = quantities(previous_items)
+        new_quantities = quantities(order_items)
+        
+        ticket_items = []
+        for item in order_items:
+            key = self._item_key(item)
+            added = new_quantities.pop(key, 0) - previous_quantities.get(key, 0)
+            if added > 0:
+                product = item.get("product", {})
+                ticket_items.append({
+                    "name": product.get("name", ""),
+                    "category": product.get("category", "Diğer"),
+                    "quantity": added
+                })
+        
+        return self._insert_kitchen_ticket(table_number, ticket_items)
+    
+    def _insert_kitchen_ticket(self, table_number: int, ticket_items: List[Dict]) -> Optional[Dict]:
+        """Mutfak fişini kaydet"""
+        if not ticket_items:
+            return None
+        
+        ticket = {
+            "_id": ObjectId(),
+            "table_number": table_number,
+            "items": ticket_items,
+            "status": KITCHEN_STATUSES[0],
+            "created_at": self.calendar.utc_now()
+        }
+        # updated_at sunucu saatiyle yazılır; terminal saatleri kaysa da yoklama
+        # sırası bozulmaz
+        self.kitchen_tickets.update_one(
+            {"_id": ticket["_id"]},
+            [{"$set": dict(ticket, updated_at="$$NOW")}],
+            upsert=True
+        )
+        return ticket
+    
+    def get_active_kitchen_tickets(self, limit: int = 100, session=None) -> List[Dict]:
+        """Tamamlanmamış mutfak fişlerini eskiden yeniye getir"""
+        return list(
+            self.kitchen_tickets.find({"status": {"$ne": KITCHEN_STATUSES[-1]}}, session=session)
+            .sort("created_at", 1)
+            .limit(limit)
+        )
+    
+    def get_kitchen_snapshot(self, limit: int = 100) -> Tuple[List[Dict], object, object]:
+        """
+        Aktif fişleri, izlemenin kaldığı yerden devam edebileceği zamanlarla getir
+        
+        Returns:
+            (fişler, change stream için işlem zamanı (tek sunucuda None),
+             yoklama için okumadan önceki sunucu saati)
+        """
+        server_time = self.server_time()
+        with self.client.start_session() as session:
+            tickets = self.get_active_kitchen_tickets(limit, session=session)
+            operation_time = session.operation_time
+        return tickets, operation_time, server_time
+    
+    def server_time(self):
+        """Veritabanı sunucusunun saati ($$NOW ile yazılan alanlarla karşılaştırmak için)"""
+        return self.client.admin.command("hello")["localTime"]
+    
+    def get_kitchen_tickets_since(self, since) -> List[Dict]:
+        """Verilen andan (sunucu saati) sonra oluşturulan veya durumu değişen fişleri getir"""
+        return list(self.kitchen_tickets.find({"updated_at": {"$gt": since}}).sort("updated_at", 1))
+    
+    def update_kitchen_ticket_status(self, ticket_id, status: str):
+        """Mutfak fişinin durumunu güncelle (hazırlanıyor / tamamlandı)"""
+        if status not in KITCHEN_STATUSES:
+            raise ValueError(f"Geçersiz fiş durumu: {status}")
+        self.kitchen_tickets.update_one(
+            {"_id": ticket_id},
+            [{"$set": {"status": status, "updated_at": "$$NOW"}}]
         )
-        logger.info(f"Masa {table_number} kapatıldı, toplam: {total} TL")
     
     # Ürün işlemleri
     def get_all_products(self) -> List[Dict]:
@@ -179,78 +1415,1266 @@ class Database:
             categorized[category].append(product)
         return categorized
     
-    def add_product(self, name: str, price: float, category: str):
-        """Yeni ürün ekle"""
-        self.products.insert_one({
+    def get_catalog_version(self) -> int:
+        """Ürün kataloğu her değiştiğinde artan sürüm"""
+        state = self.meta.find_one({"_id": "catalog"}) or {}
+        return state.get("version", 0)
+    
+    def _bump_catalog_version(self):
+        self.meta.update_one({"_id": "catalog"}, {"$inc": {"version": 1}}, upsert=True)
+    
+    def add_product(self, name: str, price: int, category: str, stock: Optional[int] = None,
+                    low_stock: int = 0, recipe: Optional[List[Dict]] = None):
+        """
+        Yeni ürün ekle (fiyat kuruş cinsinden)
+        
+        Args:
+            stock: Stok adedi; None ise ürünün stoğu takip edilmez
+            low_stock: Stok bu değere düştüğünde uyarı verilir
+            recipe: [{"product_id", "quantity"}] - satıldığında stoğu düşülecek bileşenler
+        """
+        product = {
             "name": name,
             "price": price,
-            "category": category
-        })
+            "category": category,
+            "search_keys": name_tokens(name)
+        }
+        if stock is not None:
+            product["stock"] = stock
+            product["low_stock"] = low_stock
+        if recipe:
+            product["recipe"] = recipe
+        self.products.insert_one(product)
+        self._bump_catalog_version()
         logger.info(f"Ürün eklendi: {name}")
     
+    def search_products(self, query: str, limit: int = 10) -> List[Dict]:
+        """Ürün adında kelime öneki araması yap (search_keys indeksi üzerinden)"""
+        tokens = name_tokens(query)
+        if not tokens:
+            return []
+        
+        # Her kelime için indekslenebilir, başa sabitlenmiş regex
+        match_query = {
+            "$and": [
+                {"search_keys": {"$regex": f"^{re.escape(token)}"}}
+                for token in tokens
+            ]
+        }
+        results = list(self.products.find(match_query))
+        normalized_query = " ".join(tokens)
+        results.sort(key=lambda p: rank_key(p, normalized_query))
+        return results[:limit]
+    
+    def get_product(self, product_id) -> Optional[Dict]:
+        """Tek bir ürünü getir"""
+        return self.products.find_one({"_id": product_id})
+    
     def delete_product(self, product_id):
         """Ürün sil"""
         self.products.delete_one({"_id": product_id})
+        self._bump_catalog_version()
         logger.info(f"Ürün silindi: {product_id}")
     
+    # Stok işlemleri
+    def set_stock(self, product_id, stock: Optional[int], low_stock: Optional[int] = None):
+        """Sayım sonrası stoğu ayarla (None ise stok takibi kapatılır)"""
+        if stock is None:
+            self.products.update_one({"_id": product_id}, {"$unset": {"stock": "", "low_stock": ""}})
+            return
+        fields = {"stock": stock}
+        if low_stock is not None:
+            fields["low_stock"] = low_stock
+        # Sayımdan sonra eşik tekrar aşılırsa yeniden uyarılır
+        self.products.update_one({"_id": product_id}, {"$set": fields, "$unset": {"low_stock_alerted": ""}})
+    
+    def adjust_stock(self, product_id, delta: int):
+        """Mal kabulü veya fire için stoğu artır/azalt (sadece takip edilen ürünlerde)"""
+        self.products.bulk_write([
+            UpdateOne({"_id": product_id, "stock": {"$ne": None}}, {"$inc": {"stock": delta}}),
+            # Stok eşiğin üstüne çıktıysa uyarı yeniden kurulur
+            UpdateOne(
+                {
+                    "_id": product_id,
+                    "low_stock_alerted": {"$exists": True},
+                    "$expr": {"$gt": ["$stock", {"$ifNull": ["$low_stock", 0]}]}
+                },
+                {"$unset": {"low_stock_alerted": ""}}
+            )
+        ])
+    
+    def set_recipe(self, product_id, components: List[Dict]):
+        """Ürünün satışta stoğu düşülecek bileşenlerini ayarla ([{"product_id", "quantity"}])"""
+        if components:
+            self.products.update_one({"_id": product_id}, {"$set": {"recipe": components}})
+        else:
+            self.products.update_one({"_id": product_id}, {"$unset": {"recipe": ""}})
+        # Reçete siparişe gömülü üründen okunduğu için terminaller kataloğu yenilemeli
+        self._bump_catalog_version()
+    
+    def get_stock_levels(self) -> Dict:
+        """Stoğu takip edilen ürünler: ürün _id -> stok adedi"""
+        return {
+            product["_id"]: product["stock"]
+            for product in self.products.find({"stock": {"$ne": None}}, {"stock": 1})
+        }
+    
+    def get_low_stock_products(self) -> List[Dict]:
+        """Stoğu uyarı eşiğine (veya altına) inmiş ürünler"""
+        return list(self.products.find(
+            {
+                "stock": {"$ne": None},
+                "$expr": {"$lte": ["$stock", {"$ifNull": ["$low_stock", 0]}]}
+            },
+            {"name": 1, "stock": 1, "low_stock": 1}
+        ).sort("stock", 1))
+    
+    def get_stock_alerts(self, since=None, limit: int = 50) -> List[Dict]:
+        """Stok uyarıları (en yeniden eskiye)"""
+        match_query = {"created_at": {"$gt": since}} if since is not None else {}
+        return list(
+            self.stock_alerts.find(match_query, {"_id": 0})
+            .sort("created_at", DESCENDING)
+            .limit(limit)
+        )
+    
+    @staticmethod
+    def _stock_consumption(items: List[Dict]) -> Dict:
+        """Sipariş kalemlerinden ürün _id -> düşülecek adet (reçeteler açılarak)"""
+        consumption = {}
+        for item in items:
+            product = item.get("product", {})
+            components = product.get("recipe") or [{"product_id": product.get("_id"), "quantity": 1}]
+            for component in components:
+                product_id = component["product_id"]
+                if product_id is None:
+                    continue
+                consumption[product_id] = (
+                    consumption.get(product_id, 0) + component["quantity"] * item.get("quantity", 0)
+                )
+        return consumption
+    
+    def _apply_order_stock(self, items: List[Dict], checkout_id: str) -> Optional[Dict]:
+        """
+        Arşivlenen siparişin stoğunu bir kez düş
+        
+        stock_applied False -> "pending" geçişi find_one_and_update ile atomik
+        yapılır; sadece bunu kazanan çağrı stoğu düşer ve siparişi True olarak
+        işaretler, aynı anda tekrar deneyen kapatmalar eşleşmez.
+        
+        Returns:
+            Sahiplenildiyse siparişin closed_at ve business_day alanları, yoksa None
+        """
+        order = self.orders.find_one_and_update(
+            {"checkout_id": checkout_id, "stock_applied": False},
+            {"$set": {"stock_applied": "pending"}},
+            projection={"_id": 0, "closed_at": 1, "business_day": 1}
+        )
+        if order is None:
+            return None
+        self._consume_stock(items, checkout_id)
+        self.orders.update_one({"checkout_id": checkout_id}, {"$set": {"stock_applied": True}})
+        return order
+    
+    def _consume_stock(self, items: List[Dict], checkout_id: str):
+        """
+        Kapatılan siparişin stok düşümü - tek bulk_write
+        
+        Düşüm $inc ile yapıldığı için eşzamanlı kapatmalar birbirini ezmez;
+        stoğu takip edilmeyen ürünler filtreyle eşleşmez. Aynı bulk_write,
+        eşiğe inmiş ve henüz uyarılmamış ürünlere low_stock_alerted olarak
+        bu kapatmanın anahtarını yazar; eşiği aynı anda geçen kapatmalardan
+        sadece biri eşleşir ve uyarıyı o yazar. İşaret set_stock/adjust_stock
+        ile stok eşiğin üstüne çıkınca kalkar.
+        """
+        consumption = self._stock_consumption(items)
+        if not consumption:
+            return
+        requests = []
+        for product_id, quantity in consumption.items():
+            requests.append(
+                UpdateOne({"_id": product_id, "stock": {"$ne": None}}, {"$inc": {"stock": -quantity}})
+            )
+            requests.append(UpdateOne(
+                {
+                    "_id": product_id,
+                    "stock": {"$ne": None},
+                    "low_stock_alerted": {"$exists": False},
+                    "$expr": {"$lte": ["$stock", {"$ifNull": ["$low_stock", 0]}]}
+                },
+                {"$set": {"low_stock_alerted": checkout_id}}
+            ))
+        # Sıralı: işaret, aynı ürünün düşümünden sonra değerlendirilir
+        result = self.products.bulk_write(requests)
+        if not result.modified_count:
+            return
+        
+        now = self.calendar.utc_now()
+        alerts = [
+            {
+                "product_id": product["_id"],
+                "name": product.get("name", ""),
+                "stock": product["stock"],
+                "low_stock": product.get("low_stock", 0),
+                "created_at": now
+            }
+            for product in self.products.find(
+                {"_id": {"$in": list(consumption)}, "low_stock_alerted": checkout_id},
+                {"name": 1, "stock": 1, "low_stock": 1}
+            )
+        ]
+        if alerts:
+            self.stock_alerts.insert_many(alerts)
+            logger.warning(
+                "Stok azaldı: " + ", ".join(f"{alert['name']} ({alert['stock']})" for alert in alerts)
+            )
+    
+    # Fiyat kuralı işlemleri
+    @property
+    def pricing(self) -> PricingEngine:
+        """
+        Derlenmiş fiyat kuralları
+        
+        Kurallar sadece sürümleri değiştiğinde yeniden derlenir; sürüm en fazla
+        RULE_REFRESH_SECONDS'da bir kontrol edildiği için fiyat çözümü her
+        dokunuşta veritabanına gitmez.
+        """
+        now = time.monotonic()
+        if self._pricing is None or now - self._pricing_checked >= RULE_REFRESH_SECONDS:
+            self._pricing_checked = now
+            version = (self.meta.find_one({"_id": "pricing"}) or {}).get("version", 0)
+            if self._pricing is None or self._pricing.version != version:
+                self._pricing = PricingEngine(self.pricing_rules.find({"active": {"$ne": False}}), version)
+                logger.info(f"Fiyat kuralları derlendi: {self._pricing.rule_count} kural (sürüm {version})")
+        return self._pricing
+    
+    def _bump_pricing_version(self):
+        self.meta.update_one({"_id": "pricing"}, {"$inc": {"version": 1}}, upsert=True)
+        # Bu süreçte bir sonraki fiyat çözümünde hemen yeniden derlenir
+        self._pricing = None
+    
+    def price_product(self, product: Dict, zone: Optional[str] = None,
+                      order_products=(), moment=None) -> int:
+        """
+        Ürünün birim fiyatı (kuruş) - fiyat kurallarıyla
+        
+        Args:
+            product: Ürün
+            zone: Masanın bölgesi
+            order_products: Adisyondaki ürünlerin _id'leri (kombinasyonlar için)
+            moment: Fiyatlanacak an (varsayılan şimdi)
+        """
+        moment = self.calendar.to_local(moment or self.calendar.utc_now())
+        return self.pricing.resolve(product, moment, zone, order_products)[0]
+    
+    def price_order_items(self, table: Dict, items: List[Dict]) -> List[Dict]:
+        """
+        Kalemlere birim fiyat ve tutar yaz
+        
+        Masanın adisyonunda zaten bulunan satırlar kilitli fiyatlarını korur,
+        yeni satırlar o anki kurallarla fiyatlanır.
+        """
+        locked = {
+            self.line_key(item): item.get("unit_price", item["product"]["price"])
+            for item in table.get("current_order", [])
+        }
+        zone = table.get("zone", DEFAULT_ZONE)
+        order_products = [item["product"]["_id"] for item in items]
+        for item in items:
+            unit_price = locked.get(self.line_key(item))
+            if unit_price is None:
+                unit_price = self.price_product(item["product"], zone, order_products)
+            item["unit_price"] = unit_price
+            item["total"] = item["quantity"] * unit_price
+        return items
+    
+    def get_pricing_rules(self) -> List[Dict]:
+        """Tüm fiyat kuralları (pasifler dahil)"""
+        return list(self.pricing_rules.find().sort([("priority", ASCENDING), ("name", ASCENDING)]))
+    
+    def add_pricing_rule(self, rule: Dict):
+        """Fiyat kuralı ekle (tutarlar kuruş cinsinden)"""
+        validate_rule(rule)
+        rule = dict(rule)
+        rule.setdefault("name", rule["kind"])
+        rule.setdefault("active", True)
+        result = self.pricing_rules.insert_one(rule)
+        self._bump_pricing_version()
+        logger.info(f"Fiyat kuralı eklendi: {rule['name']}")
+        return result.inserted_id
+    
+    def set_pricing_rule_active(self, rule_id, active: bool):
+        """Fiyat kuralını aç/kapat"""
+        self.pricing_rules.update_one({"_id": rule_id}, {"$set": {"active": active}})
+        self._bump_pricing_version()
+    
+    def delete_pricing_rule(self, rule_id):
+        """Fiyat kuralını sil"""
+        self.pricing_rules.delete_one({"_id": rule_id})
+        self._bump_pricing_version()
+    
+    # Arşiv işlemleri
+    def _archive_state(self) -> Dict:
+        """Arşivlenmiş aylar ve sıcak koleksiyonun başladığı iş günü"""
+        return self.meta.find_one({"_id": "order_archives"}) or {}
+    
+    def _order_partitions(self, start_date=None, end_date=None) -> Tuple[List[str], Optional[str]]:
+        """
+        [start, end) aralığıyla kesişen arşiv koleksiyonlarını bul
+        
+        Returns:
+            (arşiv koleksiyon adları, sıcak koleksiyonda geçerli ilk iş günü)
+        """
+        from datetime import timedelta
+        state = self._archive_state()
+        months = sorted(state.get("months", {}))
+        if start_date is not None:
+            first = self.calendar.business_day(start_date)[:7]
+            months = [month for month in months if month >= first]
+        if end_date is not None:
+            last = self.calendar.business_day(end_date - timedelta(microseconds=1))[:7]
+            months = [month for month in months if month <= last]
+        return [archive_collection_name(month) for month in months], state.get("hot_from")
+    
+    def _aggregate_orders(self, match_query: Dict, stages: List[Dict],
+                          start_date=None, end_date=None):
+        """
+        Sipariş aggregation'ını ilgili tüm bölümlerde çalıştır
+        
+        Sıcak koleksiyon ve aralığa düşen arşiv ayları $unionWith ile
+        birleştirilir; aralık dışındaki aylar hiç okunmaz.
+        """
+        partitions, hot_from = self._order_partitions(start_date, end_date)
+        hot_match = match_query
+        if hot_from:
+            # Arşive taşınmış ama henüz silinmemiş kayıtlar iki kez sayılmasın
+            hot_match = {"$and": [match_query, {"business_day": {"$gte": hot_from}}]}
+        
+        pipeline = [{"$match": hot_match}]
+        for name in partitions:
+            pipeline.append({"$unionWith": {"coll": name, "pipeline": [{"$match": match_query}]}})
+        return self.orders.aggregate(pipeline + stages, allowDiskUse=True)
+    
+    def _build_daily_rollups(self, month: str) -> Dict[str, Dict]:
+        """
+        Bir ayın siparişlerinden günlük özetleri hesapla (yazmaz)
+        
+        Z raporu alınmış günlerin özeti rapordan kopyalanır, sadece
+        kapatılmamış günler siparişlerden hesaplanır.
+        
+        Returns:
+            {iş günü: {"revenue", "orders", "products", "payments"}}
+        """
+        days = {
+            report["_id"]: {
+                "revenue": report["revenue"], "orders": report["orders"],
+                "products": report["products"], "payments": report["payments"]
+            }
+            for report in self.z_reports.find({"_id": month_day_range(month)})
+        }
+        open_days = dict(month_day_range(month), **{"$nin": list(days)})
+        match_query = {"status": "Tamamlandı", "business_day": open_days}
+        for row in self.orders.aggregate([
+            {"$match": match_query},
+            {"$group": {"_id": "$business_day", "revenue": {"$sum": "$total"}, "orders": {"$sum": 1}}}
+        ], allowDiskUse=True):
+            days[row["_id"]] = {
+                "revenue": row["revenue"], "orders": row["orders"], "products": [], "payments": {}
+            }
+        
+        for row in self.orders.aggregate([
+            {"$match": match_query},
+            {"$unwind": "$items"},
+            {"$group": {
+                "_id": {"day": "$business_day", "name": "$items.product.name"},
+                "category": {"$first": {"$ifNull": ["$items.product.category", "Diğer"]}},
+                "quantity": {"$sum": "$items.quantity"},
+                "revenue": {"$sum": "$items.total"}
+            }}
+        ], allowDiskUse=True):
+            days[row["_id"]["day"]]["products"].append({
+                "name": row["_id"]["name"],
+                "category": row["category"],
+                "quantity": row["quantity"],
+                "revenue": row["revenue"]
+            })
+        
+        # Tahsilatlar ödeme türüne göre (kısmi ödemeler alındıkları güne sayılır)
+        for row in self.payments.aggregate([
+            {"$match": {"business_day": open_days}},
+            {"$group": {"_id": {"day": "$business_day", "method": "$method"}, "amount": {"$sum": "$amount"}}}
+        ]):
+            day = days.setdefault(
+                row["_id"]["day"], {"revenue": 0, "orders": 0, "products": [], "payments": {}}
+            )
+            day["payments"][row["_id"]["method"]] = row["amount"]
+        return days
+    
+    def _store_daily_rollups(self, month: str, days: Dict[str, Dict]) -> Dict:
+        """Günlük özetleri yaz (tekrar çalıştırılabilir) ve ayın toplamlarını döndür"""
+        now = self.calendar.utc_now()
+        for day, rollup in days.items():
+            self.daily_rollups.replace_one(
+                {"_id": day},
+                dict(rollup, month=month, built_at=now),
+                upsert=True
+            )
+        return {
+            "orders": sum(rollup["orders"] for rollup in days.values()),
+            "revenue": sum(rollup["revenue"] for rollup in days.values())
+        }
+    
+    def get_daily_rollups(self, month: str) -> List[Dict]:
+        """Arşivlenmiş bir ayın günlük özetlerini getir"""
+        return list(self.daily_rollups.find({"month": month}).sort("_id", 1))
+    
+    def rollover_orders(self, hot_months: int = DEFAULT_HOT_MONTHS, dry_run: bool = False) -> List[Dict]:
+        """
+        Kapanmış ayları sıcak orders koleksiyonundan aylık arşiv koleksiyonlarına taşı
+        
+        Her ay için sırasıyla: günlük özetler hesaplanır, siparişler arşiv
+        koleksiyonuna kopyalanıp sayıları doğrulanır, özetler yazılır, ay
+        arşiv listesine eklenir ve ancak bundan sonra sıcak koleksiyondan
+        silinir. Yarıda kalan bir taşıma tekrar çalıştırılarak tamamlanır;
+        arşiv listesine girmiş bir ay için sadece silme tekrarlanır.
+        
+        Args:
+            hot_months: Sıcak koleksiyonda kalacak ay sayısı (içinde bulunulan ay dahil)
+            dry_run: True ise sadece taşınacak ayları listele
+        
+        Returns:
+            [{"month": "YYYY-MM", "orders": int, "revenue": int}, ...]
+        """
+        from pymongo.errors import BulkWriteError
+        
+        if hot_months < 1:
+            raise ValueError("İçinde bulunulan ay arşivlenemez")
+        
+        # Sıcak koleksiyonda kalacak ilk ay
+        today = self.calendar.today()
+        year, month_index = today.year, today.month - (hot_months - 1)
+        while month_index < 1:
+            year, month_index = year - 1, month_index + 12
+        hot_from = f"{year:04d}-{month_index:02d}-01"
+        
+        months = sorted({
+            day[:7] for day in self.orders.distinct("business_day", {"business_day": {"$lt": hot_from}})
+        })
+        if dry_run:
+            return [{"month": month, "orders": None, "revenue": None} for month in months]
+        
+        archived_months = self._archive_state().get("months", {})
+        moved = []
+        for month in months:
+            name = archive_collection_name(month)
+            month_query = {"business_day": month_day_range(month)}
+            if month in archived_months:
+                # Önceki çalıştırma arşivi doğrulayıp kaydetmiş, silmeden önce kesilmiş;
+                # özetler yeniden hesaplanırsa silinmiş siparişler eksik sayılır
+                self.orders.delete_many(month_query)
+                logger.info(f"{month} ayının yarım kalan silmesi tamamlandı -> {name}")
+                moved.append(dict(archived_months[month], month=month))
+                continue
+            
+            days = self._build_daily_rollups(month)
+            expected = sum(rollup["orders"] for rollup in days.values())
+            
+            archive = self.db[name]
+            self._ensure_order_indexes(archive)
+            
+            batch = []
+            for order in self.orders.find(month_query).batch_size(1000):
+                batch.append(order)
+                if len(batch) >= 1000:
+                    self._insert_archive_batch(archive, batch, BulkWriteError)
+                    batch = []
+            if batch:
+                self._insert_archive_batch(archive, batch, BulkWriteError)
+            
+            archived = archive.count_documents({"status": "Tamamlandı"})
+            if archived != expected:
+                raise RuntimeError(
+                    f"{month} arşivi doğrulanamadı: {archived} / {expected} sipariş"
+                )
+            
+            totals = self._store_daily_rollups(month, days)
+            self.meta.update_one(
+                {"_id": "order_archives"},
+                {
+                    "$set": {f"months.{month}": totals},
+                    "$max": {"hot_from": month_day_range(month)["$lt"]}
+                },
+                upsert=True
+            )
+            self.orders.delete_many(month_query)
+            
+            logger.info(f"{month} ayı arşivlendi: {totals['orders']} sipariş -> {name}")
+            moved.append(dict(totals, month=month))
+        return moved
+    
+    @staticmethod
+    def _insert_archive_batch(archive, batch: List[Dict], bulk_error):
+        """Siparişleri arşive ekle; önceki yarım kalan taşımadan kalanları atla"""
+        try:
+            archive.insert_many(batch, ordered=False)
+        except bulk_error as e:
+            # Sadece mükerrer anahtar (11000) hataları beklenir
+            if any(error["code"] != 11000 for error in e.details.get("writeErrors", [])):
+                raise
+    
+    # Gün sonu işlemleri
+    def _closed_through(self) -> Optional[str]:
+        """Kapatılmış (Z raporu alınmış) son iş günü"""
+        state = self.meta.find_one({"_id": "business_days"}) or {}
+        return state.get("closed_through")
+    
+    def current_business_day(self, moment=None) -> str:
+        """
+        Satışların yazılacağı iş günü
+        
+        Gün kapatıldıktan sonra (gece servisi gibi) yapılan satışlar kapanmış
+        güne değil, ertesi iş gününe yazılır; Z raporu böylece değişmez.
+        """
+        from datetime import date, timedelta
+        day = self.calendar.business_day(moment or self.calendar.utc_now())
+        closed_through = self._closed_through()
+        if closed_through and day <= closed_through:
+            day = (date.fromisoformat(closed_through) + timedelta(days=1)).isoformat()
+        return day
+    
+    def get_open_tables(self) -> List[Dict]:
+        """Açık adisyonu olan masalar ve adisyon toplamları"""
+        return [
+            {"table_number": table["table_number"], "total": table["total"]}
+            for table in self.get_table_statuses(with_totals=True)
+            if table["status"] == "Dolu"
+        ]
+    
+    def close_business_day(self, day: Optional[str] = None, force: bool = False) -> Dict:
+        """
+        İş gününü kapat ve Z raporunu oluştur
+        
+        Gün önce kilitlenir (sonraki satışlar ertesi güne yazılır). Günün
+        siparişleri ve ödemeleri z_day ile damgalanır; açık gün kapatılırken
+        kilitten CLOSE_GRACE_SECONDS öncesine kadar tarihlenmiş olanlar
+        damgalanır, daha yenileri geç yazma sayılır. Sadece damgalı satırlar
+        tek aggregation'da ($unionWith + $facet) özetlenip z_reports'a bir kez
+        yazılır. Damgadan sonra güne düşen geç yazmalar ertesi güne taşınır
+        (bir sonraki kapatmada da tekrar bakılır). Aynı gün tekrar kapatılırsa
+        mevcut rapor döner.
+        
+        Args:
+            day: Kapatılacak iş günü (YYYY-AA-GG); verilmezse açık olan gün
+            force: Açık masa varken de kapat (masalar raporda listelenir)
+        
+        Returns:
+            Z raporu
+        """
+        from datetime import date, timedelta
+        current = self.current_business_day()
+        day = day or current
+        existing = self.z_reports.find_one({"_id": day})
+        if existing:
+            return existing
+        if day > current:
+            raise ValueError(f"Henüz başlamamış gün kapatılamaz: {day}")
+        
+        open_tables = self.get_open_tables() if day == current else []
+        if open_tables and not force:
+            numbers = ", ".join(str(table["table_number"]) for table in open_tables)
+            raise ValueError(f"Açık masalar var: {numbers}. Önce hesapları kapatın.")
+        
+        # Önceki kapatmadan sonra o güne düşmüş geç yazmalar
+        previous = self._closed_through()
+        if previous and previous < day:
+            self._move_late_writes(previous)
+        
+        # Önce kilitle: hesaplama sürerken kapanan hesaplar ertesi güne yazılır
+        self.meta.update_one(
+            {"_id": "business_days"}, {"$max": {"closed_through": day}}, upsert=True
+        )
+        # Rapora girecek satırlar damgalanır; damgasız kalanlar rapordan sonra taşınır.
+        # Kilitten hemen önce tarihlenenler kilidi görmeden yazılıyor olabilir; beklemek
+        # yerine (arayüzü dondurur) bunlar da geç yazma sayılır
+        stamp_query = {"business_day": day, "z_day": {"$exists": False}}
+        if day == current:
+            stamp_query["date"] = {"$lt": self.calendar.utc_now() - timedelta(seconds=CLOSE_GRACE_SECONDS)}
+        self.orders.update_many(dict(stamp_query, status="Tamamlandı"), {"$set": {"z_day": day}})
+        self.payments.update_many(stamp_query, {"$set": {"z_day": day}})
+        
+        start_date = self.calendar.day_start(date.fromisoformat(day))
+        end_date = self.calendar.day_start(date.fromisoformat(day) + timedelta(days=1))
+        is_order = {"$match": {"payment_method": {"$exists": False}}}
+        result = list(self._aggregate_orders(
+            {"status": "Tamamlandı", "business_day": day, "z_day": day},
+            [
+                # Günün ödemeleri de aynı geçişte okunur
+                {"$unionWith": {"coll": self.payments.name, "pipeline": [
+                    {"$match": {"business_day": day, "z_day": day}},
+                    {"$project": {"_id": 0, "payment_method": "$method", "amount": 1}}
+                ]}},
+                {"$facet": {
+                    "totals": [
+                        is_order,
+                        {"$group": {"_id": None, "revenue": {"$sum": "$total"}, "orders": {"$sum": 1}}}
+                    ],
+                    "products": [
+                        is_order,
+                        {"$unwind": "$items"},
+                        {"$group": {
+                            "_id": "$items.product.name",
+                            "category": {"$first": {"$ifNull": ["$items.product.category", "Diğer"]}},
+                            "quantity": {"$sum": "$items.quantity"},
+                            "revenue": {"$sum": "$items.total"},
+                            "list_revenue": {"$sum": ITEM_LIST_TOTAL}
+                        }},
+                        {"$sort": {"revenue": -1}}
+                    ],
+                    "payments": [
+                        {"$match": {"payment_method": {"$exists": True}}},
+                        {"$group": {"_id": "$payment_method", "amount": {"$sum": "$amount"}, "count": {"$sum": 1}}}
+                    ]
+                }}
+            ],
+            start_date,
+            end_date
+        ))[0]
+        
+        totals = result["totals"][0] if result["totals"] else {"revenue": 0, "orders": 0}
+        products = [
+            {"name": row["_id"], "category": row["category"], "quantity": row["quantity"],
+             "revenue": row["revenue"], "list_revenue": row["list_revenue"]}
+            for row in result["products"]
+        ]
+        categories = {}
+        for product in products:
+            category = categories.setdefault(product["category"], {"quantity": 0, "revenue": 0})
+            category["quantity"] += product["quantity"]
+            category["revenue"] += product["revenue"]
+        
+        report = {
+            "_id": day,
+            "revenue": totals["revenue"],
+            "orders": totals["orders"],
+            "average": totals["revenue"] // totals["orders"] if totals["orders"] else 0,
+            # Fiyat kuralları (happy hour, kombinasyon, bölge farkı) öncesi tutar
+            "list_revenue": sum(product["list_revenue"] for product in products),
+            "payments": {row["_id"]: row["amount"] for row in result["payments"]},
+            "payment_counts": {row["_id"]: row["count"] for row in result["payments"]},
+            "categories": [
+                dict(values, category=name)
+                for name, values in sorted(categories.items(), key=lambda c: -c[1]["revenue"])
+            ],
+            "products": products,
+            "open_tables": open_tables,
+            "closed_at": self.calendar.utc_now(),
+            # Rapora girmeyen geç yazmaların taşındığı gün
+            "late_writes_to": (date.fromisoformat(day) + timedelta(days=1)).isoformat()
+        }
+        try:
+            self.z_reports.insert_one(report)
+        except DuplicateKeyError:
+            # Başka bir terminal aynı anda kapattı; ilk yazılan rapor geçerlidir
+            return self.z_reports.find_one({"_id": day})
+        self._move_late_writes(day)
+        logger.info(
+            f"{day} iş günü kapatıldı: {report['orders']} sipariş, {format_tl(report['revenue'])}"
+        )
+        return report
+    
+    def _move_late_writes(self, day: str) -> int:
+        """
+        Kapatılmış güne Z raporundan sonra düşen (damgasız) sipariş ve ödemeleri
+        raporun late_writes_to gününe taşı; taşınan satır sayısını döndür
+        """
+        report = self.z_reports.find_one({"_id": day}, {"late_writes_to": 1})
+        # Damgalama öncesi kapatılmış günlerin satırları damgasızdır, taşınmaz
+        if not report or "late_writes_to" not in report:
+            return 0
+        target = {"$set": {"business_day": report["late_writes_to"]}}
+        moved = self.orders.update_many(
+            {"status": "Tamamlandı", "business_day": day, "z_day": {"$exists": False}}, target
+        ).modified_count
+        moved += self.payments.update_many(
+            {"business_day": day, "z_day": {"$exists": False}}, target
+        ).modified_count
+        if moved:
+            # Günlük ciro önbelleği eski günü saymış olabilir
+            self.report_cache.clear()
+            logger.warning(f"{day} Z raporundan sonra yazılan {moved} kayıt {report['late_writes_to']} gününe taşındı")
+        return moved
+    
+    def get_z_report(self, day: str) -> Optional[Dict]:
+        """Kapatılmış günün Z raporunu getir (tek belge okuması)"""
+        return self.z_reports.find_one({"_id": day})
+    
+    def get_z_reports(self, start_day: str, end_day: str) -> List[Dict]:
+        """[start_day, end_day] arasındaki Z raporları"""
+        return list(self.z_reports.find({"_id": {"$gte": start_day, "$lte": end_day}}).sort("_id", 1))
+    
     # Rapor ve analiz işlemleri
-    def get_all_orders(self) -> List[Dict]:
-        """Tüm tamamlanmış siparişleri getir"""
-        return list(self.orders.find({"status": "Tamamlandı"}).sort("date", -1))
+    def _order_sources(self, start_date=None, end_date=None) -> List[Tuple[object, Dict]]:
+        """
+        [start, end) aralığındaki siparişler için (koleksiyon, filtre) çiftleri
+        
+        Arşiv ayları eskiden yeniye, sıcak koleksiyon en sonda döner; her biri
+        tarihe göre sıralı okunduğunda sonuç da tarih sırasında olur.
+        """
+        match_query = {"status": "Tamamlandı"}
+        if start_date or end_date:
+            match_query["date"] = self._date_range_query(start_date, end_date)
+        
+        partitions, hot_from = self._order_partitions(start_date, end_date)
+        sources = [(self.db[name], match_query) for name in partitions]
+        hot_match = dict(match_query)
+        if hot_from:
+            hot_match["business_day"] = {"$gte": hot_from}
+        sources.append((self.orders, hot_match))
+        return sources
+    
+    def find_orders(self, start_date=None, end_date=None, table_number: Optional[int] = None,
+                    min_total: Optional[int] = None, product_id=None,
+                    before: Optional[Tuple] = None, limit: int = 50) -> Tuple[List[Dict], Optional[Tuple]]:
+        """
+        Sipariş geçmişinde filtreli arama (en yeniden eskiye, sayfalı)
+        
+        Filtreler indeksli sorgulara çevrilir; bölümler (sıcak koleksiyon ve
+        aralığa düşen arşiv ayları) yeniden eskiye sırayla okunur ve sayfa
+        dolunca durulur. Sayfalama anahtar tabanlıdır: sonraki sayfa, önceki
+        sayfanın son siparişinden (date, _id) devam eden bir indeks aramasıdır.
+        
+        Args:
+            table_number: Sadece bu masanın siparişleri
+            min_total: En az bu tutardaki (kuruş) siparişler
+            product_id: Bu ürünü içeren siparişler
+            before: Önceki sayfanın döndürdüğü devam anahtarı
+            limit: Sayfa büyüklüğü
+        
+        Returns:
+            (siparişler, sonraki sayfa anahtarı veya None)
+        """
+        filters = {}
+        if table_number is not None:
+            filters["table_number"] = table_number
+        if min_total:
+            filters["total"] = {"$gte": min_total}
+        if product_id is not None:
+            filters["items.product._id"] = product_id
+        if before is not None:
+            before_date, before_id = before
+            filters["$or"] = [
+                {"date": {"$lt": before_date}},
+                {"date": before_date, "_id": {"$lt": before_id}}
+            ]
+        
+        orders = []
+        # Kaynaklar eskiden yeniye döner; en yeni bölümden başla
+        for collection, query in reversed(self._order_sources(start_date, end_date)):
+            remaining = limit + 1 - len(orders)
+            cursor = (
+                collection.find(dict(query, **filters), HISTORY_PROJECTION)
+                .sort([("date", -1), ("_id", -1)])
+                .limit(remaining)
+            )
+            orders.extend(cursor)
+            if len(orders) > limit:
+                break
+        
+        if len(orders) > limit:
+            orders = orders[:limit]
+            last = orders[-1]
+            return orders, (last["date"], last["_id"])
+        return orders, None
+    
+    def count_orders(self, start_date=None, end_date=None) -> int:
+        """[start, end) aralığındaki sipariş sayısı (tüm bölümlerde)"""
+        return sum(
+            collection.count_documents(query)
+            for collection, query in self._order_sources(start_date, end_date)
+        )
+    
+    def iter_orders(self, start_date=None, end_date=None, projection: Optional[Dict] = None,
+                    batch_size: int = 1000):
+        """
+        Siparişleri imleçle, tarih sırasına göre parça parça getir
+        
+        Tüm sonuç belleğe alınmaz; büyük dışa aktarımlar için kullanılır.
+        """
+        for collection, query in self._order_sources(start_date, end_date):
+            cursor = collection.find(query, projection).sort("date", 1).batch_size(batch_size)
+            try:
+                for order in cursor:
+                    yield order
+            finally:
+                cursor.close()
     
-    def get_total_revenue(self) -> float:
+    def get_total_revenue(self) -> int:
         """Toplam ciroyu hesapla"""
-        pipeline = [
-            {"$match": {"status": "Tamamlandı"}},
-            {"$group": {"_id": None, "total": {"$sum": "$total"}}}
-        ]
-        result = list(self.orders.aggregate(pipeline))
-        return result[0]["total"] if result else 0.0
+        return self.get_revenue_by_period()
     
-    def get_revenue_by_period(self, start_date=None, end_date=None) -> float:
-        """Belirli bir dönem için ciroyu hesapla"""
+    def _today_start(self):
+        """Bugünkü iş gününün başlangıcı (UTC); bu andan önceki dönemler kapanmış sayılır"""
+        return self.calendar.day_start(self.calendar.today())
+    
+    def _date_range_query(self, start_date=None, end_date=None) -> Dict:
+        """Yarı açık [start, end) tarih filtresi (naive tarihler yerel saat kabul edilir)"""
+        date_query = {}
+        if start_date:
+            date_query["$gte"] = self.calendar.to_local(start_date)
+        if end_date:
+            date_query["$lt"] = self.calendar.to_local(end_date)
+        return date_query
+    
+    def _business_day_query(self, start_date=None, end_date=None) -> Dict:
+        """
+        [start, end) aralığının kapsadığı iş günleri filtresi
+        
+        Ciro ve Z raporu gibi siparişleri iş gününe göre sayar; Z raporundan
+        sonra ertesi güne taşınan siparişler de taşındıkları güne düşer.
+        Gün sınırına denk gelmeyen uçlar o iş gününün tamamını kapsar.
+        """
+        from datetime import timedelta
+        day_query = {}
+        if start_date:
+            day_query["$gte"] = self.calendar.business_day(start_date)
+        if end_date:
+            day_query["$lte"] = self.calendar.business_day(end_date - timedelta(microseconds=1))
+        return day_query
+    
+    def _aggregate_revenue(self, start_date=None, end_date=None) -> int:
+        """Verilen [start, end) aralığı için ciroyu doğrudan veritabanında topla"""
         match_query = {"status": "Tamamlandı"}
         
         if start_date or end_date:
-            date_query = {}
-            if start_date:
-                date_query["$gte"] = start_date
-            if end_date:
-                date_query["$lte"] = end_date
-            match_query["date"] = date_query
+            match_query["date"] = self._date_range_query(start_date, end_date)
         
+        result = list(self._aggregate_orders(
+            match_query,
+            [{"$group": {"_id": None, "total": {"$sum": "$total"}}}],
+            start_date,
+            end_date
+        ))
+        return result[0]["total"] if result else 0
+    
+    def _sum_revenue(self, match_query: Dict) -> int:
+        """Filtreye uyan siparişlerin toplam tutarını hesapla"""
         pipeline = [
             {"$match": match_query},
             {"$group": {"_id": None, "total": {"$sum": "$total"}}}
         ]
         result = list(self.orders.aggregate(pipeline))
-        return result[0]["total"] if result else 0.0
+        return result[0]["total"] if result else 0
     
-    def get_today_revenue(self) -> float:
-        """Bugünkü ciroyu hesapla"""
-        from datetime import datetime, timedelta
-        today_start = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
-        today_end = today_start + timedelta(days=1)
-        return self.get_revenue_by_period(today_start, today_end)
+    def _first_order_day(self) -> Optional[str]:
+        """En eski siparişin iş günü (arşivlenmiş aylar dahil)"""
+        months = sorted(self._archive_state().get("months", {}))
+        if months:
+            return f"{months[0]}-01"
+        first = self.orders.find_one(
+            {"status": "Tamamlandı"}, {"business_day": 1}, sort=[("business_day", ASCENDING)]
+        )
+        return first.get("business_day") if first else None
     
-    def get_this_month_revenue(self) -> float:
+    def _closed_revenue(self, start_date, end_date) -> int:
+        """
+        Tamamen geçmişte kalan [start, end) aralığının cirosu (önbellekli)
+        
+        Aralık kapanmış iş günlerine bölünür: tamamı aralıkta olan aylar ay,
+        kalan günler gün olarak önbellekte tutulur. Bu ay/bu yıl gibi örtüşen
+        aralıklar aynı parçaları paylaşır ve her gün sadece yeni kapanan gün
+        hesaplanır; eksik parçalar tek aggregation ile iş gününe göre toplanır.
+        Gün sınırına denk gelmeyen aralıklar tek parça hesaplanır.
+        """
+        from datetime import date, timedelta
+        if start_date is None:
+            first_day = self._first_order_day()
+            if first_day is None:
+                return 0
+            start_date = self.calendar.day_start(date.fromisoformat(first_day))
+        start_day = self.calendar.business_date(start_date)
+        end_day = self.calendar.business_date(end_date)
+        if (self.calendar.day_start(start_day) != start_date
+                or self.calendar.day_start(end_day) != end_date):
+            key = ReportCache.make_key("revenue", start_date, end_date)
+            cached = self.report_cache.get(key)
+            if cached is None:
+                cached = self._aggregate_revenue(start_date, end_date)
+                self.report_cache.put(key, cached)
+            return cached
+        
+        # Parçalar: (önbellek anahtarı, kapsadığı iş günleri)
+        pieces = []
+        day = start_day
+        while day < end_day:
+            next_month = (day.replace(day=1) + timedelta(days=32)).replace(day=1)
+            if day.day == 1 and next_month <= end_day:
+                days = [day + timedelta(days=i) for i in range((next_month - day).days)]
+                pieces.append((ReportCache.make_key("revenue_month", day.isoformat()[:7]), days))
+                day = next_month
+            else:
+                pieces.append((ReportCache.make_key("revenue_day", day.isoformat()), [day]))
+                day += timedelta(days=1)
+        
+        total = 0
+        missing = []
+        for key, days in pieces:
+            cached = self.report_cache.get(key)
+            if cached is None:
+                missing.append((key, days))
+            else:
+                total += cached
+        if not missing:
+            return total
+        
+        missing_days = [day.isoformat() for _, days in missing for day in days]
+        by_day = {
+            row["_id"]: row["total"]
+            for row in self._aggregate_orders(
+                {"status": "Tamamlandı", "business_day": {"$in": missing_days}},
+                [{"$group": {"_id": "$business_day", "total": {"$sum": "$total"}}}],
+                self.calendar.day_start(missing[0][1][0]),
+                self.calendar.day_start(missing[-1][1][-1] + timedelta(days=1))
+            )
+        }
+        for key, days in missing:
+            value = sum(by_day.get(day.isoformat(), 0) for day in days)
+            self.report_cache.put(key, value)
+            total += value
+        return total
+    
+    def get_revenue_by_period(self, start_date=None, end_date=None) -> int:
+        """
+        Belirli bir [start, end) dönemi için ciroyu hesapla
+        
+        Aralık bugünden önce kapanmış bir kısım ve bugüne düşen canlı bir
+        kısım olarak bölünür; sadece canlı kısım her seferinde sorgulanır.
+        """
+        today_start = self._today_start()
+        if start_date is not None:
+            start_date = self.calendar.to_local(start_date)
+        if end_date is not None:
+            end_date = self.calendar.to_local(end_date)
+        
+        # Tamamen kapanmış aralık
+        if end_date is not None and end_date <= today_start:
+            return self._closed_revenue(start_date, end_date)
+        
+        # Tamamen canlı aralık
+        if start_date is not None and start_date >= today_start:
+            return self._aggregate_revenue(start_date, end_date)
+        
+        # Kapanmış önek + canlı sonek; kapanmış kısım iş gününe göre toplandığı için
+        # canlı kısım da iş gününe göre alınır (Z raporundan sonra bugüne yazılanlar dahil)
+        closed_part = self._closed_revenue(start_date, today_start)
+        live_query = {"status": "Tamamlandı", "business_day": {"$gte": self.calendar.today().isoformat()}}
+        if end_date is not None:
+            live_query["date"] = self._date_range_query(None, end_date)
+        return closed_part + self._sum_revenue(live_query)
+    
+    def get_today_revenue(self) -> int:
+        """Bugünkü (iş günü) ciroyu hesapla"""
+        return self._sum_revenue({
+            "status": "Tamamlandı",
+            "business_day": self.current_business_day()
+        })
+    
+    def get_this_month_revenue(self) -> int:
         """Bu ayki ciroyu hesapla"""
-        from datetime import datetime
-        today = datetime.now()
-        month_start = datetime(today.year, today.month, 1)
-        return self.get_revenue_by_period(month_start, datetime.now())
+        return self.get_revenue_by_period(self.calendar.month_start(), None)
     
     def get_order_count(self) -> int:
-        """Toplam sipariş sayısını getir"""
-        return self.orders.count_documents({"status": "Tamamlandı"})
+        """Toplam sipariş sayısını getir (arşivlenmiş aylar taşıma sırasında sayılmıştır)"""
+        state = self._archive_state()
+        hot_query = {"status": "Tamamlandı"}
+        if state.get("hot_from"):
+            hot_query["business_day"] = {"$gte": state["hot_from"]}
+        archived = sum(month["orders"] for month in state.get("months", {}).values())
+        return self.orders.count_documents(hot_query) + archived
     
     def get_today_order_count(self) -> int:
-        """Bugünkü sipariş sayısını getir"""
-        from datetime import datetime, timedelta
-        today_start = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
-        today_end = today_start + timedelta(days=1)
+        """Bugünkü (iş günü) sipariş sayısını getir"""
         return self.orders.count_documents({
             "status": "Tamamlandı",
-            "date": {"$gte": today_start, "$lt": today_end}
+            "business_day": self.current_business_day()
         })
+    
+    def get_payment_breakdown(self, start_date=None, end_date=None) -> List[Dict]:
+        """
+        [start, end) aralığında alınan ödemeleri tür ve bölüşüme göre topla
+        
+        Açık masalardan alınmış kısmi ödemeler de dahildir.
+        
+        Returns:
+            [{"method": str, "split": str, "count": int, "amount": int (kuruş)}, ...]
+        """
+        match_query = {}
+        if start_date or end_date:
+            match_query["date"] = self._date_range_query(start_date, end_date)
+        
+        pipeline = [
+            {"$match": match_query},
+            {"$group": {
+                "_id": {"method": "$method", "split": "$split"},
+                "count": {"$sum": 1},
+                "amount": {"$sum": "$amount"}
+            }},
+            {"$sort": {"amount": -1}}
+        ]
+        return [
+            {
+                "method": row["_id"]["method"],
+                "split": row["_id"]["split"],
+                "count": row["count"],
+                "amount": row["amount"]
+            }
+            for row in self.payments.aggregate(pipeline)
+        ]
+    
+    def get_table_turnover(self, start_day: str, end_day: str) -> Dict:
+        """
+        [start_day, end_day] iş günlerinde masa devri ve ortalama oturma süresi
+        
+        Sadece table_events'teki kapanış kayıtları okunur (sipariş kalemleri değil).
+        
+        Returns:
+            {"turns": int, "average_seconds": int, "turns_per_table_day": float,
+             "tables": [{"table_number", "turns", "average_seconds", "occupied_seconds"}, ...]}
+        """
+        from datetime import date
+        pipeline = [
+            {"$match": {"event": "closed", "business_day": {"$gte": start_day, "$lte": end_day}}},
+            {"$group": {
+                "_id": "$table_number",
+                "turns": {"$sum": 1},
+                "occupied_seconds": {"$sum": "$seconds"}
+            }},
+            {"$sort": {"_id": 1}}
+        ]
+        tables = [
+            {
+                "table_number": row["_id"],
+                "turns": row["turns"],
+                "average_seconds": row["occupied_seconds"] // row["turns"],
+                "occupied_seconds": row["occupied_seconds"]
+            }
+            for row in self.table_events.aggregate(pipeline)
+        ]
+        
+        turns = sum(table["turns"] for table in tables)
+        occupied = sum(table["occupied_seconds"] for table in tables)
+        days = (date.fromisoformat(end_day) - date.fromisoformat(start_day)).days + 1
+        table_count = self.tables.count_documents({})
+        return {
+            "turns": turns,
+            "average_seconds": occupied // turns if turns else 0,
+            "turns_per_table_day": turns / (table_count * days) if table_count and days > 0 else 0.0,
+            "tables": tables
+        }
+    
+    def get_occupancy(self) -> Dict:
+        """
+        Anlık doluluk: dolu masa ve koltuk sayıları
+        
+        Returns:
+            {"tables": int, "occupied": int, "seats": int, "occupied_seats": int, "rate": float}
+        """
+        is_occupied = {"$eq": ["$status", "Dolu"]}
+        capacity = {"$ifNull": ["$capacity", DEFAULT_CAPACITY]}
+        rows = list(self.tables.aggregate([
+            {"$group": {
+                "_id": None,
+                "tables": {"$sum": 1},
+                "occupied": {"$sum": {"$cond": [is_occupied, 1, 0]}},
+                "seats": {"$sum": capacity},
+                "occupied_seats": {"$sum": {"$cond": [is_occupied, capacity, 0]}}
+            }}
+        ]))
+        occupancy = rows[0] if rows else {"tables": 0, "occupied": 0, "seats": 0, "occupied_seats": 0}
+        occupancy.pop("_id", None)
+        occupancy["rate"] = occupancy["occupied"] / occupancy["tables"] if occupancy["tables"] else 0.0
+        return occupancy
+    
+    def get_product_sales(self, start_date, end_date, group_by: str = "product") -> List[Dict]:
+        """
+        Sipariş kalemlerinden ürün, kategori veya saat bazında satışları hesapla
+        
+        Siparişler ciro raporlarıyla aynı şekilde iş gününe göre seçilir.
+        
+        Args:
+            start_date: Başlangıç (dahil)
+            end_date: Bitiş (hariç)
+            group_by: "product", "category" veya "hour"
+        
+        Returns:
+            [{"key": ..., "quantity": int, "revenue": int, "list_revenue": int (kuruş)}, ...]
+            revenue tahsil edilen, list_revenue liste fiyatıyla tutardır
+        """
+        group_keys = {
+            "product": "$items.product.name",
+            "category": {"$ifNull": ["$items.product.category", "Diğer"]},
+            "hour": {"$hour": {"date": "$date", "timezone": self.calendar.tz_name}},
+        }
+        if group_by not in group_keys:
+            raise ValueError(f"Geçersiz gruplama: {group_by}")
+        
+        # Geçmiş günler değişmez; tamamen kapanmış aralıkları önbellekten ver
+        cache_key = ReportCache.make_key("product_sales", start_date, end_date, group_by)
+        is_closed = self.calendar.to_local(end_date) <= self._today_start()
+        if is_closed and cache_key in self.report_cache:
+            return self.report_cache.get(cache_key)
+        
+        match_query = {
+            "status": "Tamamlandı",
+            "business_day": self._business_day_query(start_date, end_date)
+        }
+        stages = [
+            {"$unwind": "$items"},
+            {"$group": {
+                "_id": group_keys[group_by],
+                "quantity": {"$sum": "$items.quantity"},
+                "revenue": {"$sum": "$items.total"},
+                "list_revenue": {"$sum": ITEM_LIST_TOTAL}
+            }},
+            {"$sort": {"_id": 1} if group_by == "hour" else {"revenue": -1}}
+        ]
+        result = [
+            {"key": row["_id"], "quantity": row["quantity"], "revenue": row["revenue"],
+             "list_revenue": row["list_revenue"]}
+            for row in self._aggregate_orders(match_query, stages, start_date, end_date)
+        ]
+        
+        if is_closed:
+            self.report_cache.put(cache_key, result)
+        return result
+    
+    def get_revenue_series(self, start_date, end_date, bucket: str = "day") -> List[Dict]:
+        """
+        [start, end) aralığı için zaman dilimlerine bölünmüş ciro serisi
+        
+        Tek bir aggregation ile gruplama yapılır; siparişi olmayan dilimler
+        sıfır olarak doldurulur. Gün, hafta ve ay dilimleri ciro raporlarıyla
+        aynı şekilde siparişin iş gününe (business_day) göre hesaplanır; Z
+        raporundan sonra ertesi güne taşınan siparişler taşındıkları güne düşer.
+        Saatlik dilimler siparişin gerçek saatine göre seçilir ve gruplanır.
+        
+        Args:
+            bucket: "hour", "day", "week" veya "month"
+        
+        Returns:
+            [{"bucket": datetime (yerel, saat dilimsiz), "revenue": int (kuruş), "orders": int}, ...]
+        """
+        if bucket not in BUCKET_UNITS:
+            raise ValueError(f"Geçersiz zaman dilimi: {bucket}")
+        
+        start_date = self.calendar.to_local(start_date)
+        end_date = self.calendar.to_local(end_date)
+        cache_key = ReportCache.make_key("revenue_series", start_date, end_date, bucket)
+        is_closed = end_date <= self._today_start()
+        rows = self.report_cache.get(cache_key) if is_closed else None
+        
+        tz_name = self.calendar.tz_name
+        key_format = BUCKET_KEY_FORMATS[bucket]
+        if rows is None:
+            if bucket == "hour":
+                bucket_key = {"$dateToString": {"date": "$date", "format": key_format, "timezone": tz_name}}
+                match_query = {
+                    "status": "Tamamlandı",
+                    "date": self._date_range_query(start_date, end_date)
+                }
+            else:
+                if bucket == "day":
+                    bucket_key = "$business_day"
+                else:
+                    # İş günü anahtarı takvim günü olarak (UTC gece yarısı) kesilir
+                    trunc = {
+                        "date": {"$dateFromString": {"dateString": "$business_day", "timezone": "UTC"}},
+                        "unit": bucket,
+                        "timezone": "UTC"
+                    }
+                    if bucket == "week":
+                        trunc["startOfWeek"] = "monday"
+                    bucket_key = {"$dateToString": {
+                        "date": {"$dateTrunc": trunc}, "format": key_format, "timezone": "UTC"
+                    }}
+                match_query = {
+                    "status": "Tamamlandı",
+                    "business_day": self._business_day_query(start_date, end_date)
+                }
+            stages = [
+                {"$group": {
+                    "_id": bucket_key,
+                    "revenue": {"$sum": "$total"},
+                    "orders": {"$sum": 1}
+                }},
+                {"$sort": {"_id": 1}}
+            ]
+            rows = [
+                [row["_id"], row["revenue"], row["orders"]]
+                for row in self._aggregate_orders(match_query, stages, start_date, end_date)
+            ]
+            if is_closed:
+                self.report_cache.put(cache_key, rows)
+        
+        if bucket == "hour":
+            wall_start = self.calendar.local_wall_time(start_date)
+            wall_end = self.calendar.local_wall_time(end_date)
+        else:
+            wall_start = self.calendar.business_wall_time(start_date)
+            wall_end = self.calendar.business_wall_time(end_date)
+        
+        totals = {key: (revenue, orders) for key, revenue, orders in rows}
+        series = []
+        for bucket_start in iter_buckets(wall_start, wall_end, bucket):
+            revenue, orders = totals.get(bucket_start.strftime(key_format), (0, 0))
+            series.append({"bucket": bucket_start, "revenue": revenue, "orders": orders})
+        return series
+
+
+# Zaman dilimi serileri için desteklenen birimler
+BUCKET_UNITS = ("hour", "day", "week", "month")
+# Dilim anahtarlarının hem MongoDB hem Python tarafında ortak biçimi
+BUCKET_KEY_FORMATS = {
+    "hour": "%Y-%m-%dT%H:00",
+    "day": "%Y-%m-%d",
+    "week": "%Y-%m-%d",
+    "month": "%Y-%m-%d",
+}
+
+
+def archive_collection_name(month: str) -> str:
+    """'YYYY-MM' ayının arşiv koleksiyonu adı"""
+    return ORDER_ARCHIVE_PREFIX + month.replace("-", "_")
+
+
+def month_day_range(month: str) -> Dict:
+    """'YYYY-MM' ayının business_day aralığı ({"$gte": ilk gün, "$lt": sonraki ayın ilk günü})"""
+    year, month_index = (int(part) for part in month.split("-"))
+    year, month_index = (year + 1, 1) if month_index == 12 else (year, month_index + 1)
+    return {"$gte": f"{month}-01", "$lt": f"{year:04d}-{month_index:02d}-01"}
+
+
+def truncate_to_bucket(moment, bucket: str):
+    """Tarihi ait olduğu zaman diliminin başlangıcına yuvarla"""
+    from datetime import timedelta
+    if bucket == "hour":
+        return moment.replace(minute=0, second=0, microsecond=0)
+    day_start = moment.replace(hour=0, minute=0, second=0, microsecond=0)
+    if bucket == "day":
+        return day_start
+    if bucket == "week":
+        return day_start - timedelta(days=day_start.weekday())
+    return day_start.replace(day=1)
+
 
+def iter_buckets(start_date, end_date, bucket: str):
+    """[start, end) aralığındaki zaman dilimi başlangıçlarını üret"""
+    from datetime import timedelta
+    current = truncate_to_bucket(start_date, bucket)
+    steps = {"hour": timedelta(hours=1), "day": timedelta(days=1), "week": timedelta(weeks=1)}
+    while current < end_date:
+        yield current
+        if bucket == "month":
+            year, month = divmod(current.month, 12)
+            current = current.replace(year=current.year + year, month=month + 1)
+        else:
+            current += steps[bucket]
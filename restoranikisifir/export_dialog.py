@@ -0,0 +1,181 @@
+"""
+Sipariş geçmişi dışa aktarım diyaloğu
+"""
+from PyQt5.QtWidgets import (
+    QDialog, QVBoxLayout, QHBoxLayout, QFormLayout, QPushButton,
+    QLabel, QDateEdit, QComboBox, QCheckBox, QProgressBar,
+    QFileDialog, QMessageBox
+)
+from PyQt5.QtCore import QThread, QDate, pyqtSignal
+from PyQt5.QtGui import QFont
+from datetime import timedelta
+from order_export import export_orders, ExportCancelled
+from theme import set_role
+
+
+class OrderExportWorker(QThread):
+    """Dışa aktarımı arayüzü bloklamadan arka planda çalıştır"""
+    
+    progress = pyqtSignal(int, int)
+    finished_export = pyqtSignal(int)
+    failed = pyqtSignal(str)
+    
+    def __init__(self, db, path: str, fmt: str, start_date, end_date, lines: bool, parent=None):
+        super().__init__(parent)
+        self.db = db
+        self.path = path
+        self.fmt = fmt
+        self.start_date = start_date
+        self.end_date = end_date
+        self.lines = lines
+        self._cancelled = False
+    
+    def cancel(self):
+        self._cancelled = True
+    
+    def run(self):
+        try:
+            count = export_orders(
+                self.db, self.path, self.fmt, self.start_date, self.end_date,
+                lines=self.lines,
+                progress=self.progress.emit,
+                should_stop=lambda: self._cancelled
+            )
+        except ExportCancelled:
+            self.failed.emit("Dışa aktarım iptal edildi")
+            return
+        except Exception as e:
+            self.failed.emit(str(e))
+            return
+        self.finished_export.emit(count)
+
+
+class ExportDialog(QDialog):
+    """Tarih aralığı ve biçim seçerek sipariş geçmişini dosyaya aktar"""
+    
+    def __init__(self, db, parent=None):
+        super().__init__(parent)
+        self.db = db
+        self.worker = None
+        self.init_ui()
+    
+    def init_ui(self):
+        """Arayüzü oluştur"""
+        self.setWindowTitle("Sipariş Geçmişini Dışa Aktar")
+        self.setMinimumWidth(420)
+        
+        layout = QVBoxLayout(self)
+        
+        title = QLabel("📥 Sipariş Geçmişini Dışa Aktar")
+        title.setFont(QFont("Arial", 14, QFont.Bold))
+        layout.addWidget(title)
+        
+        form = QFormLayout()
+        today = QDate.currentDate()
+        self.start_input = QDateEdit(QDate(today.year(), 1, 1))
+        self.start_input.setCalendarPopup(True)
+        self.start_input.setDisplayFormat("dd.MM.yyyy")
+        form.addRow("Başlangıç:", self.start_input)
+        
+        self.end_input = QDateEdit(today)
+        self.end_input.setCalendarPopup(True)
+        self.end_input.setDisplayFormat("dd.MM.yyyy")
+        form.addRow("Bitiş:", self.end_input)
+        
+        self.format_input = QComboBox()
+        self.format_input.addItem("CSV", "csv")
+        self.format_input.addItem("Parquet", "parquet")
+        form.addRow("Biçim:", self.format_input)
+        
+        self.lines_input = QCheckBox("Her sipariş kalemi ayrı satır")
+        self.lines_input.setChecked(True)
+        form.addRow("", self.lines_input)
+        layout.addLayout(form)
+        
+        self.progress_bar = QProgressBar()
+        self.progress_bar.setValue(0)
+        layout.addWidget(self.progress_bar)
+        
+        self.status_label = QLabel("")
+        layout.addWidget(self.status_label)
+        
+        btn_layout = QHBoxLayout()
+        btn_layout.addStretch()
+        self.btn_export = QPushButton("📥 Dışa Aktar")
+        self.btn_export.setMinimumHeight(35)
+        self.btn_export.clicked.connect(self.start_export)
+        set_role(self.btn_export, "export")
+        btn_layout.addWidget(self.btn_export)
+        
+        self.btn_cancel = QPushButton("❌ Kapat")
+        self.btn_cancel.setMinimumHeight(35)
+        self.btn_cancel.clicked.connect(self.cancel_or_close)
+        set_role(self.btn_cancel, "neutral")
+        btn_layout.addWidget(self.btn_cancel)
+        layout.addLayout(btn_layout)
+    
+    def start_export(self):
+        """Hedef dosyayı sor ve aktarımı başlat"""
+        fmt = self.format_input.currentData()
+        start = self.start_input.date().toPyDate()
+        end = self.end_input.date().toPyDate()
+        if end < start:
+            QMessageBox.warning(self, "Uyarı", "Bitiş tarihi başlangıçtan önce olamaz!")
+            return
+        
+        default_name = f"siparisler_{start:%Y%m%d}_{end:%Y%m%d}.{fmt}"
+        path, _ = QFileDialog.getSaveFileName(
+            self, "Dosyayı Kaydet", default_name,
+            "CSV (*.csv)" if fmt == "csv" else "Parquet (*.parquet)"
+        )
+        if not path:
+            return
+        
+        self.worker = OrderExportWorker(
+            self.db, path, fmt,
+            self.db.calendar.day_start(start),
+            self.db.calendar.day_start(end + timedelta(days=1)),
+            self.lines_input.isChecked(),
+            self
+        )
+        self.worker.progress.connect(self.on_progress)
+        self.worker.finished_export.connect(self.on_finished)
+        self.worker.failed.connect(self.on_failed)
+        
+        self.btn_export.setEnabled(False)
+        self.btn_cancel.setText("⏹ Durdur")
+        self.progress_bar.setValue(0)
+        self.status_label.setText("Aktarılıyor...")
+        self.worker.start()
+    
+    def on_progress(self, done: int, total: int):
+        self.progress_bar.setMaximum(max(total, 1))
+        self.progress_bar.setValue(done)
+        self.status_label.setText(f"{done} / {total} sipariş aktarıldı")
+    
+    def on_finished(self, count: int):
+        self.reset_buttons()
+        self.status_label.setText(f"✅ {count} sipariş aktarıldı: {self.worker.path}")
+    
+    def on_failed(self, message: str):
+        self.reset_buttons()
+        self.status_label.setText("")
+        QMessageBox.warning(self, "Dışa Aktarım", message)
+    
+    def reset_buttons(self):
+        self.btn_export.setEnabled(True)
+        self.btn_cancel.setText("❌ Kapat")
+    
+    def cancel_or_close(self):
+        """Aktarım sürüyorsa durdur, değilse diyaloğu kapat"""
+        if self.worker and self.worker.isRunning():
+            self.worker.cancel()
+            return
+        self.reject()
+    
+    def reject(self):
+        # Diyalog kapanırken aktarım da durdurulur (yarım dosya silinir)
+        if self.worker and self.worker.isRunning():
+            self.worker.cancel()
+            self.worker.wait()
+        super().reject()
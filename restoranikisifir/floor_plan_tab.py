@@ -2,23 +2,249 @@
 Dinamik masa planı ekranı
 """
 from PyQt5.QtWidgets import (
-    QWidget, QVBoxLayout, QHBoxLayout, QPushButton, 
-    QGridLayout, QMessageBox, QLabel
+    QWidget, QVBoxLayout, QHBoxLayout, QPushButton,
+    QMessageBox, QLabel, QInputDialog, QComboBox, QApplication,
+    QGraphicsView, QGraphicsScene, QGraphicsObject, QGraphicsItem
 )
-from PyQt5.QtCore import Qt
-from PyQt5.QtGui import QFont
+from PyQt5.QtCore import Qt, QRectF, QThread, QTimer, QMimeData, pyqtSignal
+from PyQt5.QtGui import QFont, QPainter, QColor, QPen, QBrush, QDrag
+from datetime import datetime, timezone
+import logging
+import math
 from order_dialog import OrderDialog
+from business_day import format_duration
+from database import DEFAULT_ZONE
+from money import format_tl
+from snapshot import TerminalSnapshot, fetch_changes
+from theme import COLORS, STATUS_COLORS, set_role
+
+logger = logging.getLogger(__name__)
+
+# Plan üzerindeki masa boyutu ve otomatik yerleşim aralığı
+TILE_WIDTH = 120
+TILE_HEIGHT = 100
+TILE_SPACING_X = 140
+TILE_SPACING_Y = 120
+# Masa planının veritabanıyla (sürüm karşılaştırarak) uzlaştırılma aralığı
+SYNC_INTERVAL_MS = 15000
+# Masa üzerine sürüklenen adisyonun MIME türü (içerik: kaynak masa numarası)
+TABLE_MIME_TYPE = "application/x-restoran-table"
+# Dolu masalardaki geçen sürenin yeniden çizilme aralığı (süre yerelde hesaplanır)
+ELAPSED_REFRESH_MS = 60000
+
+
+def format_elapsed(opened_at: datetime) -> str:
+    """Masanın açılışından bu yana geçen süre (terminalin saatine göre)"""
+    if opened_at.tzinfo is None:
+        opened_at = opened_at.replace(tzinfo=timezone.utc)
+    return format_duration((datetime.now(timezone.utc) - opened_at).total_seconds())
+
+
+class TableItem(QGraphicsObject):
+    """Plan üzerindeki tek bir masa (widget yerine önbellekli çizim)"""
+    
+    clicked = pyqtSignal(int)
+    moved = pyqtSignal(int, float, float)
+    order_dropped = pyqtSignal(int, int)  # kaynak masa, hedef masa
+    
+    def __init__(self, table: dict):
+        super().__init__()
+        self.table_number = table["table_number"]
+        self.status = table.get("status", "Boş")
+        self.capacity = table.get("capacity")
+        self.total = table.get("total", 0)
+        # Geçen süre bu tek zaman damgasından çizim anında hesaplanır
+        self.opened_at = table.get("opened_at")
+        self._press_pos = None
+        # Çizim sonucu piksel önbelleğinde tutulur, sadece durum değişince yeniden çizilir
+        self.setCacheMode(QGraphicsItem.DeviceCoordinateCache)
+        self.setAcceptHoverEvents(True)
+        # Dolu masa başka bir masanın üzerine sürüklenerek taşınır/birleştirilir
+        self.setAcceptDrops(True)
+        self.setCursor(Qt.PointingHandCursor)
+        self._hovered = False
+    
+    def boundingRect(self) -> QRectF:
+        return QRectF(0, 0, TILE_WIDTH, TILE_HEIGHT)
+    
+    def set_state(self, table: dict):
+        """Masa durumunu güncelle (değişiklik yoksa yeniden çizim yapılmaz)"""
+        status = table.get("status", self.status)
+        capacity = table.get("capacity", self.capacity)
+        total = table.get("total", self.total)
+        opened_at = table.get("opened_at")
+        if (status, capacity, total, opened_at) != (self.status, self.capacity, self.total, self.opened_at):
+            self.status = status
+            self.capacity = capacity
+            self.total = total
+            self.opened_at = opened_at
+            self.update()
+    
+    def paint(self, painter: QPainter, option, widget=None):
+        fill, border = STATUS_COLORS.get(self.status, STATUS_COLORS["Dolu"])
+        painter.setRenderHint(QPainter.Antialiasing)
+        painter.setPen(QPen(QColor(border), 2))
+        painter.setBrush(QBrush(QColor(border if self._hovered else fill)))
+        painter.drawRoundedRect(self.boundingRect().adjusted(1, 1, -1, -1), 10, 10)
+        
+        painter.setPen(Qt.white)
+        painter.setFont(QFont("Arial", 12, QFont.Bold))
+        lines = [f"Masa {self.table_number}", self.status]
+        if self.status == "Dolu" and self.total:
+            lines.append(format_tl(self.total))
+            if self.opened_at is not None:
+                lines.append(format_elapsed(self.opened_at))
+        elif self.capacity:
+            lines.append(f"{self.capacity} kişi")
+        painter.drawText(self.boundingRect(), Qt.AlignCenter, "\n".join(lines))
+    
+    def hoverEnterEvent(self, event):
+        self._hovered = True
+        self.update()
+    
+    def hoverLeaveEvent(self, event):
+        self._hovered = False
+        self.update()
+    
+    def mousePressEvent(self, event):
+        self._press_pos = self.pos()
+        super().mousePressEvent(event)
+        # Tıklama ve sürükleme masaya gelsin (görünümün kaydırmasına gitmesin)
+        if event.button() == Qt.LeftButton:
+            event.accept()
+    
+    def mouseMoveEvent(self, event):
+        if self.flags() & QGraphicsItem.ItemIsMovable:
+            super().mouseMoveEvent(event)
+            return
+        distance = (event.screenPos() - event.buttonDownScreenPos(Qt.LeftButton)).manhattanLength()
+        if self.status != "Dolu" or distance < QApplication.startDragDistance():
+            return
+        
+        mime = QMimeData()
+        mime.setData(TABLE_MIME_TYPE, str(self.table_number).encode())
+        drag = QDrag(event.widget())
+        drag.setMimeData(mime)
+        # Bırakma bir tıklama sayılmaz
+        self._press_pos = None
+        drag.exec_(Qt.MoveAction)
+    
+    def dragEnterEvent(self, event):
+        data = event.mimeData()
+        if data.hasFormat(TABLE_MIME_TYPE) and int(bytes(data.data(TABLE_MIME_TYPE))) != self.table_number:
+            event.acceptProposedAction()
+            self._hovered = True
+            self.update()
+        else:
+            event.ignore()
+    
+    def dragLeaveEvent(self, event):
+        self._hovered = False
+        self.update()
+    
+    def dropEvent(self, event):
+        self._hovered = False
+        self.update()
+        event.acceptProposedAction()
+        self.order_dropped.emit(int(bytes(event.mimeData().data(TABLE_MIME_TYPE))), self.table_number)
+    
+    def mouseReleaseEvent(self, event):
+        super().mouseReleaseEvent(event)
+        if self._press_pos is not None and self.pos() != self._press_pos:
+            self.moved.emit(self.table_number, self.pos().x(), self.pos().y())
+        elif self._press_pos is not None and event.button() == Qt.LeftButton:
+            self.clicked.emit(self.table_number)
+        self._press_pos = None
+
+
+class SnapshotSyncWorker(QThread):
+    """Anlık görüntüyü veritabanıyla arka planda uzlaştır"""
+    
+    synced = pyqtSignal(dict)
+    failed = pyqtSignal(str)
+    
+    def __init__(self, db, known_versions: dict, catalog_version, parent=None):
+        super().__init__(parent)
+        self.db = db
+        self.known_versions = known_versions
+        self.catalog_version = catalog_version
+    
+    def run(self):
+        try:
+            # Anlık görüntüden açılışta indeks/şema kontrolü de burada yapılır
+            if self.db.setup_pending:
+                self.db.setup()
+            changes = fetch_changes(self.db, self.known_versions, self.catalog_version)
+        except Exception as e:
+            self.failed.emit(str(e))
+            return
+        self.synced.emit(changes)
+
+
+class FloorView(QGraphicsView):
+    """Yakınlaştırılabilir masa planı görünümü"""
+    
+    MIN_SCALE = 0.3
+    MAX_SCALE = 2.0
+    
+    def __init__(self, scene: QGraphicsScene, parent=None):
+        super().__init__(scene, parent)
+        self.setRenderHint(QPainter.Antialiasing)
+        # Sadece değişen/görünen bölgeyi yeniden çiz
+        self.setViewportUpdateMode(QGraphicsView.SmartViewportUpdate)
+        self.setOptimizationFlag(QGraphicsView.DontSavePainterState)
+        self.setTransformationAnchor(QGraphicsView.AnchorUnderMouse)
+        self.setDragMode(QGraphicsView.ScrollHandDrag)
+        self.setBackgroundBrush(QColor(COLORS["background"]))
+    
+    def wheelEvent(self, event):
+        """Fare tekerleği ile yakınlaştır/uzaklaştır"""
+        factor = 1.15 if event.angleDelta().y() > 0 else 1 / 1.15
+        scale = self.transform().m11() * factor
+        if self.MIN_SCALE <= scale <= self.MAX_SCALE:
+            self.scale(factor, factor)
+    
+    def fit_items(self):
+        """Bölgedeki masaları sığdır (okunamayacak kadar küçültmeden)"""
+        rect = self.scene().itemsBoundingRect().adjusted(-20, -20, 20, 20)
+        self.resetTransform()
+        if rect.isEmpty():
+            return
+        scale = min(
+            self.viewport().width() / rect.width(),
+            self.viewport().height() / rect.height(),
+            1.0
+        )
+        scale = max(scale, self.MIN_SCALE)
+        self.scale(scale, scale)
+        self.centerOn(rect.center())
 
 
 class FloorPlanTab(QWidget):
-    """Masa planı sekmesi - Dinamik masa yönetimi"""
+    """Masa planı sekmesi - Bölgelere ayrılmış dinamik masa yönetimi"""
     
-    def __init__(self, db):
+    def __init__(self, db, snapshot: TerminalSnapshot = None):
         super().__init__()
         self.db = db
-        self.table_buttons = {}  # table_number -> button mapping
+        # Plan anlık görüntüden çizilir, veritabanıyla arka planda uzlaştırılır
+        self.snapshot = snapshot or TerminalSnapshot()
+        self.zone_scenes = {}  # zone -> QGraphicsScene (ilk gösterimde yüklenir)
+        self.table_items = {}  # zone -> {table_number -> TableItem}
+        self.sync_worker = None
+        self._sync_again = False
         self.init_ui()
-        self.refresh_floor_plan()
+        self.load_zones()
+        self.update_stock_alert()
+        self.update_occupancy()
+        
+        self.sync_timer = QTimer(self)
+        self.sync_timer.timeout.connect(self.sync)
+        self.sync_timer.start(SYNC_INTERVAL_MS)
+        # Tüm masalar için tek zamanlayıcı: sadece dolu masalar yeniden çizilir, veritabanı okunmaz
+        self.elapsed_timer = QTimer(self)
+        self.elapsed_timer.timeout.connect(self.refresh_elapsed)
+        self.elapsed_timer.start(ELAPSED_REFRESH_MS)
+        self.sync()
     
     def init_ui(self):
         """Arayüzü oluştur"""
@@ -26,16 +252,38 @@ class FloorPlanTab(QWidget):
         layout.setContentsMargins(20, 20, 20, 20)
         layout.setSpacing(15)
         
-        # Başlık
+        # Başlık ve bölge seçimi
+        header_layout = QHBoxLayout()
         title = QLabel("Masa Planı")
         title.setFont(QFont("Arial", 18, QFont.Bold))
-        layout.addWidget(title)
+        header_layout.addWidget(title)
+        header_layout.addStretch()
+        
+        # Anlık doluluk (anlık görüntüden)
+        self.occupancy_label = QLabel("")
+        header_layout.addWidget(self.occupancy_label)
+        
+        # Stoğu uyarı eşiğine inen ürünler
+        self.stock_alert_label = QLabel("")
+        set_role(self.stock_alert_label, "alert")
+        header_layout.addWidget(self.stock_alert_label)
+        
+        header_layout.addWidget(QLabel("Bölge:"))
+        self.zone_input = QComboBox()
+        self.zone_input.setMinimumWidth(150)
+        self.zone_input.currentTextChanged.connect(self.show_zone)
+        header_layout.addWidget(self.zone_input)
         
-        # Grid layout için container widget
-        self.floor_container = QWidget()
-        self.grid_layout = QGridLayout(self.floor_container)
-        self.grid_layout.setSpacing(10)
-        layout.addWidget(self.floor_container, stretch=1)
+        self.btn_edit_layout = QPushButton("✏️ Yerleşimi Düzenle")
+        self.btn_edit_layout.setCheckable(True)
+        self.btn_edit_layout.setMinimumHeight(30)
+        self.btn_edit_layout.toggled.connect(self.set_layout_editable)
+        header_layout.addWidget(self.btn_edit_layout)
+        layout.addLayout(header_layout)
+        
+        # Masa planı görünümü
+        self.floor_view = FloorView(QGraphicsScene(self))
+        layout.addWidget(self.floor_view, stretch=1)
         
         # Alt kısım butonları
         button_layout = QHBoxLayout()
@@ -46,143 +294,277 @@ class FloorPlanTab(QWidget):
         self.btn_add.setMinimumHeight(40)
         self.btn_add.setMinimumWidth(150)
         self.btn_add.clicked.connect(self.add_table)
-        self.style_button(self.btn_add, "#27ae60")
+        set_role(self.btn_add, "success")
         button_layout.addWidget(self.btn_add)
         
+        # Toplu masa ekle butonu
+        self.btn_add_many = QPushButton("➕➕ Toplu Ekle")
+        self.btn_add_many.setMinimumHeight(40)
+        self.btn_add_many.setMinimumWidth(150)
+        self.btn_add_many.clicked.connect(self.add_tables)
+        set_role(self.btn_add_many, "success")
+        button_layout.addWidget(self.btn_add_many)
+        
+        # Yeni bölge butonu
+        self.btn_add_zone = QPushButton("🏠 Bölge Ekle")
+        self.btn_add_zone.setMinimumHeight(40)
+        self.btn_add_zone.setMinimumWidth(150)
+        self.btn_add_zone.clicked.connect(self.add_zone)
+        set_role(self.btn_add_zone, "primary")
+        button_layout.addWidget(self.btn_add_zone)
+        
         # Masa sil butonu
         self.btn_remove = QPushButton("➖ Masa Sil")
         self.btn_remove.setMinimumHeight(40)
         self.btn_remove.setMinimumWidth(150)
         self.btn_remove.clicked.connect(self.remove_table)
-        self.style_button(self.btn_remove, "#e74c3c")
+        set_role(self.btn_remove, "danger")
         button_layout.addWidget(self.btn_remove)
         
         button_layout.addStretch()
         layout.addLayout(button_layout)
     
-    def style_button(self, button: QPushButton, color: str):
-        """Buton stilini uygula"""
-        button.setStyleSheet(f"""
-            QPushButton {{
-                background-color: {color};
-                color: white;
-                border: none;
-                border-radius: 5px;
-                font-size: 14px;
-                font-weight: bold;
-            }}
-            QPushButton:hover {{
-                background-color: {self.darken_color(color)};
-            }}
-            QPushButton:pressed {{
-                background-color: {self.darken_color(color, 0.8)};
-            }}
-        """)
-    
-    def darken_color(self, color: str, factor: float = 0.9) -> str:
-        """Rengi koyulaştır (basit yaklaşım)"""
-        # Hex rengi koyulaştır
-        color_map = {
-            "#27ae60": "#229954",
-            "#e74c3c": "#c0392b",
-            "#3498db": "#2980b9"
-        }
-        return color_map.get(color, color)
+    @property
+    def current_zone(self) -> str:
+        return self.zone_input.currentText() or DEFAULT_ZONE
+    
+    def load_zones(self, select: str = None):
+        """Bölge listesini yükle ve seçili bölgeyi göster"""
+        select = select or self.zone_input.currentText() or None
+        self.zone_input.blockSignals(True)
+        self.zone_input.clear()
+        self.zone_input.addItems(self.snapshot.zones())
+        if select and self.zone_input.findText(select) < 0:
+            self.zone_input.addItem(select)
+        if select:
+            self.zone_input.setCurrentText(select)
+        self.zone_input.blockSignals(False)
+        self.show_zone(self.current_zone)
+    
+    def show_zone(self, zone: str):
+        """Bölgeyi göster; sahnesi ilk kez gösteriliyorsa oluştur"""
+        if not zone:
+            return
+        if zone not in self.zone_scenes:
+            scene = QGraphicsScene(self)
+            # Görünür alan sorguları için BSP indeksi (kırpma)
+            scene.setItemIndexMethod(QGraphicsScene.BspTreeIndex)
+            self.zone_scenes[zone] = scene
+            self.table_items[zone] = {}
+            self.floor_view.setScene(scene)
+            self.refresh_floor_plan()
+        else:
+            self.floor_view.setScene(self.zone_scenes[zone])
+            self.refresh_floor_plan()
+    
+    def sync(self):
+        """Değişen masaları (ve kataloğu) veritabanından arka planda çek"""
+        if self.sync_worker and self.sync_worker.isRunning():
+            # Süren uzlaştırma bitince bir kez daha çalıştırılır
+            self._sync_again = True
+            return
+        self._sync_again = False
+        self.sync_worker = SnapshotSyncWorker(
+            self.db, self.snapshot.known_versions(), self.snapshot.catalog_version, self
+        )
+        self.sync_worker.synced.connect(self.on_synced)
+        self.sync_worker.failed.connect(self.on_sync_failed)
+        self.sync_worker.finished.connect(self.on_sync_finished)
+        self.sync_worker.start()
+    
+    def on_synced(self, changes: dict):
+        """Uzlaştırma sonucunu anlık görüntüye uygula, planı ve dosyayı güncelle"""
+        if not self.snapshot.apply(changes):
+            return
+        zones = [self.zone_input.itemText(i) for i in range(self.zone_input.count())]
+        if set(self.snapshot.zones()) != set(zones):
+            self.load_zones()
+        else:
+            self.refresh_floor_plan()
+        self.update_stock_alert()
+        self.update_occupancy()
+        self.snapshot.save()
+    
+    def update_stock_alert(self):
+        """Azalan stokları başlıkta göster (önbellekteki stok adetlerinden)"""
+        low = self.snapshot.low_stock_products()
+        names = ", ".join(f"{product['name']} ({product['stock']})" for product in low[:3])
+        if len(low) > 3:
+            names += f" +{len(low) - 3}"
+        self.stock_alert_label.setText(f"⚠️ Stok azaldı: {names}" if low else "")
+        self.stock_alert_label.setToolTip(
+            "\n".join(f"{product['name']}: {product['stock']}" for product in low)
+        )
+    
+    def update_occupancy(self):
+        """Dolu masa oranını başlıkta göster"""
+        occupied, total = self.snapshot.occupancy()
+        rate = f" (%{occupied * 100 // total})" if total else ""
+        self.occupancy_label.setText(f"Doluluk: {occupied}/{total}{rate}")
+    
+    def refresh_elapsed(self):
+        """Dolu masalardaki geçen süreyi yeniden çiz"""
+        for items in self.table_items.values():
+            for item in items.values():
+                if item.status == "Dolu" and item.opened_at is not None:
+                    item.update()
+    
+    def on_sync_failed(self, message: str):
+        # Plan anlık görüntüden gösterilmeye devam eder, sonraki turda tekrar denenir
+        logger.warning(f"Masa planı veritabanıyla uzlaştırılamadı: {message}")
+    
+    def on_sync_finished(self):
+        self.sync_worker.deleteLater()
+        self.sync_worker = None
+        if self._sync_again:
+            self.sync()
     
     def refresh_floor_plan(self):
-        """Masa planını yeniden çiz"""
-        # Mevcut butonları temizle
-        for button in self.table_buttons.values():
-            self.grid_layout.removeWidget(button)
-            button.deleteLater()
-        self.table_buttons.clear()
+        """Görünen bölgenin masalarını anlık görüntüden güncelle (sadece değişenler yeniden çizilir)"""
+        zone = self.current_zone
+        scene = self.zone_scenes.get(zone)
+        if scene is None:
+            return
+        items = self.table_items[zone]
+        tables = self.snapshot.zone_tables(zone)
         
-        # Masaları veritabanından çek
-        tables = self.db.get_all_tables()
+        # Silinen masaları kaldır
+        current_numbers = {table["table_number"] for table in tables}
+        for table_num in list(items):
+            if table_num not in current_numbers:
+                scene.removeItem(items.pop(table_num))
         
-        if not tables:
-            # Masalar yoksa bilgi mesajı göster
-            info_label = QLabel("Henüz masa yok. Yukarıdaki butondan masa ekleyebilirsiniz.")
-            info_label.setAlignment(Qt.AlignCenter)
-            info_label.setStyleSheet("color: #7f8c8d; font-size: 14px; padding: 20px;")
-            self.grid_layout.addWidget(info_label, 0, 0)
-            return
+        # İlk kez masa yerleştirilen bölge görünüme sığdırılır
+        first_paint = not items and bool(tables)
+        self.place_tables(tables, scene, items)
+        for table in tables:
+            items[table["table_number"]].set_state(table)
         
-        # Izgara boyutunu hesapla (yaklaşık kare bir düzen için)
-        import math
-        num_tables = len(tables)
-        cols = math.ceil(math.sqrt(num_tables))
-        rows = math.ceil(num_tables / cols)
+        if not tables and not scene.items():
+            # Masalar yoksa bilgi mesajı göster
+            info = scene.addText("Henüz masa yok. Aşağıdaki butondan masa ekleyebilirsiniz.")
+            info.setDefaultTextColor(QColor(COLORS["muted"]))
+            info.setFont(QFont("Arial", 14))
+        elif tables:
+            for item in scene.items():
+                if not isinstance(item, TableItem):
+                    scene.removeItem(item)
         
-        # Butonları ızgaraya yerleştir
+        if first_paint:
+            self.floor_view.fit_items()
+    
+    def place_tables(self, tables: list, scene: QGraphicsScene, items: dict):
+        """Bölgenin masalarını konumlarıyla yerleştir, eksik olanları oluştur"""
+        # Konumu olmayan masaları kare bir ızgaraya yerleştir
+        cols = max(1, math.ceil(math.sqrt(len(tables))))
         for idx, table in enumerate(tables):
             table_num = table["table_number"]
-            status = table["status"]
+            item = items.get(table_num)
+            if item is None:
+                item = TableItem(table)
+                item.setFlag(QGraphicsItem.ItemIsMovable, self.btn_edit_layout.isChecked())
+                item.clicked.connect(self.open_order_dialog)
+                item.moved.connect(self.save_table_position)
+                item.order_dropped.connect(self.move_order)
+                scene.addItem(item)
+                items[table_num] = item
             
-            # Masa butonu oluştur
-            btn = QPushButton(f"Masa {table_num}\n{status}")
-            btn.setMinimumSize(120, 100)
-            btn.setFont(QFont("Arial", 12, QFont.Bold))
-            
-            # Duruma göre renk
-            if status == "Boş":
-                btn.setStyleSheet("""
-                    QPushButton {
-                        background-color: #27ae60;
-                        color: white;
-                        border: 2px solid #229954;
-                        border-radius: 10px;
-                    }
-                    QPushButton:hover {
-                        background-color: #229954;
-                    }
-                """)
-            else:  # Dolu
-                btn.setStyleSheet("""
-                    QPushButton {
-                        background-color: #e74c3c;
-                        color: white;
-                        border: 2px solid #c0392b;
-                        border-radius: 10px;
-                    }
-                    QPushButton:hover {
-                        background-color: #c0392b;
-                    }
-                """)
-            
-            # Buton tıklama olayı
-            btn.clicked.connect(lambda checked, tn=table_num: self.open_order_dialog(tn))
-            
-            # Izgaraya ekle
-            row = idx // cols
-            col = idx % cols
-            self.grid_layout.addWidget(btn, row, col)
-            
-            # Mapping'de sakla
-            self.table_buttons[table_num] = btn
+            if table.get("x") is not None and table.get("y") is not None:
+                item.setPos(table["x"], table["y"])
+            else:
+                item.setPos((idx % cols) * TILE_SPACING_X, (idx // cols) * TILE_SPACING_Y)
+    
+    def set_layout_editable(self, editable: bool):
+        """Masaların sürüklenerek yerleştirilmesine izin ver"""
+        for items in self.table_items.values():
+            for item in items.values():
+                item.setFlag(QGraphicsItem.ItemIsMovable, editable)
+        self.floor_view.setDragMode(
+            QGraphicsView.NoDrag if editable else QGraphicsView.ScrollHandDrag
+        )
+    
+    def save_table_position(self, table_number: int, x: float, y: float):
+        """Sürüklenen masanın yeni konumunu kaydet"""
+        try:
+            self.db.update_table_layout(table_number, x, y)
+            # Uzlaştırmadan önce yapılan yeniden çizim masayı eski yerine götürmesin
+            self.snapshot.update_table(table_number, x=x, y=y)
+        except Exception as e:
+            QMessageBox.critical(self, "Hata", f"Masa konumu kaydedilemedi:\n{str(e)}")
+    
+    def move_order(self, source: int, target: int):
+        """Sürüklenen masanın adisyonunu hedefe taşı (hedef doluysa birleştir)"""
+        target_item = self.table_items.get(self.current_zone, {}).get(target)
+        merge = target_item is not None and target_item.status == "Dolu"
+        question = (
+            f"Masa {source} adisyonu Masa {target} ile birleştirilecek. Emin misiniz?"
+            if merge else f"Masa {source} adisyonu Masa {target} masasına taşınacak. Emin misiniz?"
+        )
+        if QMessageBox.question(self, "Onay", question, QMessageBox.Yes | QMessageBox.No) != QMessageBox.Yes:
+            return
         
-        # Izgarayı ortala
-        for i in range(cols):
-            self.grid_layout.setColumnStretch(i, 1)
-        for i in range(rows):
-            self.grid_layout.setRowStretch(i, 1)
+        try:
+            if merge:
+                self.db.merge_tables(source, target)
+            else:
+                self.db.transfer_order(source, target)
+        except ValueError as e:
+            QMessageBox.warning(self, "Uyarı", str(e))
+        except Exception as e:
+            QMessageBox.critical(self, "Hata", f"Adisyon taşınırken hata oluştu:\n{str(e)}")
+        self.sync()
     
     def add_table(self):
-        """Yeni masa ekle"""
+        """Seçili bölgeye yeni masa ekle"""
         try:
-            new_table_num = self.db.add_table()
-            self.refresh_floor_plan()
+            new_table_num = self.db.add_table(self.current_zone)
+            self.sync()
             QMessageBox.information(
-                self, 
-                "Başarılı", 
+                self,
+                "Başarılı",
                 f"Masa {new_table_num} başarıyla eklendi."
             )
         except Exception as e:
             QMessageBox.critical(self, "Hata", f"Masa eklenirken hata oluştu:\n{str(e)}")
     
+    def add_tables(self):
+        """Seçili bölgeye birden fazla masayı tek seferde ekle"""
+        count, ok = QInputDialog.getInt(self, "Toplu Masa Ekle", "Eklenecek masa sayısı:", 10, 1, 500)
+        if not ok:
+            return
+        
+        try:
+            numbers = self.db.add_tables(count, self.current_zone)
+            self.sync()
+            QMessageBox.information(
+                self,
+                "Başarılı",
+                f"Masa {numbers[0]} - {numbers[-1]} başarıyla eklendi."
+            )
+        except Exception as e:
+            QMessageBox.critical(self, "Hata", f"Masalar eklenirken hata oluştu:\n{str(e)}")
+    
+    def add_zone(self):
+        """Yeni bölge oluştur (bölge ilk masalarıyla birlikte kaydedilir)"""
+        zone, ok = QInputDialog.getText(self, "Bölge Ekle", "Bölge adı (ör. Teras, Bahçe):")
+        zone = zone.strip()
+        if not ok or not zone:
+            return
+        
+        count, ok = QInputDialog.getInt(self, "Bölge Ekle", f"'{zone}' için masa sayısı:", 4, 1, 500)
+        if not ok:
+            return
+        
+        try:
+            self.db.add_tables(count, zone)
+            self.load_zones(select=zone)
+            self.sync()
+        except Exception as e:
+            QMessageBox.critical(self, "Hata", f"Bölge eklenirken hata oluştu:\n{str(e)}")
+    
     def remove_table(self):
         """En yüksek numaralı masayı sil"""
-        tables = self.db.get_all_tables()
+        tables = self.db.get_table_statuses()
         if not tables:
             QMessageBox.warning(self, "Uyarı", "Silinecek masa yok.")
             return
@@ -194,8 +576,8 @@ class FloorPlanTab(QWidget):
         
         if status == "Dolu":
             QMessageBox.warning(
-                self, 
-                "Uyarı", 
+                self,
+                "Uyarı",
                 f"Masa {table_num} şu anda dolu. Sipariş kapatılmadan masa silinemez!"
             )
             return
@@ -211,7 +593,7 @@ class FloorPlanTab(QWidget):
         if reply == QMessageBox.Yes:
             try:
                 self.db.delete_table(table_num)
-                self.refresh_floor_plan()
+                self.sync()
                 QMessageBox.information(self, "Başarılı", f"Masa {table_num} silindi.")
             except ValueError as e:
                 QMessageBox.warning(self, "Hata", str(e))
@@ -225,8 +607,11 @@ class FloorPlanTab(QWidget):
             QMessageBox.warning(self, "Hata", "Masa bulunamadı!")
             return
         
-        dialog = OrderDialog(self.db, table_data, self)
+        # Ürün menüsü anlık görüntüdeki katalog ve stok adetlerinden çizilir
+        dialog = OrderDialog(
+            self.db, table_data, self,
+            catalog=self.snapshot.catalog, stock=self.snapshot.stock
+        )
         dialog.exec_()
-        # Diyalog kapatıldıktan sonra masa planını yenile
-        self.refresh_floor_plan()
-
+        # Diyalog kapatıldıktan sonra değişen masayı çek
+        self.sync()
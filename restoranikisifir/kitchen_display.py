@@ -0,0 +1,261 @@
+"""
+Mutfak ekranı - Siparişlerden gelen fişleri canlı olarak gösterir
+
+Ayrı bir giriş noktasıdır, mutfaktaki ekranda çalıştırılır:
+    python kitchen_display.py
+"""
+import sys
+from collections import OrderedDict
+from datetime import timedelta
+from PyQt5.QtWidgets import (
+    QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout,
+    QGridLayout, QLabel, QPushButton, QFrame, QScrollArea, QMessageBox
+)
+from PyQt5.QtCore import Qt, QThread, pyqtSignal
+from PyQt5.QtGui import QFont
+from pymongo.errors import OperationFailure, PyMongoError
+from database import Database, KITCHEN_STATUSES
+from theme import apply_theme, set_role
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Ekranda tutulacak en fazla aktif fiş (en eskiler düşer)
+MAX_ACTIVE_TICKETS = 48
+# Change stream kullanılamazsa yoklama aralığı (ms)
+POLL_INTERVAL_MS = 500
+# Yoklamada son görülen andan bu kadar geriye de bakılır: aynı anda başlayıp
+# sırası karışık tamamlanan yazmalar kaçmasın (tekrarlar ayıklanır)
+POLL_OVERLAP_SECONDS = 2
+TICKET_COLUMNS = 4
+
+
+class KitchenTicketFeed(QThread):
+    """
+    Mutfak fişlerini izleyen arka plan iş parçacığı
+    
+    Replica set üzerinde change stream, ilk okumanın işlem zamanından
+    başlatılır; tek sunuculu kurulumda sunucu saatiyle ($$NOW) yazılan
+    updated_at indeksi üzerinden sadece değişen fişler yoklanır.
+    """
+    
+    ticket_changed = pyqtSignal(dict)
+    
+    def __init__(self, db: Database, since, operation_time=None, parent=None):
+        """
+        Args:
+            db: Veritabanı
+            since: İlk okumadan önceki sunucu saati (yoklama buradan başlar)
+            operation_time: İlk okumanın işlem zamanı (change stream buradan başlar)
+        """
+        super().__init__(parent)
+        self.db = db
+        self.since = since
+        self.operation_time = operation_time
+        self._running = True
+    
+    def stop(self):
+        """İzlemeyi durdur ve iş parçacığının bitmesini bekle"""
+        self._running = False
+        self.wait()
+    
+    def run(self):
+        try:
+            self.watch_change_stream()
+        except OperationFailure as e:
+            logger.info(f"Change stream kullanılamıyor, yoklamaya geçiliyor: {e}")
+            self.poll()
+    
+    def watch_change_stream(self):
+        """Yeni ve güncellenen fişleri change stream ile al"""
+        pipeline = [{"$match": {"operationType": {"$in": ["insert", "update", "replace"]}}}]
+        with self.db.kitchen_tickets.watch(
+            pipeline, full_document="updateLookup", start_at_operation_time=self.operation_time
+        ) as stream:
+            while self._running and stream.alive:
+                change = stream.try_next()
+                if change is None:
+                    self.msleep(100)
+                    continue
+                ticket = change.get("fullDocument")
+                if ticket:
+                    self.ticket_changed.emit(ticket)
+    
+    def poll(self):
+        """Son görülen andan sonra değişen fişleri düzenli aralıklarla çek"""
+        overlap = timedelta(seconds=POLL_OVERLAP_SECONDS)
+        # ticket_id -> son gönderilen updated_at (örtüşen pencerede tekrarları ayıklar)
+        seen = {}
+        while self._running:
+            try:
+                for ticket in self.db.get_kitchen_tickets_since(self.since - overlap):
+                    if seen.get(ticket["_id"]) == ticket["updated_at"]:
+                        continue
+                    seen[ticket["_id"]] = ticket["updated_at"]
+                    self.since = max(self.since, ticket["updated_at"])
+                    self.ticket_changed.emit(ticket)
+                seen = {
+                    ticket_id: updated_at for ticket_id, updated_at in seen.items()
+                    if updated_at > self.since - overlap
+                }
+            except PyMongoError as e:
+                logger.error(f"Mutfak fişleri alınamadı: {e}")
+            self.msleep(POLL_INTERVAL_MS)
+
+
+class TicketCard(QFrame):
+    """Tek bir mutfak fişi kartı"""
+    
+    status_requested = pyqtSignal(object, str)
+    
+    def __init__(self, ticket: dict, parent=None):
+        super().__init__(parent)
+        self.ticket_id = ticket["_id"]
+        status = ticket["status"]
+        set_role(self, "ticket", status=status)
+        self.setMinimumWidth(220)
+        
+        layout = QVBoxLayout(self)
+        
+        created = ticket["created_at"].strftime("%H:%M")
+        header = QLabel(f"Masa {ticket['table_number']}  •  {created}")
+        header.setFont(QFont("Arial", 14, QFont.Bold))
+        layout.addWidget(header)
+        
+        status_label = QLabel(status)
+        set_role(status_label, "ticket-status", status=status)
+        layout.addWidget(status_label)
+        
+        for item in ticket["items"]:
+            item_label = QLabel(f"{item['quantity']} x {item['name']}")
+            item_label.setFont(QFont("Arial", 12))
+            layout.addWidget(item_label)
+        
+        layout.addStretch()
+        
+        # Sıradaki durum butonu (Yeni -> Hazırlanıyor -> Tamamlandı)
+        next_status = KITCHEN_STATUSES[KITCHEN_STATUSES.index(status) + 1]
+        btn_next = QPushButton("👨‍🍳 Başla" if next_status == "Hazırlanıyor" else "✅ Tamamlandı")
+        btn_next.setMinimumHeight(40)
+        set_role(btn_next, "primary" if next_status == "Hazırlanıyor" else "success")
+        btn_next.clicked.connect(lambda: self.status_requested.emit(self.ticket_id, next_status))
+        layout.addWidget(btn_next)
+
+
+class KitchenDisplayWindow(QMainWindow):
+    """Aktif mutfak fişlerini gösteren pencere"""
+    
+    def __init__(self, db: Database):
+        super().__init__()
+        self.db = db
+        # ticket_id -> fiş; sınırlı halka (eski fişler düşer)
+        self.active_tickets = OrderedDict()
+        self.init_ui()
+        
+        tickets, operation_time, since = self.db.get_kitchen_snapshot(MAX_ACTIVE_TICKETS)
+        for ticket in tickets:
+            self.store_ticket(ticket)
+        self.render_tickets()
+        
+        self.feed = KitchenTicketFeed(self.db, since, operation_time, self)
+        self.feed.ticket_changed.connect(self.on_ticket_changed)
+        self.feed.start()
+    
+    def init_ui(self):
+        """Arayüzü oluştur"""
+        self.setWindowTitle("Mutfak Ekranı")
+        self.setGeometry(100, 100, 1200, 800)
+        
+        central_widget = QWidget()
+        self.setCentralWidget(central_widget)
+        layout = QVBoxLayout(central_widget)
+        
+        header_layout = QHBoxLayout()
+        title = QLabel("🍳 Mutfak Siparişleri")
+        title.setFont(QFont("Arial", 18, QFont.Bold))
+        header_layout.addWidget(title)
+        header_layout.addStretch()
+        self.count_label = QLabel("")
+        self.count_label.setFont(QFont("Arial", 12))
+        header_layout.addWidget(self.count_label)
+        layout.addLayout(header_layout)
+        
+        scroll = QScrollArea()
+        scroll.setWidgetResizable(True)
+        self.tickets_widget = QWidget()
+        self.tickets_layout = QGridLayout(self.tickets_widget)
+        self.tickets_layout.setAlignment(Qt.AlignTop | Qt.AlignLeft)
+        scroll.setWidget(self.tickets_widget)
+        layout.addWidget(scroll, stretch=1)
+    
+    def store_ticket(self, ticket: dict):
+        """Fişi aktif listeye ekle/güncelle, tamamlananları çıkar"""
+        ticket_id = ticket["_id"]
+        if ticket["status"] == KITCHEN_STATUSES[-1]:
+            self.active_tickets.pop(ticket_id, None)
+            return
+        self.active_tickets[ticket_id] = ticket
+        while len(self.active_tickets) > MAX_ACTIVE_TICKETS:
+            self.active_tickets.popitem(last=False)
+    
+    def on_ticket_changed(self, ticket: dict):
+        """Arka plandan gelen fiş değişikliğini uygula"""
+        self.store_ticket(ticket)
+        self.render_tickets()
+    
+    def render_tickets(self):
+        """Aktif fiş kartlarını yeniden diz"""
+        while self.tickets_layout.count():
+            widget = self.tickets_layout.takeAt(0).widget()
+            if widget:
+                widget.deleteLater()
+        
+        tickets = sorted(self.active_tickets.values(), key=lambda t: t["created_at"])
+        for idx, ticket in enumerate(tickets):
+            card = TicketCard(ticket)
+            card.status_requested.connect(self.set_ticket_status)
+            self.tickets_layout.addWidget(card, idx // TICKET_COLUMNS, idx % TICKET_COLUMNS)
+        
+        self.count_label.setText(f"Aktif fiş: {len(tickets)}")
+    
+    def set_ticket_status(self, ticket_id, status: str):
+        """Fişi bir sonraki duruma geçir"""
+        try:
+            self.db.update_kitchen_ticket_status(ticket_id, status)
+        except Exception as e:
+            QMessageBox.critical(self, "Hata", f"Fiş güncellenemedi:\n{str(e)}")
+            return
+        
+        ticket = self.active_tickets.get(ticket_id)
+        if ticket:
+            self.store_ticket(dict(ticket, status=status))
+            self.render_tickets()
+    
+    def closeEvent(self, event):
+        self.feed.stop()
+        super().closeEvent(event)
+
+
+def main():
+    """Mutfak ekranını başlat"""
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+    app = QApplication(sys.argv)
+    apply_theme(app)
+    
+    try:
+        db = Database.from_env()
+    except Exception as e:
+        logger.error(f"Mutfak ekranı başlatılamadı: {e}")
+        QMessageBox.critical(None, "Hata", f"Veritabanına bağlanılamadı:\n{str(e)}")
+        sys.exit(1)
+    
+    window = KitchenDisplayWindow(db)
+    window.show()
+    sys.exit(app.exec_())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,294 @@
+"""
+Veritabanı katmanı için yük testi
+
+N terminali iş parçacıkları olarak benzetir. Her terminal düşünme
+süreleriyle gerçekçi bir akış izler: masa planını yenile, masaya ürün ekle,
+hesap kapat, rapor aç. Sonunda işlem hacmi, gecikme dağılımı (p50/p95/p99),
+çakışmalar ve kayıp/geri yazılan güncellemeler raporlanır. Sonuç JSON olarak da yazılır
+(commit ile birlikte), böylece farklı sürümler karşılaştırılabilir. Ayrı bir
+veritabanı kullanır ve işini bitirince siler; bu yüzden adı LOAD_DB_PREFIX ile
+başlamayan veritabanlarında çalışmaz.
+
+Kullanım:
+    python load_test.py --terminals 16 --duration 60 --json sonuc.json
+    python load_test.py --terminals 16 --mode atomic   # add_item_to_table ile
+"""
+import argparse
+import json
+import random
+import subprocess
+import threading
+import time
+import uuid
+from collections import Counter, defaultdict
+from datetime import timedelta
+from database import Database
+
+# Silinecek veritabanının adı bununla başlamalı (restoran_db'yi korur)
+LOAD_DB_PREFIX = "restoran_load"
+
+# İşlem ağırlıkları (bir terminalin sıradaki adımı bu oranlarla seçilir)
+OPERATION_WEIGHTS = {
+    "floor": 40,
+    "order": 40,
+    "close": 12,
+    "report": 8,
+}
+
+
+class LoadStats:
+    """İş parçacıkları arasında paylaşılan ölçümler"""
+    
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.conflicts = defaultdict(int)
+        # (masa, ürün) -> eklenen adet
+        self.units_added = Counter()
+    
+    def record(self, operation: str, elapsed: float):
+        with self.lock:
+            self.latencies[operation].append(elapsed)
+    
+    def conflict(self, operation: str):
+        with self.lock:
+            self.conflicts[operation] += 1
+    
+    def error(self, operation: str):
+        with self.lock:
+            self.errors[operation] += 1
+    
+    def add_units(self, table_number: int, product_id, count: int):
+        with self.lock:
+            self.units_added[(table_number, str(product_id))] += count
+
+
+def percentile(sorted_values, ratio: float) -> float:
+    """Sıralı listeden yüzdelik değer (en yakın sıra yöntemi)"""
+    if not sorted_values:
+        return 0.0
+    index = max(0, min(len(sorted_values) - 1, int(round(ratio * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+
+class Terminal(threading.Thread):
+    """Tek bir kasa/sipariş terminali"""
+    
+    def __init__(self, db: Database, products, stats: LoadStats, deadline: float, args, seed: int):
+        super().__init__(daemon=True)
+        self.db = db
+        self.products = products
+        self.stats = stats
+        self.deadline = deadline
+        self.args = args
+        self.random = random.Random(seed)
+        self.table_numbers = []
+    
+    def think(self):
+        """İnsan terminal kullanımını benzeten bekleme"""
+        low, high = self.args.think_min, self.args.think_max
+        if high > 0:
+            time.sleep(self.random.uniform(low, high) / 1000)
+    
+    def run(self):
+        operations = list(OPERATION_WEIGHTS)
+        weights = list(OPERATION_WEIGHTS.values())
+        self.timed("floor", self.refresh_floor)
+        while time.perf_counter() < self.deadline:
+            operation = self.random.choices(operations, weights)[0]
+            self.timed(operation, getattr(self, f"do_{operation}"))
+            self.think()
+    
+    def timed(self, operation: str, func):
+        started = time.perf_counter()
+        try:
+            func()
+        except ValueError:
+            # Hesabı kapatılmakta olan masaya yazma denemesi
+            self.stats.conflict(operation)
+        except Exception:
+            self.stats.error(operation)
+            return
+        self.stats.record(operation, time.perf_counter() - started)
+    
+    def refresh_floor(self):
+        self.table_numbers = [t["table_number"] for t in self.db.get_table_statuses(with_totals=True)]
+    
+    def do_floor(self):
+        self.refresh_floor()
+    
+    def do_order(self):
+        table_number = self.random.choice(self.table_numbers)
+        product = self.random.choice(self.products)
+        quantity = self.random.randint(1, 3)
+        
+        if self.args.mode == "atomic":
+            self.db.add_item_to_table(table_number, product, quantity)
+            self.stats.add_units(table_number, product["_id"], quantity)
+            return
+        
+        # Masaüstü uygulamasının yaptığı gibi: oku, değiştir, tüm adisyonu yaz
+        table = self.db.get_table(table_number)
+        order_items = list(table.get("current_order", []))
+        for item in order_items:
+            if item["product"]["_id"] == product["_id"]:
+                item["quantity"] += quantity
+                item["total"] = item["quantity"] * product["price"]
+                break
+        else:
+            order_items.append({
+                "product": product,
+                "quantity": quantity,
+                "total": quantity * product["price"]
+            })
+        # Sipariş ekranında geçen süre
+        self.think()
+        self.db.save_order_to_table(table_number, order_items)
+        self.stats.add_units(table_number, product["_id"], quantity)
+    
+    def do_close(self):
+        table_number = self.random.choice(self.table_numbers)
+        if not self.db.close_order(table_number, None, uuid.uuid4().hex):
+            # Masa boş ya da başka bir terminal kapatıyor
+            self.stats.conflict("close")
+    
+    def do_report(self):
+        today = self.db.calendar.today()
+        self.db.get_today_revenue()
+        self.db.get_product_sales(
+            self.db.calendar.day_start(today - timedelta(days=7)),
+            self.db.calendar.day_start(today + timedelta(days=1))
+        )
+
+
+def count_units(db: Database) -> Counter:
+    """Arşivlenmiş ve açık adisyonlardaki ürün adetleri: (masa, ürün) -> adet"""
+    units = Counter()
+    for collection, field in ((db.orders, "items"), (db.tables, "current_order")):
+        for row in collection.aggregate([
+            {"$unwind": f"${field}"},
+            {"$group": {
+                "_id": {"table": "$table_number", "product": f"${field}.product._id"},
+                "units": {"$sum": f"${field}.quantity"}
+            }}
+        ]):
+            units[(row["_id"]["table"], str(row["_id"]["product"]))] += row["units"]
+    return units
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "bilinmiyor"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Eşzamanlı terminal yük testi")
+    parser.add_argument("--connection", default="mongodb://localhost:27017/")
+    parser.add_argument("--db-name", default="restoran_load")
+    parser.add_argument("--tables", type=int, default=40)
+    parser.add_argument("--terminals", type=int, default=8)
+    parser.add_argument("--duration", type=float, default=30, help="Saniye")
+    parser.add_argument("--think-min", type=float, default=50, help="Düşünme süresi alt sınırı (ms)")
+    parser.add_argument("--think-max", type=float, default=300, help="Düşünme süresi üst sınırı (ms)")
+    parser.add_argument("--mode", choices=["desktop", "atomic"], default="desktop",
+                        help="desktop: oku-değiştir-yaz (save_order_to_table), atomic: add_item_to_table")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--json", help="Sonucun yazılacağı JSON dosyası")
+    args = parser.parse_args()
+    if not args.db_name.startswith(LOAD_DB_PREFIX):
+        parser.error(f"Yük testi veritabanı siler; --db-name '{LOAD_DB_PREFIX}' ile başlamalı")
+    
+    db = Database(args.connection, args.db_name, max_pool_size=max(100, args.terminals))
+    db.client.drop_database(args.db_name)
+    db = Database(args.connection, args.db_name, max_pool_size=max(100, args.terminals))
+    db.seed_database()
+    if args.tables > 10:
+        db.add_tables(args.tables - 10)
+    products = db.get_all_products()
+    for product in products:
+        product.pop("search_keys", None)
+    
+    stats = LoadStats()
+    started = time.perf_counter()
+    deadline = started + args.duration
+    terminals = [
+        Terminal(db, products, stats, deadline, args, args.seed + idx)
+        for idx in range(args.terminals)
+    ]
+    for terminal in terminals:
+        terminal.start()
+    for terminal in terminals:
+        terminal.join()
+    duration = time.perf_counter() - started
+    
+    # Her masa ve ürün için ayrı bakılır; toplamda kayıplar ve geri yazılanlar
+    # birbirini götürüp sorunu gizleyebilir. Eksik adet: ezilen (kaybolan)
+    # eklemeler; fazla adet: kapatılmış hesabın eski haliyle masaya geri
+    # yazılması (mükerrer hesap)
+    stored = count_units(db)
+    units_added = sum(stats.units_added.values())
+    stored_units = sum(stored.values())
+    unit_drift = stored_units - units_added
+    lost_units = resurrected_units = 0
+    for key in set(stored) | set(stats.units_added):
+        drift = stored[key] - stats.units_added[key]
+        if drift < 0:
+            lost_units -= drift
+        else:
+            resurrected_units += drift
+    
+    operations = {}
+    for operation in sorted(set(stats.latencies) | set(stats.errors)):
+        values = sorted(stats.latencies.get(operation, []))
+        operations[operation] = {
+            "count": len(values),
+            "p50_ms": round(percentile(values, 0.50) * 1000, 2),
+            "p95_ms": round(percentile(values, 0.95) * 1000, 2),
+            "p99_ms": round(percentile(values, 0.99) * 1000, 2),
+            "max_ms": round(values[-1] * 1000, 2) if values else 0.0,
+            "conflicts": stats.conflicts.get(operation, 0),
+            "errors": stats.errors.get(operation, 0),
+        }
+    total_ops = sum(op["count"] for op in operations.values())
+    result = {
+        "commit": git_commit(),
+        "mode": args.mode,
+        "terminals": args.terminals,
+        "tables": args.tables,
+        "duration_s": round(duration, 2),
+        "think_ms": [args.think_min, args.think_max],
+        "throughput_ops": round(total_ops / duration, 1),
+        "operations": operations,
+        "units_added": units_added,
+        "units_stored": stored_units,
+        "unit_drift": unit_drift,
+        "lost_units": lost_units,
+        "resurrected_units": resurrected_units,
+        "lost_update_rate": round(lost_units / units_added, 4) if units_added else 0.0,
+        "resurrection_rate": round(resurrected_units / units_added, 4) if units_added else 0.0,
+    }
+    
+    print(f"Commit           : {result['commit']} ({args.mode})")
+    print(f"Terminal / süre  : {args.terminals} / {duration:.1f} sn")
+    print(f"İşlem hacmi      : {result['throughput_ops']} işlem/sn")
+    for operation, op in operations.items():
+        print(f"  {operation:<7} n={op['count']:<6} p50={op['p50_ms']:.2f} p95={op['p95_ms']:.2f} "
+              f"p99={op['p99_ms']:.2f} ms  çakışma={op['conflicts']} hata={op['errors']}")
+    print(f"Adet farkı       : {unit_drift:+d} / {units_added} adet")
+    print(f"  kayıp          : {lost_units} adet (%{result['lost_update_rate'] * 100:.2f})")
+    print(f"  geri yazılan   : {resurrected_units} adet (%{result['resurrection_rate'] * 100:.2f})")
+    
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+    
+    db.client.drop_database(args.db_name)
+
+
+if __name__ == "__main__":
+    main()
@@ -6,6 +6,9 @@ from PyQt5.QtWidgets import QApplication
 from PyQt5.QtCore import Qt
 from database import Database
 from main_window import MainWindow
+from snapshot import TerminalSnapshot
+from theme import apply_theme
+from profiling import Profiler, ProfiledApplication
 import logging
 
 logging.basicConfig(
@@ -17,22 +20,37 @@ logger = logging.getLogger(__name__)
 
 def main():
     """Ana fonksiyon"""
+    # Profil modu (RESTORAN_PROFILE=1 veya --profile) açıksa olaylar ölçülür
+    profiler = Profiler.from_env(sys.argv)
+    
     # PyQt5 uygulaması oluştur
-    app = QApplication(sys.argv)
-    app.setStyle('Fusion')  # Modern görünüm için
+    app = ProfiledApplication(sys.argv, profiler) if profiler else QApplication(sys.argv)
+    # Fusion stili ve ortak stil sayfası (tek sefer derlenir)
+    apply_theme(app)
     
     try:
+        # Önceki çalışmadan kalan anlık görüntü (masa planı ve katalog)
+        snapshot = TerminalSnapshot.from_env()
+        # Anlık görüntü güncel şemadaysa pencere veritabanını beklemeden açılır;
+        # indeks/şema kontrolü masa planının ilk uzlaştırmasında arka planda yapılır
+        fast_start = snapshot.is_current
+        
         # Veritabanı bağlantısı
         logger.info("Veritabanına bağlanılıyor...")
-        db = Database()
+        db = Database.from_env(setup=not fast_start)
+        if profiler:
+            db = profiler.wrap_database(db)
         
         # Veritabanını seed et (eğer boşsa)
-        logger.info("Veritabanı kontrol ediliyor...")
-        db.seed_database()
+        if not fast_start:
+            logger.info("Veritabanı kontrol ediliyor...")
+            db.seed_database()
         
         # Ana pencereyi oluştur ve göster
         logger.info("Uygulama başlatılıyor...")
-        window = MainWindow(db)
+        window = MainWindow(db, snapshot)
+        if profiler:
+            profiler.install(window)
         window.show()
         
         # Uygulamayı çalıştır
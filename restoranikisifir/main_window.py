@@ -10,14 +10,17 @@ from PyQt5.QtGui import QFont
 from floor_plan_tab import FloorPlanTab
 from menu_management import MenuManagement
 from reports_tab import ReportsTab
+from theme import set_role
 
 
 class MainWindow(QMainWindow):
     """Ana pencere sınıfı"""
     
-    def __init__(self, db):
+    def __init__(self, db, snapshot=None):
         super().__init__()
         self.db = db
+        # Masa planı ve katalog için yerel anlık görüntü (bkz. snapshot.py)
+        self.snapshot = snapshot
         self.init_ui()
     
     def init_ui(self):
@@ -42,8 +45,8 @@ class MainWindow(QMainWindow):
         self.content_stack = QStackedWidget()
         main_layout.addWidget(self.content_stack, stretch=1)
         
-        # Sayfaları oluştur
-        self.floor_plan_tab = FloorPlanTab(self.db)
+        # Sayfaları oluştur (stiller uygulama genelinde theme.apply_theme ile verilir)
+        self.floor_plan_tab = FloorPlanTab(self.db, self.snapshot)
         self.menu_management = MenuManagement(self.db)
         self.reports_tab = ReportsTab(self.db)
         
@@ -53,19 +56,12 @@ class MainWindow(QMainWindow):
         
         # İlk sayfayı göster
         self.content_stack.setCurrentIndex(0)
-        
-        # Stil uygula
-        self.apply_styles()
     
     def create_sidebar(self) -> QWidget:
         """Sol taraftaki menü sidebar'ını oluştur"""
         sidebar = QWidget()
         sidebar.setFixedWidth(200)
-        sidebar.setStyleSheet("""
-            QWidget {
-                background-color: #2c3e50;
-            }
-        """)
+        sidebar.setObjectName("sidebar")
         
         layout = QVBoxLayout(sidebar)
         layout.setContentsMargins(10, 20, 10, 20)
@@ -74,7 +70,7 @@ class MainWindow(QMainWindow):
         # Başlık
         title = QLabel("Restoran Yönetimi")
         title.setFont(QFont("Arial", 14, QFont.Bold))
-        title.setStyleSheet("color: white; padding: 10px;")
+        set_role(title, "sidebar-title")
         layout.addWidget(title)
         
         layout.addStretch()
@@ -83,52 +79,24 @@ class MainWindow(QMainWindow):
         btn_floor_plan = QPushButton("🪑 Masa Planı")
         btn_floor_plan.setMinimumHeight(50)
         btn_floor_plan.clicked.connect(lambda: self.content_stack.setCurrentIndex(0))
-        self.style_menu_button(btn_floor_plan)
+        set_role(btn_floor_plan, "menu")
         layout.addWidget(btn_floor_plan)
         
         # Menü Yönetimi butonu
         btn_menu = QPushButton("📋 Menü Yönetimi")
         btn_menu.setMinimumHeight(50)
         btn_menu.clicked.connect(lambda: self.content_stack.setCurrentIndex(1))
-        self.style_menu_button(btn_menu)
+        set_role(btn_menu, "menu")
         layout.addWidget(btn_menu)
         
         # Ciro ve Kazanç butonu
         btn_reports = QPushButton("💰 Ciro ve Kazanç")
         btn_reports.setMinimumHeight(50)
         btn_reports.clicked.connect(lambda: self.content_stack.setCurrentIndex(2))
-        self.style_menu_button(btn_reports)
+        set_role(btn_reports, "menu")
         layout.addWidget(btn_reports)
         
         layout.addStretch()
         
         return sidebar
-    
-    def style_menu_button(self, button: QPushButton):
-        """Menü butonlarına stil uygula"""
-        button.setStyleSheet("""
-            QPushButton {
-                background-color: #34495e;
-                color: white;
-                border: none;
-                border-radius: 5px;
-                padding: 10px;
-                text-align: left;
-                font-size: 14px;
-            }
-            QPushButton:hover {
-                background-color: #3498db;
-            }
-            QPushButton:pressed {
-                background-color: #2980b9;
-            }
-        """)
-    
-    def apply_styles(self):
-        """Genel stilleri uygula"""
-        self.setStyleSheet("""
-            QMainWindow {
-                background-color: #ecf0f1;
-            }
-        """)
 
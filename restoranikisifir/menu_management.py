@@ -4,11 +4,17 @@ Menü yönetimi ekranı - CRUD işlemleri
 from PyQt5.QtWidgets import (
     QWidget, QVBoxLayout, QHBoxLayout, QPushButton, 
     QTableWidget, QTableWidgetItem, QMessageBox, QDialog,
-    QLabel, QLineEdit, QDoubleSpinBox, QComboBox, QHeaderView
+    QLabel, QLineEdit, QDoubleSpinBox, QComboBox, QHeaderView,
+    QCheckBox, QSpinBox
 )
 from PyQt5.QtCore import Qt
-from PyQt5.QtGui import QFont
+from PyQt5.QtGui import QFont, QColor
 from typing import Dict, Optional
+from money import to_kurus, to_tl, format_amount
+from theme import COLORS, set_role
+
+# Stok girişinin sınırları (eşzamanlı satışlarda stok eksiye düşebilir)
+MAX_STOCK = 1000000
 
 
 class ProductDialog(QDialog):
@@ -54,41 +60,36 @@ class ProductDialog(QDialog):
         self.category_input.addItem("Diğer")
         layout.addWidget(self.category_input)
         
+        # Stok (isteğe bağlı)
+        self.stock_tracked = QCheckBox("Stok takibi")
+        layout.addWidget(self.stock_tracked)
+        stock_layout = QHBoxLayout()
+        stock_layout.addWidget(QLabel("Stok:"))
+        self.stock_input = QSpinBox()
+        self.stock_input.setRange(-MAX_STOCK, MAX_STOCK)
+        stock_layout.addWidget(self.stock_input)
+        stock_layout.addWidget(QLabel("Uyarı eşiği:"))
+        self.low_stock_input = QSpinBox()
+        self.low_stock_input.setRange(0, MAX_STOCK)
+        stock_layout.addWidget(self.low_stock_input)
+        layout.addLayout(stock_layout)
+        self.stock_tracked.toggled.connect(self.stock_input.setEnabled)
+        self.stock_tracked.toggled.connect(self.low_stock_input.setEnabled)
+        self.stock_tracked.setChecked(False)
+        self.stock_input.setEnabled(False)
+        self.low_stock_input.setEnabled(False)
+        
         # Butonlar
         btn_layout = QHBoxLayout()
         btn_layout.addStretch()
         
         btn_save = QPushButton("Kaydet")
         btn_save.clicked.connect(self.accept)
-        btn_save.setStyleSheet("""
-            QPushButton {
-                background-color: #27ae60;
-                color: white;
-                border: none;
-                border-radius: 5px;
-                padding: 8px 20px;
-                font-weight: bold;
-            }
-            QPushButton:hover {
-                background-color: #229954;
-            }
-        """)
+        set_role(btn_save, "success")
         
         btn_cancel = QPushButton("İptal")
         btn_cancel.clicked.connect(self.reject)
-        btn_cancel.setStyleSheet("""
-            QPushButton {
-                background-color: #95a5a6;
-                color: white;
-                border: none;
-                border-radius: 5px;
-                padding: 8px 20px;
-                font-weight: bold;
-            }
-            QPushButton:hover {
-                background-color: #7f8c8d;
-            }
-        """)
+        set_role(btn_cancel, "neutral")
         
         btn_layout.addWidget(btn_save)
         btn_layout.addWidget(btn_cancel)
@@ -98,7 +99,7 @@ class ProductDialog(QDialog):
         """Mevcut ürün verilerini yükle"""
         if self.product_data:
             self.name_input.setText(self.product_data.get("name", ""))
-            self.price_input.setValue(self.product_data.get("price", 0.0))
+            self.price_input.setValue(to_tl(self.product_data.get("price", 0)))
             
             category = self.product_data.get("category", "Diğer")
             index = self.category_input.findText(category)
@@ -106,13 +107,21 @@ class ProductDialog(QDialog):
                 self.category_input.setCurrentIndex(index)
             else:
                 self.category_input.setCurrentText(category)
+            
+            if self.product_data.get("stock") is not None:
+                self.stock_tracked.setChecked(True)
+                self.stock_input.setValue(self.product_data["stock"])
+                self.low_stock_input.setValue(self.product_data.get("low_stock", 0))
     
     def get_product_data(self) -> Dict:
-        """Form verilerini al"""
+        """Form verilerini al (fiyat kuruş cinsinden)"""
         return {
             "name": self.name_input.text().strip(),
-            "price": self.price_input.value(),
-            "category": self.category_input.currentText().strip() or "Diğer"
+            "price": to_kurus(self.price_input.value()),
+            "category": self.category_input.currentText().strip() or "Diğer",
+            # Stok takibi kapalıysa None
+            "stock": self.stock_input.value() if self.stock_tracked.isChecked() else None,
+            "low_stock": self.low_stock_input.value()
         }
 
 
@@ -122,8 +131,15 @@ class MenuManagement(QWidget):
     def __init__(self, db):
         super().__init__()
         self.db = db
+        self._loaded = False
         self.init_ui()
-        self.refresh_products()
+    
+    def showEvent(self, event):
+        # Sayfa ilk gösterildiğinde yüklenir (açılış veritabanını beklemez)
+        super().showEvent(event)
+        if not self._loaded:
+            self._loaded = True
+            self.refresh_products()
     
     def init_ui(self):
         """Arayüzü oluştur"""
@@ -144,59 +160,34 @@ class MenuManagement(QWidget):
         btn_add.setMinimumHeight(40)
         btn_add.setMinimumWidth(150)
         btn_add.clicked.connect(self.add_product)
-        self.style_button(btn_add, "#27ae60")
+        set_role(btn_add, "success")
         button_layout.addWidget(btn_add)
         
         btn_delete = QPushButton("➖ Seçili Ürünü Sil")
         btn_delete.setMinimumHeight(40)
         btn_delete.setMinimumWidth(150)
         btn_delete.clicked.connect(self.delete_product)
-        self.style_button(btn_delete, "#e74c3c")
+        set_role(btn_delete, "danger")
         button_layout.addWidget(btn_delete)
         
         btn_refresh = QPushButton("🔄 Yenile")
         btn_refresh.setMinimumHeight(40)
         btn_refresh.setMinimumWidth(100)
         btn_refresh.clicked.connect(self.refresh_products)
-        self.style_button(btn_refresh, "#3498db")
+        set_role(btn_refresh, "primary")
         button_layout.addWidget(btn_refresh)
         
         layout.addLayout(button_layout)
         
         # Ürün tablosu
         self.products_table = QTableWidget()
-        self.products_table.setColumnCount(4)
-        self.products_table.setHorizontalHeaderLabels(["Ürün Adı", "Fiyat (TL)", "Kategori", "İşlem"])
+        self.products_table.setColumnCount(5)
+        self.products_table.setHorizontalHeaderLabels(["Ürün Adı", "Fiyat (TL)", "Kategori", "Stok", "İşlem"])
         self.products_table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
         self.products_table.setAlternatingRowColors(True)
         self.products_table.setSelectionBehavior(QTableWidget.SelectRows)
         layout.addWidget(self.products_table)
     
-    def style_button(self, button: QPushButton, color: str):
-        """Buton stilini uygula"""
-        button.setStyleSheet(f"""
-            QPushButton {{
-                background-color: {color};
-                color: white;
-                border: none;
-                border-radius: 5px;
-                font-size: 14px;
-                font-weight: bold;
-            }}
-            QPushButton:hover {{
-                background-color: {self.darken_color(color)};
-            }}
-        """)
-    
-    def darken_color(self, color: str) -> str:
-        """Rengi koyulaştır"""
-        color_map = {
-            "#27ae60": "#229954",
-            "#e74c3c": "#c0392b",
-            "#3498db": "#2980b9"
-        }
-        return color_map.get(color, color)
-    
     def refresh_products(self):
         """Ürün listesini yenile"""
         products = self.db.get_all_products()
@@ -208,18 +199,26 @@ class MenuManagement(QWidget):
             self.products_table.setItem(row, 0, QTableWidgetItem(product["name"]))
             
             # Fiyat
-            price_item = QTableWidgetItem(f"{product['price']:.2f}")
+            price_item = QTableWidgetItem(format_amount(product["price"]))
             price_item.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
             self.products_table.setItem(row, 1, price_item)
             
             # Kategori
             self.products_table.setItem(row, 2, QTableWidgetItem(product.get("category", "Diğer")))
             
+            # Stok (eşiğe inmişse kırmızı)
+            stock = product.get("stock")
+            stock_item = QTableWidgetItem("—" if stock is None else str(stock))
+            stock_item.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
+            if stock is not None and stock <= product.get("low_stock", 0):
+                stock_item.setForeground(QColor(COLORS["danger"]))
+            self.products_table.setItem(row, 3, stock_item)
+            
             # Düzenle butonu
             btn_edit = QPushButton("✏️ Düzenle")
             btn_edit.setMaximumWidth(100)
             btn_edit.clicked.connect(lambda checked, p=product: self.edit_product(p))
-            self.products_table.setCellWidget(row, 3, btn_edit)
+            self.products_table.setCellWidget(row, 4, btn_edit)
     
     def add_product(self):
         """Yeni ürün ekle"""
@@ -232,7 +231,10 @@ class MenuManagement(QWidget):
                 return
             
             try:
-                self.db.add_product(data["name"], data["price"], data["category"])
+                self.db.add_product(
+                    data["name"], data["price"], data["category"],
+                    stock=data["stock"], low_stock=data["low_stock"]
+                )
                 QMessageBox.information(self, "Başarılı", "Ürün eklendi!")
                 self.refresh_products()
             except Exception as e:
@@ -251,8 +253,12 @@ class MenuManagement(QWidget):
             try:
                 # Mevcut ürünü sil
                 self.db.delete_product(product["_id"])
-                # Yeni verilerle ekle
-                self.db.add_product(data["name"], data["price"], data["category"])
+                # Yeni verilerle ekle (reçete korunur)
+                self.db.add_product(
+                    data["name"], data["price"], data["category"],
+                    stock=data["stock"], low_stock=data["low_stock"],
+                    recipe=product.get("recipe")
+                )
                 QMessageBox.information(self, "Başarılı", "Ürün güncellendi!")
                 self.refresh_products()
             except Exception as e:
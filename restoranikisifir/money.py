@@ -0,0 +1,34 @@
+"""
+Para birimi yardımcıları - tutarlar tam sayı kuruş olarak tutulur
+"""
+from decimal import Decimal, ROUND_HALF_UP
+from typing import List
+
+
+def to_kurus(value) -> int:
+    """TL cinsinden tutarı (float/str/Decimal) kuruşa çevir"""
+    amount = Decimal(str(value)) * 100
+    return int(amount.quantize(Decimal("1"), rounding=ROUND_HALF_UP))
+
+
+def to_tl(kurus: int) -> float:
+    """Kuruşu TL'ye çevir (sadece giriş alanları ve grafikler için)"""
+    return kurus / 100
+
+
+def format_amount(kurus: int) -> str:
+    """Kuruş tutarını '1234.50' biçiminde yaz (float kullanmadan)"""
+    sign = "-" if kurus < 0 else ""
+    lira, kurus_part = divmod(abs(int(kurus)), 100)
+    return f"{sign}{lira}.{kurus_part:02d}"
+
+
+def format_tl(kurus: int) -> str:
+    """Kuruş tutarını '1234.50 TL' biçiminde yaz"""
+    return f"{format_amount(kurus)} TL"
+
+
+def split_amount(kurus: int, parts: int) -> List[int]:
+    """Tutarı kuruş kaybetmeden eşit paylara böl (artan kuruşlar ilk paylara eklenir)"""
+    share, remainder = divmod(int(kurus), parts)
+    return [share + 1 if index < remainder else share for index in range(parts)]
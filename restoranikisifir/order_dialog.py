@@ -1,25 +1,47 @@
 """
 Sipariş alma diyaloğu
 """
+import copy
 from PyQt5.QtWidgets import (
     QDialog, QVBoxLayout, QHBoxLayout, QPushButton, 
     QTableWidget, QTableWidgetItem, QTabWidget, QWidget,
-    QLabel, QMessageBox, QHeaderView
+    QLabel, QMessageBox, QHeaderView, QLineEdit, QListWidget,
+    QListWidgetItem, QComboBox
 )
-from PyQt5.QtCore import Qt
+from PyQt5.QtCore import Qt, QTimer
 from PyQt5.QtGui import QFont
-from typing import List, Dict
+from typing import List, Dict, Optional
+from product_search import ProductSearchIndex
+from database import Database, DEFAULT_CAPACITY
+from payment_dialog import PaymentDialog, seat_label
+from money import format_tl
+from theme import set_role
+
+# Yazarken aramayı tetiklemeden önce beklenecek süre (ms)
+SEARCH_DEBOUNCE_MS = 150
 
 
 class OrderDialog(QDialog):
     """Sipariş diyaloğu - Ürün seçimi ve sipariş yönetimi"""
     
-    def __init__(self, db, table_data, parent=None):
+    def __init__(self, db, table_data, parent=None, catalog: Optional[Dict[str, List[Dict]]] = None,
+                 stock: Optional[Dict] = None):
         super().__init__(parent)
         self.db = db
+        # Kategorize ürünler (verilmezse veritabanından okunur)
+        self.catalog = catalog
+        # Önbellekteki stok adetleri: ürün _id -> adet (verilmezse üründeki değer)
+        self.stock = stock or {}
         self.table_data = table_data
         self.table_number = table_data["table_number"]
-        self.order_items = []  # {"product": {...}, "quantity": int, "total": float}
+        # Bölgeye bağlı fiyat kuralları için
+        self.zone = table_data.get("zone")
+        # {"product": {...}, "quantity": int, "unit_price": int, "total": int (kuruş), "seat": int|None}
+        self.order_items = []
+        # Masada kayıtlı adisyon (kaydedilmemiş değişiklikleri ayırt etmek için)
+        self.saved_items = []
+        # Kısmen ödenmiş satırlar: {satır anahtarı: ödenen adet}
+        self.paid_items = table_data.get("paid_items", {})
         self.init_ui()
         self.load_existing_order()
     
@@ -56,7 +78,7 @@ class OrderDialog(QDialog):
         # Toplam etiketi
         self.total_label = QLabel("Toplam: 0.00 TL")
         self.total_label.setFont(QFont("Arial", 14, QFont.Bold))
-        self.total_label.setStyleSheet("color: #27ae60; padding: 10px;")
+        set_role(self.total_label, "total")
         bottom_layout.addWidget(self.total_label)
         
         bottom_layout.addStretch()
@@ -66,16 +88,16 @@ class OrderDialog(QDialog):
         btn_save.setMinimumHeight(40)
         btn_save.setMinimumWidth(150)
         btn_save.clicked.connect(self.save_order)
-        self.style_button(btn_save, "#3498db")
+        set_role(btn_save, "primary")
         bottom_layout.addWidget(btn_save)
         
-        # Hesabı Kapat butonu (sadece dolu masalar için)
+        # Ödeme al / hesabı kapat butonu (sadece dolu masalar için)
         if self.table_data["status"] == "Dolu":
-            btn_close = QPushButton("💰 Hesabı Kapat")
+            btn_close = QPushButton("💰 Ödeme Al")
             btn_close.setMinimumHeight(40)
             btn_close.setMinimumWidth(150)
             btn_close.clicked.connect(self.close_order)
-            self.style_button(btn_close, "#27ae60")
+            set_role(btn_close, "success")
             bottom_layout.addWidget(btn_close)
         
         # İptal butonu
@@ -83,7 +105,7 @@ class OrderDialog(QDialog):
         btn_cancel.setMinimumHeight(40)
         btn_cancel.setMinimumWidth(100)
         btn_cancel.clicked.connect(self.reject)
-        self.style_button(btn_cancel, "#95a5a6")
+        set_role(btn_cancel, "neutral")
         bottom_layout.addWidget(btn_cancel)
         
         layout.addLayout(bottom_layout)
@@ -97,9 +119,33 @@ class OrderDialog(QDialog):
         label.setFont(QFont("Arial", 12, QFont.Bold))
         layout.addWidget(label)
         
+        categorized_products = self.catalog or self.db.get_products_by_category()
+        
+        # Ürün arama kutusu (bellek içi önek ağacı ile)
+        self.search_index = ProductSearchIndex(
+            [p for products in categorized_products.values() for p in products]
+        )
+        self.search_timer = QTimer(self)
+        self.search_timer.setSingleShot(True)
+        self.search_timer.setInterval(SEARCH_DEBOUNCE_MS)
+        self.search_timer.timeout.connect(self.run_search)
+        
+        self.search_input = QLineEdit()
+        self.search_input.setPlaceholderText("🔍 Ürün ara...")
+        self.search_input.setClearButtonEnabled(True)
+        self.search_input.textChanged.connect(lambda _: self.search_timer.start())
+        self.search_input.returnPressed.connect(self.add_selected_search_result)
+        layout.addWidget(self.search_input)
+        
+        self.search_results = QListWidget()
+        self.search_results.setMaximumHeight(150)
+        self.search_results.setVisible(False)
+        self.search_results.itemActivated.connect(self.add_search_result)
+        self.search_results.itemClicked.connect(self.add_search_result)
+        layout.addWidget(self.search_results)
+        
         # Kategorilere göre sekmeler
         self.menu_tabs = QTabWidget()
-        categorized_products = self.db.get_products_by_category()
         
         for category, products in categorized_products.items():
             category_widget = QWidget()
@@ -113,22 +159,15 @@ class OrderDialog(QDialog):
             scroll_layout = QGL(scroll_widget)
             
             for product in products:
-                btn = QPushButton(f"{product['name']}\n{product['price']:.2f} TL")
+                text = f"{product['name']}\n{self.price_text(product)}"
+                stock = self.stock_level(product)
+                if stock is not None:
+                    text += f"\nStok: {stock}"
+                btn = QPushButton(text)
                 btn.setMinimumHeight(70)
-                btn.setFont(QFont("Arial", 10))
-                btn.setStyleSheet("""
-                    QPushButton {
-                        background-color: #ecf0f1;
-                        border: 1px solid #bdc3c7;
-                        border-radius: 5px;
-                        text-align: center;
-                        padding: 5px;
-                    }
-                    QPushButton:hover {
-                        background-color: #3498db;
-                        color: white;
-                    }
-                """)
+                set_role(btn, "product")
+                # Stoğu tükenen ürün seçilemez
+                btn.setEnabled(stock is None or stock > 0)
                 
                 # Ürünü siparişe ekle
                 btn.clicked.connect(
@@ -147,45 +186,116 @@ class OrderDialog(QDialog):
         
         return widget
     
+    def run_search(self):
+        """Arama kutusundaki metne göre sonuç listesini güncelle"""
+        self.search_results.clear()
+        matches = self.search_index.search(self.search_input.text())
+        
+        for product in matches:
+            item = QListWidgetItem(f"{product['name']} - {self.price_text(product)}")
+            item.setData(Qt.UserRole, product)
+            self.search_results.addItem(item)
+        
+        self.search_results.setVisible(bool(matches))
+        if matches:
+            self.search_results.setCurrentRow(0)
+    
+    def add_search_result(self, item: QListWidgetItem):
+        """Arama sonucundaki ürünü siparişe ekle"""
+        self.add_to_order(item.data(Qt.UserRole))
+        self.search_input.clear()
+        self.search_input.setFocus()
+    
+    def add_selected_search_result(self):
+        """Enter'a basıldığında seçili (veya ilk) sonucu ekle"""
+        # Bekleyen arama varsa önce çalıştır
+        if self.search_timer.isActive():
+            self.search_timer.stop()
+            self.run_search()
+        
+        item = self.search_results.currentItem()
+        if item is not None:
+            self.add_search_result(item)
+    
     def create_order_widget(self) -> QWidget:
         """Sağ taraftaki adisyon tablosunu oluştur"""
         widget = QWidget()
         layout = QVBoxLayout(widget)
         
+        header_layout = QHBoxLayout()
         label = QLabel("Sipariş Listesi")
         label.setFont(QFont("Arial", 12, QFont.Bold))
-        layout.addWidget(label)
+        header_layout.addWidget(label)
+        header_layout.addStretch()
+        
+        # Eklenen ürünlerin atanacağı koltuk (hesabı koltuğa göre bölmek için)
+        header_layout.addWidget(QLabel("Koltuk:"))
+        self.seat_input = QComboBox()
+        self.seat_input.addItem(seat_label(None), None)
+        for seat in range(1, self.table_data.get("capacity", DEFAULT_CAPACITY) + 1):
+            self.seat_input.addItem(str(seat), seat)
+        header_layout.addWidget(self.seat_input)
+        layout.addLayout(header_layout)
         
         # Adisyon tablosu
         self.order_table = QTableWidget()
-        self.order_table.setColumnCount(5)
-        self.order_table.setHorizontalHeaderLabels(["Ürün", "Birim Fiyat", "Adet", "Toplam", "İşlem"])
+        self.order_table.setColumnCount(6)
+        self.order_table.setHorizontalHeaderLabels(
+            ["Ürün", "Koltuk", "Birim Fiyat", "Adet", "Toplam", "İşlem"]
+        )
         self.order_table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
         self.order_table.setAlternatingRowColors(True)
         layout.addWidget(self.order_table)
         
         return widget
     
+    def current_price(self, product: Dict) -> int:
+        """Ürünün şu an bu masada uygulanacak birim fiyatı (fiyat kurallarıyla)"""
+        order_products = [item["product"].get("_id") for item in self.order_items]
+        return self.db.price_product(product, self.zone, order_products)
+    
+    def price_text(self, product: Dict) -> str:
+        """Menüde gösterilen fiyat (kural uygulanıyorsa liste fiyatıyla birlikte)"""
+        price = self.current_price(product)
+        if price == product["price"]:
+            return format_tl(price)
+        return f"{format_tl(price)} ({format_tl(product['price'])})"
+    
+    def stock_level(self, product: Dict) -> Optional[int]:
+        """Ürünün bilinen stok adedi (takip edilmiyorsa None)"""
+        return self.stock.get(product.get("_id"), product.get("stock"))
+    
     def add_to_order(self, product: Dict):
-        """Ürünü siparişe ekle"""
-        # Aynı ürün varsa adetini artır
+        """Ürünü seçili koltuğa (veya ortak) siparişe ekle"""
+        stock = self.stock_level(product)
+        if stock is not None and stock <= 0:
+            QMessageBox.warning(self, "Uyarı", f"{product['name']} stokta kalmadı!")
+            return
+        seat = self.seat_input.currentData()
+        # Aynı koltukta aynı ürün varsa adetini artır
         # ObjectId karşılaştırması için str() kullan
         product_id = str(product.get("_id", ""))
         for item in self.order_items:
             item_product = item.get("product", {})
             item_product_id = str(item_product.get("_id", ""))
-            if item_product_id == product_id:
+            if item_product_id == product_id and item.get("seat") == seat:
                 item["quantity"] += 1
-                item["total"] = item["quantity"] * item_product["price"]
+                # Birim fiyat satır açılırken kilitlenir
+                item["total"] = item["quantity"] * item.get("unit_price", item_product["price"])
                 self.update_order_table()
                 return
         
         # Yeni ürün ekle
-        self.order_items.append({
+        unit_price = self.current_price(product)
+        item = {
             "product": product,
             "quantity": 1,
-            "total": product["price"]
-        })
+            "unit_price": unit_price,
+            "total": unit_price
+        }
+        if seat is not None:
+            item["seat"] = seat
+        self.order_items.append(item)
         self.update_order_table()
     
     def update_order_table(self):
@@ -195,40 +305,53 @@ class OrderDialog(QDialog):
         for row, item in enumerate(self.order_items):
             product = item["product"]
             quantity = item["quantity"]
-            unit_price = product["price"]
+            unit_price = item.get("unit_price", product["price"])
             total = item["total"]
             
             # Ürün adı
             self.order_table.setItem(row, 0, QTableWidgetItem(product["name"]))
             
+            # Koltuk
+            seat_item = QTableWidgetItem(seat_label(item.get("seat")))
+            seat_item.setTextAlignment(Qt.AlignCenter)
+            self.order_table.setItem(row, 1, seat_item)
+            
             # Birim fiyat
-            price_item = QTableWidgetItem(f"{unit_price:.2f} TL")
+            price_item = QTableWidgetItem(format_tl(unit_price))
             price_item.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
-            self.order_table.setItem(row, 1, price_item)
+            if unit_price != product["price"]:
+                price_item.setToolTip(f"Liste fiyatı: {format_tl(product['price'])}")
+            self.order_table.setItem(row, 2, price_item)
             
-            # Adet
-            qty_item = QTableWidgetItem(str(quantity))
+            # Adet (kısmen ödenmişse ödenen adet de gösterilir)
+            paid = self.paid_items.get(Database.line_key(item), 0)
+            qty_text = f"{quantity} ({paid} ödendi)" if paid else str(quantity)
+            qty_item = QTableWidgetItem(qty_text)
             qty_item.setTextAlignment(Qt.AlignCenter)
-            self.order_table.setItem(row, 2, qty_item)
+            self.order_table.setItem(row, 3, qty_item)
             
             # Toplam
-            total_item = QTableWidgetItem(f"{total:.2f} TL")
+            total_item = QTableWidgetItem(format_tl(total))
             total_item.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
-            self.order_table.setItem(row, 3, total_item)
+            self.order_table.setItem(row, 4, total_item)
             
-            # Sil butonu
+            # Sil butonu (ödemesi alınmış satır silinemez)
             btn_remove = QPushButton("✖")
             btn_remove.setMaximumWidth(40)
+            btn_remove.setEnabled(not paid)
             btn_remove.clicked.connect(lambda checked, r=row: self.remove_item(r))
-            self.order_table.setCellWidget(row, 4, btn_remove)
+            self.order_table.setCellWidget(row, 5, btn_remove)
         
         # Toplamı güncelle
         total = sum(item["total"] for item in self.order_items)
-        self.total_label.setText(f"Toplam: {total:.2f} TL")
+        self.total_label.setText(f"Toplam: {format_tl(total)}")
     
     def remove_item(self, row: int):
         """Siparişten ürün çıkar"""
         if 0 <= row < len(self.order_items):
+            if self.paid_items.get(Database.line_key(self.order_items[row]), 0):
+                QMessageBox.warning(self, "Uyarı", "Ödemesi alınmış ürün silinemez!")
+                return
             self.order_items.pop(row)
             self.update_order_table()
     
@@ -241,6 +364,7 @@ class OrderDialog(QDialog):
                 # Order item yapısını kontrol et ve düzelt
                 if isinstance(order_item, dict) and "product" in order_item:
                     self.order_items.append(order_item)
+            self.saved_items = copy.deepcopy(self.order_items)
             self.update_order_table()
     
     def save_order(self):
@@ -258,54 +382,33 @@ class OrderDialog(QDialog):
             QMessageBox.critical(self, "Hata", f"Sipariş kaydedilirken hata oluştu:\n{str(e)}")
     
     def close_order(self):
-        """Hesabı kapat"""
+        """Ödeme diyaloğunu aç (hesap tamamen ödenince kapanır)"""
         if not self.order_items:
             QMessageBox.warning(self, "Uyarı", "Sipariş boş!")
             return
         
-        total = sum(item["total"] for item in self.order_items)
-        
-        reply = QMessageBox.question(
-            self,
-            "Onay",
-            f"Toplam tutar: {total:.2f} TL\nHesap kapatılsın mı?",
-            QMessageBox.Yes | QMessageBox.No
-        )
-        
-        if reply == QMessageBox.Yes:
+        # Ödeme masadaki adisyon üzerinden alınır; önce ekrandaki değişiklikler kaydedilir
+        if self.order_items != self.saved_items:
             try:
-                self.db.close_order(self.table_number, total)
-                QMessageBox.information(
-                    self, 
-                    "Başarılı", 
-                    f"Hesap kapatıldı!\nToplam: {total:.2f} TL"
-                )
-                self.accept()
+                self.db.save_order_to_table(self.table_number, self.order_items)
             except Exception as e:
-                QMessageBox.critical(self, "Hata", f"Hesap kapatılırken hata oluştu:\n{str(e)}")
-    
-    def style_button(self, button: QPushButton, color: str):
-        """Buton stilini uygula"""
-        button.setStyleSheet(f"""
-            QPushButton {{
-                background-color: {color};
-                color: white;
-                border: none;
-                border-radius: 5px;
-                font-size: 12px;
-                font-weight: bold;
-            }}
-            QPushButton:hover {{
-                background-color: {self.darken_color(color)};
-            }}
-        """)
-    
-    def darken_color(self, color: str) -> str:
-        """Rengi koyulaştır"""
-        color_map = {
-            "#3498db": "#2980b9",
-            "#27ae60": "#229954",
-            "#95a5a6": "#7f8c8d"
-        }
-        return color_map.get(color, color)
+                QMessageBox.critical(self, "Hata", f"Sipariş kaydedilirken hata oluştu:\n{str(e)}")
+                return
+            self.saved_items = copy.deepcopy(self.order_items)
+        
+        dialog = PaymentDialog(self.db, self.table_number, self)
+        if dialog.state is None:
+            # Masa başka bir terminalden kapatılmış veya kapatılıyor
+            self.reject()
+            return
+        dialog.exec_()
+        if dialog.closed:
+            self.accept()
+            return
+        
+        # Kısmi ödemelerden sonra ödenen adetleri güncelle
+        table = self.db.get_table(self.table_number)
+        if table:
+            self.paid_items = table.get("paid_items", {})
+            self.update_order_table()
 
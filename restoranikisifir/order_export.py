@@ -0,0 +1,204 @@
+"""
+Sipariş geçmişinin CSV/Parquet olarak dışa aktarımı (muhasebe için)
+
+Siparişler imleçle parça parça okunur ve dosyaya aynı anda yazılır; bellek
+kullanımı dışa aktarılan dönemin uzunluğundan bağımsızdır. Parquet için
+pyarrow kurulu olmalıdır (isteğe bağlı bağımlılık).
+"""
+import csv
+import os
+from decimal import Decimal
+from typing import Callable, Dict, Iterator, List, Optional
+from money import format_amount
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    pq = None
+
+EXPORT_FORMATS = ("csv", "parquet")
+# Veritabanından sadece dışa aktarılan alanlar okunur
+EXPORT_PROJECTION = {
+    "date": 1,
+    "business_day": 1,
+    "table_number": 1,
+    "total": 1,
+    "items.product.name": 1,
+    "items.product.category": 1,
+    "items.product.price": 1,
+    "items.unit_price": 1,
+    "items.quantity": 1,
+    "items.total": 1,
+}
+# Kalem bazında (her satır bir sipariş kalemi) sütunlar
+LINE_COLUMNS = [
+    "order_id", "date", "business_day", "table_number",
+    "product", "category", "list_price", "unit_price", "quantity", "line_total", "order_total"
+]
+# Sipariş bazında (her satır bir sipariş) sütunlar
+ORDER_COLUMNS = ["order_id", "date", "business_day", "table_number", "item_count", "order_total"]
+MONEY_COLUMNS = {"list_price", "unit_price", "line_total", "order_total"}
+# Progress sinyali bu kadar siparişte bir gönderilir
+PROGRESS_EVERY = 500
+
+
+class ExportCancelled(Exception):
+    """Dışa aktarım kullanıcı tarafından durduruldu"""
+
+
+def flatten_order(order: Dict, calendar, lines: bool = True) -> List[Dict]:
+    """Siparişi dışa aktarım satırlarına çevir (tutarlar kuruş)"""
+    base = {
+        "order_id": str(order["_id"]),
+        "date": calendar.to_local(order["date"]).isoformat(timespec="seconds"),
+        "business_day": order.get("business_day", ""),
+        "table_number": order.get("table_number"),
+        "order_total": order.get("total", 0),
+    }
+    items = order.get("items", [])
+    if not lines:
+        return [dict(base, item_count=sum(item.get("quantity", 0) for item in items))]
+    
+    rows = []
+    for item in items:
+        product = item.get("product", {})
+        rows.append(dict(
+            base,
+            product=product.get("name", ""),
+            category=product.get("category", "Diğer"),
+            list_price=product.get("price", 0),
+            # Fiyat kuralıyla satır açılırken kilitlenen fiyat (eski siparişlerde liste fiyatı)
+            unit_price=item.get("unit_price", product.get("price", 0)),
+            quantity=item.get("quantity", 0),
+            line_total=item.get("total", 0)
+        ))
+    return rows
+
+
+class CsvRowWriter:
+    """Satırları CSV'ye yazar (Excel için UTF-8 BOM ve ';' ayırıcı)"""
+    
+    def __init__(self, path: str, columns: List[str]):
+        self.columns = columns
+        self.file = open(path, "w", encoding="utf-8-sig", newline="")
+        self.writer = csv.writer(self.file, delimiter=";")
+        self.writer.writerow(columns)
+    
+    def write(self, rows: List[Dict]):
+        self.writer.writerows(
+            [
+                format_amount(row[column]) if column in MONEY_COLUMNS else row[column]
+                for column in self.columns
+            ]
+            for row in rows
+        )
+    
+    def close(self):
+        self.file.close()
+
+
+class ParquetRowWriter:
+    """Satırları Parquet'e her parti bir row group olacak şekilde yazar"""
+    
+    def __init__(self, path: str, columns: List[str]):
+        if pa is None:
+            raise RuntimeError("Parquet için pyarrow kurulu olmalı: pip install pyarrow")
+        types = {
+            "order_id": pa.string(),
+            "date": pa.string(),
+            "business_day": pa.string(),
+            "table_number": pa.int64(),
+            "product": pa.string(),
+            "category": pa.string(),
+            "quantity": pa.int64(),
+            "item_count": pa.int64(),
+        }
+        self.columns = columns
+        self.schema = pa.schema([
+            (column, pa.decimal128(14, 2) if column in MONEY_COLUMNS else types[column])
+            for column in columns
+        ])
+        self.writer = pq.ParquetWriter(path, self.schema)
+    
+    def write(self, rows: List[Dict]):
+        if not rows:
+            return
+        data = {
+            column: [
+                Decimal(row[column]).scaleb(-2) if column in MONEY_COLUMNS else row[column]
+                for row in rows
+            ]
+            for column in self.columns
+        }
+        self.writer.write_table(pa.table(data, schema=self.schema))
+    
+    def close(self):
+        self.writer.close()
+
+
+def batched(orders: Iterator[Dict], size: int) -> Iterator[List[Dict]]:
+    batch = []
+    for order in orders:
+        batch.append(order)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def export_orders(db, path: str, fmt: str = "csv", start_date=None, end_date=None,
+                  lines: bool = True, batch_size: int = 1000,
+                  progress: Optional[Callable[[int, int], None]] = None,
+                  should_stop: Optional[Callable[[], bool]] = None) -> int:
+    """
+    [start, end) aralığındaki siparişleri dosyaya aktar
+    
+    Args:
+        db: Database
+        path: Hedef dosya
+        fmt: "csv" veya "parquet"
+        lines: True ise her sipariş kalemi ayrı satır, False ise sipariş başına bir satır
+        batch_size: İmleç ve yazma parti büyüklüğü
+        progress: (aktarılan sipariş, toplam sipariş) ile çağrılır
+        should_stop: True döndürürse aktarım ExportCancelled ile durur
+    
+    Returns:
+        Aktarılan sipariş sayısı
+    """
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Geçersiz dışa aktarım biçimi: {fmt}")
+    
+    columns = LINE_COLUMNS if lines else ORDER_COLUMNS
+    total = db.count_orders(start_date, end_date) if progress else 0
+    writer = (CsvRowWriter if fmt == "csv" else ParquetRowWriter)(path, columns)
+    
+    exported = 0
+    reported = 0
+    completed = False
+    orders = db.iter_orders(start_date, end_date, EXPORT_PROJECTION, batch_size)
+    try:
+        for batch in batched(orders, batch_size):
+            if should_stop and should_stop():
+                raise ExportCancelled()
+            rows = []
+            for order in batch:
+                rows.extend(flatten_order(order, db.calendar, lines))
+            writer.write(rows)
+            exported += len(batch)
+            if progress and exported - reported >= PROGRESS_EVERY:
+                progress(exported, total)
+                reported = exported
+        completed = True
+    finally:
+        orders.close()
+        writer.close()
+        # Yarım kalan dosya bırakılmaz
+        if not completed and os.path.exists(path):
+            os.remove(path)
+    
+    if progress:
+        progress(exported, max(total, exported))
+    return exported
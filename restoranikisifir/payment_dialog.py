@@ -0,0 +1,324 @@
+"""
+Hesap bölme ve kısmi ödeme diyaloğu
+"""
+from PyQt5.QtWidgets import (
+    QDialog, QVBoxLayout, QHBoxLayout, QPushButton, QTabWidget, QWidget,
+    QTableWidget, QTableWidgetItem, QHeaderView, QLabel, QListWidget,
+    QListWidgetItem, QComboBox, QSpinBox, QMessageBox
+)
+from PyQt5.QtCore import Qt
+from PyQt5.QtGui import QFont
+from typing import Dict
+import uuid
+from database import PAYMENT_METHODS
+from money import format_tl, split_amount
+from theme import set_role
+
+# Ödeme listesinde gösterilen bölüşüm adları
+SPLIT_LABELS = {
+    "full": "Tamamı",
+    "item": "Ürüne göre",
+    "seat": "Koltuğa göre",
+    "equal": "Eşit pay",
+}
+
+
+def seat_label(seat) -> str:
+    return "Ortak" if seat is None else f"Koltuk {seat}"
+
+
+class PaymentDialog(QDialog):
+    """Adisyonu ürüne, koltuğa veya eşit paylara göre bölerek ödeme al"""
+    
+    def __init__(self, db, table_number: int, parent=None):
+        super().__init__(parent)
+        self.db = db
+        self.table_number = table_number
+        self.state = None
+        # Hesap bu diyalogdan kapatıldıysa True
+        self.closed = False
+        # Tekrar denenen ödemenin iki kez kaydedilmemesi için (başarılı ödemeden sonra yenilenir)
+        self.payment_id = uuid.uuid4().hex
+        self.init_ui()
+        self.refresh_state()
+    
+    def init_ui(self):
+        """Arayüzü oluştur"""
+        self.setWindowTitle(f"Masa {self.table_number} - Ödeme")
+        self.setMinimumSize(700, 550)
+        
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(15, 15, 15, 15)
+        layout.setSpacing(10)
+        
+        title = QLabel(f"Masa {self.table_number} - Ödeme")
+        title.setFont(QFont("Arial", 16, QFont.Bold))
+        layout.addWidget(title)
+        
+        # Toplam / ödenen / kalan
+        summary_layout = QHBoxLayout()
+        self.total_label = QLabel()
+        self.total_label.setFont(QFont("Arial", 12))
+        summary_layout.addWidget(self.total_label)
+        self.paid_label = QLabel()
+        self.paid_label.setFont(QFont("Arial", 12))
+        summary_layout.addWidget(self.paid_label)
+        summary_layout.addStretch()
+        self.balance_label = QLabel()
+        self.balance_label.setFont(QFont("Arial", 14, QFont.Bold))
+        set_role(self.balance_label, "total")
+        summary_layout.addWidget(self.balance_label)
+        layout.addLayout(summary_layout)
+        
+        # Bölüşüm sekmeleri
+        self.split_tabs = QTabWidget()
+        self.split_tabs.addTab(self.create_item_widget(), "Ürüne Göre")
+        self.split_tabs.addTab(self.create_seat_widget(), "Koltuğa Göre")
+        self.split_tabs.addTab(self.create_equal_widget(), "Eşit Bölüşüm")
+        layout.addWidget(self.split_tabs, stretch=1)
+        
+        # Alınan ödemeler
+        label = QLabel("Alınan Ödemeler")
+        label.setFont(QFont("Arial", 11, QFont.Bold))
+        layout.addWidget(label)
+        self.payments_list = QListWidget()
+        self.payments_list.setMaximumHeight(110)
+        layout.addWidget(self.payments_list)
+        
+        # Ödeme türü ve butonlar
+        bottom_layout = QHBoxLayout()
+        bottom_layout.addWidget(QLabel("Ödeme türü:"))
+        self.method_input = QComboBox()
+        self.method_input.addItems(PAYMENT_METHODS)
+        bottom_layout.addWidget(self.method_input)
+        bottom_layout.addStretch()
+        
+        btn_pay = QPushButton("💳 Seçileni Öde")
+        btn_pay.setMinimumHeight(40)
+        btn_pay.setMinimumWidth(150)
+        btn_pay.clicked.connect(self.pay_selected)
+        set_role(btn_pay, "success")
+        bottom_layout.addWidget(btn_pay)
+        
+        btn_pay_all = QPushButton("💰 Kalanın Tamamı")
+        btn_pay_all.setMinimumHeight(40)
+        btn_pay_all.setMinimumWidth(150)
+        btn_pay_all.clicked.connect(self.pay_remaining)
+        set_role(btn_pay_all, "primary")
+        bottom_layout.addWidget(btn_pay_all)
+        
+        btn_close = QPushButton("❌ Kapat")
+        btn_close.setMinimumHeight(40)
+        btn_close.setMinimumWidth(100)
+        btn_close.clicked.connect(self.reject)
+        set_role(btn_close, "neutral")
+        bottom_layout.addWidget(btn_close)
+        
+        layout.addLayout(bottom_layout)
+    
+    def create_item_widget(self) -> QWidget:
+        """Ürüne göre ödeme: her satırdan ödenecek adet seçilir"""
+        widget = QWidget()
+        layout = QVBoxLayout(widget)
+        
+        self.lines_table = QTableWidget()
+        self.lines_table.setColumnCount(5)
+        self.lines_table.setHorizontalHeaderLabels(
+            ["Ürün", "Koltuk", "Birim Fiyat", "Ödenmemiş", "Ödenecek Adet"]
+        )
+        self.lines_table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
+        self.lines_table.setEditTriggers(QTableWidget.NoEditTriggers)
+        self.lines_table.setAlternatingRowColors(True)
+        layout.addWidget(self.lines_table)
+        
+        self.item_amount_label = QLabel()
+        self.item_amount_label.setFont(QFont("Arial", 11, QFont.Bold))
+        layout.addWidget(self.item_amount_label)
+        
+        return widget
+    
+    def create_seat_widget(self) -> QWidget:
+        """Koltuğa göre ödeme: seçilen koltuğun ödenmemiş ürünleri ödenir"""
+        widget = QWidget()
+        layout = QVBoxLayout(widget)
+        
+        self.seat_list = QListWidget()
+        self.seat_list.setFont(QFont("Arial", 11))
+        layout.addWidget(self.seat_list)
+        
+        return widget
+    
+    def create_equal_widget(self) -> QWidget:
+        """Eşit bölüşüm: kalan tutar kalan kişi sayısına bölünür"""
+        widget = QWidget()
+        layout = QVBoxLayout(widget)
+        
+        people_layout = QHBoxLayout()
+        people_layout.addWidget(QLabel("Kişi sayısı:"))
+        self.people_input = QSpinBox()
+        self.people_input.setRange(1, 50)
+        self.people_input.setValue(2)
+        self.people_input.valueChanged.connect(self.update_equal_share)
+        people_layout.addWidget(self.people_input)
+        people_layout.addStretch()
+        layout.addLayout(people_layout)
+        
+        self.share_label = QLabel()
+        self.share_label.setFont(QFont("Arial", 14, QFont.Bold))
+        layout.addWidget(self.share_label)
+        layout.addStretch()
+        
+        return widget
+    
+    def refresh_state(self):
+        """Ödeme durumunu veritabanından yeniden yükle"""
+        try:
+            self.state = self.db.get_payment_state(self.table_number)
+        except ValueError as e:
+            # Masa başka bir terminalden kapatılmış olabilir
+            self.state = None
+            QMessageBox.warning(self, "Uyarı", str(e))
+            self.reject()
+            return
+        
+        state = self.state
+        self.total_label.setText(f"Toplam: {format_tl(state['total'])}")
+        self.paid_label.setText(f"Ödenen: {format_tl(state['paid'])}")
+        self.balance_label.setText(f"Kalan: {format_tl(state['balance'])}")
+        
+        self.update_lines_table()
+        self.update_seat_list()
+        self.update_equal_share()
+        
+        self.payments_list.clear()
+        for payment in state["payments"]:
+            text = (
+                f"{self.db.calendar.to_local(payment['date']):%H:%M}  "
+                f"{format_tl(payment['amount'])}  {payment['method']}  "
+                f"({SPLIT_LABELS.get(payment['split'], payment['split'])})"
+            )
+            if payment.get("items"):
+                text += " - " + ", ".join(
+                    f"{line['quantity']}x {line['name']}" for line in payment["items"]
+                )
+            self.payments_list.addItem(text)
+    
+    def update_lines_table(self):
+        lines = self.state["lines"]
+        self.lines_table.setRowCount(len(lines))
+        
+        for row, line in enumerate(lines):
+            unpaid = line["quantity"] - line["paid_quantity"]
+            self.lines_table.setItem(row, 0, QTableWidgetItem(line["name"]))
+            
+            seat_item = QTableWidgetItem(seat_label(line["seat"]))
+            seat_item.setTextAlignment(Qt.AlignCenter)
+            self.lines_table.setItem(row, 1, seat_item)
+            
+            price_item = QTableWidgetItem(format_tl(line["unit_price"]))
+            price_item.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
+            self.lines_table.setItem(row, 2, price_item)
+            
+            unpaid_item = QTableWidgetItem(f"{unpaid} / {line['quantity']}")
+            unpaid_item.setTextAlignment(Qt.AlignCenter)
+            self.lines_table.setItem(row, 3, unpaid_item)
+            
+            quantity_input = QSpinBox()
+            quantity_input.setRange(0, unpaid)
+            quantity_input.setEnabled(unpaid > 0)
+            quantity_input.valueChanged.connect(self.update_item_amount)
+            self.lines_table.setCellWidget(row, 4, quantity_input)
+        
+        self.update_item_amount()
+    
+    def selected_items(self) -> Dict[str, int]:
+        """Ürüne göre sekmesinde seçilen {satır anahtarı: adet}"""
+        items = {}
+        for row, line in enumerate(self.state["lines"]):
+            quantity = self.lines_table.cellWidget(row, 4).value()
+            if quantity > 0:
+                items[line["key"]] = quantity
+        return items
+    
+    def update_item_amount(self):
+        prices = {line["key"]: line["unit_price"] for line in self.state["lines"]}
+        amount = sum(prices[key] * quantity for key, quantity in self.selected_items().items())
+        self.item_amount_label.setText(f"Seçilen tutar: {format_tl(amount)}")
+    
+    def update_seat_list(self):
+        unpaid = {}
+        for line in self.state["lines"]:
+            remaining = line["quantity"] - line["paid_quantity"]
+            if remaining > 0:
+                unpaid[line["seat"]] = unpaid.get(line["seat"], 0) + remaining * line["unit_price"]
+        
+        self.seat_list.clear()
+        # Ortak satırlar en sonda
+        for seat in sorted(unpaid, key=lambda s: (s is None, s or 0)):
+            item = QListWidgetItem(f"{seat_label(seat)} - {format_tl(unpaid[seat])}")
+            item.setData(Qt.UserRole, seat)
+            self.seat_list.addItem(item)
+        if self.seat_list.count():
+            self.seat_list.setCurrentRow(0)
+    
+    def remaining_parts(self) -> int:
+        """Henüz payını ödemeyen kişi sayısı"""
+        if self.state is None:
+            return self.people_input.value()
+        paid_shares = sum(1 for payment in self.state["payments"] if payment["split"] == "equal")
+        return max(self.people_input.value() - paid_shares, 1)
+    
+    def update_equal_share(self):
+        if self.state is None:
+            return
+        parts = self.remaining_parts()
+        share = split_amount(self.state["balance"], parts)[0] if self.state["balance"] > 0 else 0
+        self.share_label.setText(f"Kişi başı: {format_tl(share)}  ({parts} kişi kaldı)")
+    
+    def pay_selected(self):
+        """Açık sekmedeki bölüşüme göre ödeme al"""
+        tab = self.split_tabs.currentIndex()
+        if tab == 0:
+            items = self.selected_items()
+            if not items:
+                QMessageBox.warning(self, "Uyarı", "Ödenecek ürün seçilmedi!")
+                return
+            self.record_payment("item", items=items)
+        elif tab == 1:
+            item = self.seat_list.currentItem()
+            if item is None:
+                QMessageBox.warning(self, "Uyarı", "Ödenecek koltuk seçilmedi!")
+                return
+            self.record_payment("seat", seat=item.data(Qt.UserRole))
+        else:
+            self.record_payment("equal", parts=self.remaining_parts())
+    
+    def pay_remaining(self):
+        """Kalan tutarın tamamını al"""
+        self.record_payment("full")
+    
+    def record_payment(self, split: str, **details):
+        method = self.method_input.currentText()
+        try:
+            result = self.db.record_payment(
+                self.table_number, split, method, payment_id=self.payment_id, **details
+            )
+        except ValueError as e:
+            QMessageBox.warning(self, "Uyarı", str(e))
+            self.refresh_state()
+            return
+        except Exception as e:
+            QMessageBox.critical(self, "Hata", f"Ödeme alınırken hata oluştu:\n{str(e)}")
+            return
+        
+        self.payment_id = uuid.uuid4().hex
+        if result["closed"]:
+            self.closed = True
+            QMessageBox.information(
+                self,
+                "Başarılı",
+                f"Ödeme alındı: {format_tl(result['payment']['amount'])}\nHesap kapatıldı!"
+            )
+            self.accept()
+            return
+        self.refresh_state()
@@ -0,0 +1,162 @@
+"""
+Fiyat kuralları - happy hour, kategori indirimleri, kombinasyonlar ve bölge farkları
+
+Kurallar pricing_rules koleksiyonunda saklanır ve yüklenirken haftanın
+saatlerine (7 x 24 dilim) göre ürün, kategori ve genel olarak indekslenir;
+bir ürünün fiyatı her dokunuşta sadece o saatin dilimindeki kurallara bakarak
+çözülür. Kural belgesi:
+
+    {
+        "name": "Happy Hour",
+        "kind": "discount" | "surcharge" | "combo",
+        "product_id": ObjectId, "category": str    # ikisi de yoksa tüm ürünler
+        "days": [0..6],                             # 0 = Pazartesi (varsayılan: her gün)
+        "start_hour": 17, "end_hour": 19,           # yerel saat, [start, end) (gece yarısını geçebilir)
+        "zone": "Teras",                            # sadece bu bölgedeki masalarda
+        "percent": 20 | "amount": 500 | "price": 1000,   # yüzde, kuruş fark veya sabit fiyat
+        "with": [ObjectId, ...],                    # combo: bu ürünler adisyondaysa
+        "priority": 0,
+        "active": True
+    }
+
+İndirimlerden (discount/combo) müşteri lehine olan tek biri uygulanır, bölge
+farkları (surcharge) üzerine eklenir. Kombinasyon fiyatı, eşlik eden ürünler
+adisyonda varken eklenen ürüne uygulanır.
+"""
+from typing import Dict, Iterable, List, Optional, Tuple
+
+PRICING_RULE_KINDS = ("discount", "surcharge", "combo")
+HOURS_PER_WEEK = 7 * 24
+# Kural sürümünün en fazla bu kadar saniyede bir kontrol edilmesi
+RULE_REFRESH_SECONDS = 30
+
+
+def hour_of_week(moment) -> int:
+    """Yerel tarihin haftalık saat dilimi (Pazartesi 00:00 = 0)"""
+    return moment.weekday() * 24 + moment.hour
+
+
+def rule_hours(rule: Dict) -> List[int]:
+    """Kuralın geçerli olduğu haftalık saat dilimleri"""
+    days = rule.get("days") or range(7)
+    start = rule.get("start_hour", 0)
+    end = rule.get("end_hour", 24)
+    if start < end:
+        offsets = range(start, end)
+    else:
+        # Gece yarısını geçen aralık ertesi güne taşar (ör. 22-02)
+        offsets = list(range(start, 24)) + list(range(24, 24 + end))
+    return sorted({(day * 24 + offset) % HOURS_PER_WEEK for day in days for offset in offsets})
+
+
+def validate_rule(rule: Dict):
+    """Kural belgesini kontrol et, hatalıysa ValueError"""
+    if rule.get("kind") not in PRICING_RULE_KINDS:
+        raise ValueError(f"Geçersiz kural türü: {rule.get('kind')}")
+    values = [field for field in ("percent", "amount", "price") if rule.get(field) is not None]
+    if len(values) != 1:
+        raise ValueError("Kuralda percent, amount veya price alanlarından biri olmalı")
+    if rule["kind"] == "surcharge" and values[0] == "price":
+        raise ValueError("Bölge farkı sabit fiyat olamaz")
+    if rule["kind"] == "combo" and (not rule.get("product_id") or not rule.get("with")):
+        raise ValueError("Kombinasyon kuralında product_id ve with gerekli")
+    for field in ("start_hour", "end_hour"):
+        if not 0 <= rule.get(field, 0) <= 24:
+            raise ValueError(f"{field} 0-24 arasında olmalı")
+    if any(day not in range(7) for day in rule.get("days", [])):
+        raise ValueError("days 0 (Pazartesi) ile 6 (Pazar) arasında olmalı")
+
+
+def _adjustment(rule: Dict, list_price: int) -> int:
+    """Kuralın liste fiyatına göre fark tutarı (kuruş)"""
+    if rule.get("percent") is not None:
+        return (list_price * rule["percent"] + 50) // 100
+    return rule["amount"]
+
+
+class PricingEngine:
+    """Derlenmiş fiyat kuralları: haftalık saat dilimi -> ürün/kategori/genel kurallar"""
+    
+    def __init__(self, rules: Iterable[Dict] = (), version: Optional[int] = None):
+        """
+        Args:
+            rules: pricing_rules belgeleri (pasif olanlar atlanır)
+            version: Kuralların sürümü (değişmedikçe yeniden derlenmez)
+        """
+        self.version = version
+        self._buckets = [{"product": {}, "category": {}, "all": []} for _ in range(HOURS_PER_WEEK)]
+        self.rule_count = 0
+        # Fiyatı masaya (bölge) veya adisyona (kombinasyon) bağlı kurallar
+        self.has_zone_rules = False
+        self._combo_products = set()
+        self._compile(rules)
+    
+    def _compile(self, rules: Iterable[Dict]):
+        for rule in sorted(rules, key=lambda rule: rule.get("priority", 0)):
+            if not rule.get("active", True):
+                continue
+            if rule.get("product_id") is not None:
+                index, key = "product", rule["product_id"]
+            elif rule.get("category"):
+                index, key = "category", rule["category"]
+            else:
+                index, key = "all", None
+            
+            for hour in rule_hours(rule):
+                bucket = self._buckets[hour][index]
+                if key is None:
+                    bucket.append(rule)
+                else:
+                    bucket.setdefault(key, []).append(rule)
+            
+            self.rule_count += 1
+            self.has_zone_rules = self.has_zone_rules or bool(rule.get("zone"))
+            if rule["kind"] == "combo":
+                self._combo_products.add(rule["product_id"])
+    
+    def depends_on_table(self, product: Dict) -> bool:
+        """Fiyat masanın bölgesine veya adisyonun içeriğine bağlı olabilir mi"""
+        return self.has_zone_rules or product.get("_id") in self._combo_products
+    
+    def resolve(self, product: Dict, moment, zone: Optional[str] = None,
+                order_products: Iterable = ()) -> Tuple[int, List[str]]:
+        """
+        Ürünün verilen anda (yerel saat) uygulanacak birim fiyatı
+        
+        Args:
+            product: Ürün (price liste fiyatıdır)
+            moment: Yerel saat dilimli tarih
+            zone: Masanın bölgesi
+            order_products: Adisyondaki ürünlerin _id'leri (kombinasyonlar için)
+        
+        Returns:
+            (birim fiyat, uygulanan kuralların adları)
+        """
+        list_price = product["price"]
+        bucket = self._buckets[hour_of_week(moment)]
+        rules = (
+            bucket["product"].get(product.get("_id"), [])
+            + bucket["category"].get(product.get("category", "Diğer"), [])
+            + bucket["all"]
+        )
+        if not rules:
+            return list_price, []
+        
+        order_products = set(order_products)
+        price, discount, surcharge, applied = list_price, None, 0, []
+        for rule in rules:
+            if rule.get("zone") and rule["zone"] != zone:
+                continue
+            if rule["kind"] == "surcharge":
+                surcharge += _adjustment(rule, list_price)
+                applied.append(rule.get("name", ""))
+                continue
+            if rule["kind"] == "combo" and not set(rule["with"]) <= order_products:
+                continue
+            candidate = rule["price"] if rule.get("price") is not None else list_price - _adjustment(rule, list_price)
+            if candidate < price:
+                price, discount = candidate, rule.get("name", "")
+        
+        if discount is not None:
+            applied.insert(0, discount)
+        return max(0, price + surcharge), applied
@@ -0,0 +1,96 @@
+"""
+Ürün arama - Türkçe duyarlı normalizasyon ve önek ağacı (trie) önbelleği
+"""
+import unicodedata
+from typing import Dict, List, Optional, Set
+
+
+# Türkçe büyük/küçük harf dönüşümü (I -> ı, İ -> i) ve aksan sadeleştirme
+_TURKISH_CASE_FOLD = str.maketrans({"I": "ı", "İ": "i"})
+_TURKISH_ASCII_FOLD = str.maketrans({
+    "ı": "i", "ğ": "g", "ü": "u", "ş": "s", "ö": "o", "ç": "c",
+    "â": "a", "î": "i", "û": "u"
+})
+
+
+def normalize_name(text: str) -> str:
+    """Metni arama için normalize et (Türkçe küçük harf, aksansız)"""
+    text = text.translate(_TURKISH_CASE_FOLD).lower().translate(_TURKISH_ASCII_FOLD)
+    # Kalan birleşik aksan işaretlerini temizle
+    decomposed = unicodedata.normalize("NFKD", text)
+    stripped = "".join(ch for ch in decomposed if not unicodedata.combining(ch))
+    return " ".join(stripped.split())
+
+
+def name_tokens(text: str) -> List[str]:
+    """Normalize edilmiş kelimeleri döndür (önek araması için)"""
+    return normalize_name(text).split()
+
+
+def rank_key(product: Dict, query: str):
+    """Arama sonuçları için sıralama anahtarı (küçük olan önce gelir)"""
+    name = normalize_name(product.get("name", ""))
+    if name == query:
+        tier = 0
+    elif name.startswith(query):
+        tier = 1
+    else:
+        tier = 2
+    return (tier, len(name), name)
+
+
+class _TrieNode:
+    """Önek ağacı düğümü"""
+    __slots__ = ("children", "ids")
+    
+    def __init__(self):
+        self.children: Dict[str, "_TrieNode"] = {}
+        self.ids: Set[int] = set()
+
+
+class ProductSearchIndex:
+    """Ürün adları üzerinde bellek içi önek ağacı"""
+    
+    def __init__(self, products: Optional[List[Dict]] = None):
+        self.root = _TrieNode()
+        self.products: List[Dict] = []
+        if products:
+            self.build(products)
+    
+    def build(self, products: List[Dict]):
+        """İndeksi verilen ürün listesinden yeniden oluştur"""
+        self.root = _TrieNode()
+        self.products = list(products)
+        for idx, product in enumerate(self.products):
+            for token in name_tokens(product.get("name", "")):
+                node = self.root
+                for ch in token:
+                    node = node.children.setdefault(ch, _TrieNode())
+                    node.ids.add(idx)
+    
+    def _lookup(self, prefix: str) -> Set[int]:
+        """Önekle başlayan kelimeye sahip ürünlerin indekslerini bul"""
+        node = self.root
+        for ch in prefix:
+            node = node.children.get(ch)
+            if node is None:
+                return set()
+        return node.ids
+    
+    def search(self, query: str, limit: int = 10) -> List[Dict]:
+        """Sorgudaki tüm kelimelerle eşleşen ürünleri sıralı döndür"""
+        tokens = name_tokens(query)
+        if not tokens:
+            return []
+        
+        matches = None
+        for token in tokens:
+            ids = self._lookup(token)
+            matches = set(ids) if matches is None else matches & ids
+            if not matches:
+                return []
+        
+        normalized_query = " ".join(tokens)
+        results = [self.products[i] for i in matches]
+        results.sort(key=lambda p: rank_key(p, normalized_query))
+        return results[:limit]
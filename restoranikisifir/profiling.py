@@ -0,0 +1,379 @@
+"""
+Profil modu - terminaller yavaşladığında ölçüm toplamak için (isteğe bağlı)
+
+RESTORAN_PROFILE=1 ortam değişkeni veya --profile argümanı ile açılır:
+
+    python main.py --profile
+
+Profil modunda:
+    - Qt olay işleme (QApplication.notify) ve Database çağrıları süreleriyle kaydedilir
+    - Olay döngüsü RESTORAN_STALL_MS'den (varsayılan 200) uzun bloklanırsa ana iş
+      parçacığının o anki Python yığını loglanır
+    - Ctrl+Shift+P profil oturumunu başlatır/durdurur (cProfile; RESTORAN_PROFILER=pyinstrument
+      ve pyinstrument kuruluysa pyinstrument), sonuç RESTORAN_PROFILE_DIR'e yazılır
+    - Ctrl+Shift+O veritabanı gecikmesi, donmalar ve widget sayısını gösteren katmanı açar/kapatır
+
+Profil modu kapalıyken hiçbir sarmalayıcı kurulmaz, ek maliyet yoktur.
+"""
+import cProfile
+import inspect
+import io
+import logging
+import os
+import pstats
+import sys
+import threading
+import time
+import traceback
+from collections import defaultdict, deque
+from datetime import datetime
+from functools import wraps
+from typing import Dict, List, Optional, Tuple
+from PyQt5.QtWidgets import QApplication, QLabel, QShortcut
+from PyQt5.QtCore import Qt, QTimer, QEvent
+from PyQt5.QtGui import QKeySequence
+from theme import set_role
+
+try:
+    from pyinstrument import Profiler as InstrumentProfiler
+except ImportError:
+    InstrumentProfiler = None
+
+logger = logging.getLogger(__name__)
+
+PROFILE_ENV = "RESTORAN_PROFILE"
+PROFILE_FLAG = "--profile"
+# Olay döngüsü nabız aralığı (ms); donmalar bu nabzın gecikmesinden ölçülür
+WATCHDOG_TICK_MS = 50
+OVERLAY_REFRESH_MS = 1000
+# Yüzdelikler için isim başına değil, toplamda tutulan son ölçüm sayısı
+RECENT_SAMPLES = 500
+
+# QEvent.Type değerlerinin adları (loglarda okunabilirlik için)
+EVENT_NAMES = {
+    value: name for name, value in vars(QEvent).items() if isinstance(value, QEvent.Type)
+}
+
+
+class TimingStats:
+    """İsim bazında süre istatistikleri (iş parçacıkları arasında paylaşılır)"""
+    
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counts = defaultdict(int)
+        self.totals = defaultdict(float)
+        self.maxima = defaultdict(float)
+        self.recent = deque(maxlen=RECENT_SAMPLES)
+    
+    def record(self, name: str, elapsed: float):
+        with self.lock:
+            self.counts[name] += 1
+            self.totals[name] += elapsed
+            self.maxima[name] = max(self.maxima[name], elapsed)
+            self.recent.append(elapsed)
+    
+    def snapshot(self) -> Dict:
+        """Toplam çağrı, son ölçümlerin p95'i ve en yavaş isim"""
+        with self.lock:
+            recent = sorted(self.recent)
+            slowest = max(self.maxima.items(), key=lambda item: item[1], default=(None, 0.0))
+            calls = sum(self.counts.values())
+        p95 = recent[max(0, int(round(0.95 * len(recent))) - 1)] if recent else 0.0
+        return {
+            "calls": calls,
+            "p95_ms": p95 * 1000,
+            "slowest": slowest[0],
+            "slowest_ms": slowest[1] * 1000,
+        }
+    
+    def summary(self, limit: int = 10) -> List[Tuple[str, int, float, float]]:
+        """Toplam süreye göre en pahalı isimler: (isim, çağrı, toplam ms, en uzun ms)"""
+        with self.lock:
+            rows = [
+                (name, self.counts[name], self.totals[name] * 1000, self.maxima[name] * 1000)
+                for name in self.counts
+            ]
+        return sorted(rows, key=lambda row: row[2], reverse=True)[:limit]
+
+
+class TimedDatabase:
+    """
+    Database vekili - dışarıdan yapılan metot çağrılarının süresini ölçer
+    
+    Koleksiyonlar, takvim gibi diğer öznitelikler aynen verilir. Database
+    metotlarının kendi içindeki çağrılar ölçülmez (çift sayım olmaz).
+    """
+    
+    def __init__(self, db, stats: TimingStats, slow_ms: float):
+        self._db = db
+        self._stats = stats
+        self._slow_ms = slow_ms
+    
+    def __getattr__(self, name):
+        attr = getattr(self._db, name)
+        if not inspect.ismethod(attr):
+            return attr
+        
+        @wraps(attr)
+        def timed(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return attr(*args, **kwargs)
+            finally:
+                elapsed = time.perf_counter() - started
+                self._stats.record(name, elapsed)
+                if elapsed * 1000 >= self._slow_ms:
+                    logger.warning(f"Yavaş veritabanı çağrısı: {name} {elapsed * 1000:.1f} ms")
+        return timed
+
+
+class ProfiledApplication(QApplication):
+    """Her Qt olayının işlenme süresini ölçen uygulama"""
+    
+    def __init__(self, argv: List[str], profiler: "Profiler"):
+        super().__init__(argv)
+        self.profiler = profiler
+    
+    def notify(self, receiver, event) -> bool:
+        started = time.perf_counter()
+        try:
+            return super().notify(receiver, event)
+        finally:
+            self.profiler.record_event(receiver, event.type(), time.perf_counter() - started)
+
+
+class StallWatchdog:
+    """
+    Olay döngüsü donmalarını izler
+    
+    Ana iş parçacığındaki QTimer her WATCHDOG_TICK_MS'de nabız atar; ayrı bir
+    iş parçacığı nabız stall_ms'den uzun süre gelmezse ana iş parçacığının
+    o anki yığınını loglar (donma sürerken, yani suçlu kod hâlâ çalışırken).
+    """
+    
+    def __init__(self, stall_ms: float, stats: TimingStats, parent=None):
+        self.stall_ms = stall_ms
+        self.stats = stats
+        self.main_thread_id = threading.main_thread().ident
+        self.last_tick = time.perf_counter()
+        self.reported = False
+        self._stop = threading.Event()
+        
+        self.timer = QTimer(parent)
+        self.timer.setInterval(WATCHDOG_TICK_MS)
+        self.timer.timeout.connect(self.tick)
+        self.thread = threading.Thread(target=self.watch, name="stall-watchdog", daemon=True)
+    
+    def start(self):
+        self.last_tick = time.perf_counter()
+        self.timer.start()
+        self.thread.start()
+    
+    def stop(self):
+        self.timer.stop()
+        self._stop.set()
+    
+    def tick(self):
+        now = time.perf_counter()
+        late = now - self.last_tick - WATCHDOG_TICK_MS / 1000
+        if late * 1000 >= self.stall_ms:
+            self.stats.record("stall", late)
+            logger.warning(f"Olay döngüsü {late * 1000:.0f} ms dondu")
+        self.last_tick = now
+        self.reported = False
+    
+    def watch(self):
+        while not self._stop.wait(self.stall_ms / 2000):
+            blocked = time.perf_counter() - self.last_tick
+            if blocked * 1000 < self.stall_ms or self.reported:
+                continue
+            # Her donma için yığın bir kez loglanır
+            self.reported = True
+            frame = sys._current_frames().get(self.main_thread_id)
+            stack = "".join(traceback.format_stack(frame)) if frame else "(yığın alınamadı)\n"
+            logger.warning(
+                f"Olay döngüsü {blocked * 1000:.0f} ms'dir bloklu, ana iş parçacığı yığını:\n{stack}"
+            )
+
+
+class ProfileSession:
+    """İsteğe bağlı cProfile / pyinstrument oturumu"""
+    
+    def __init__(self, output_dir: str, engine: str = "cprofile"):
+        self.output_dir = output_dir
+        if engine == "pyinstrument" and InstrumentProfiler is None:
+            logger.warning("pyinstrument kurulu değil, cProfile kullanılacak: pip install pyinstrument")
+            engine = "cprofile"
+        self.engine = engine
+        self.profiler = None
+    
+    @property
+    def active(self) -> bool:
+        return self.profiler is not None
+    
+    def start(self):
+        if self.engine == "pyinstrument":
+            self.profiler = InstrumentProfiler()
+            self.profiler.start()
+        else:
+            self.profiler = cProfile.Profile()
+            self.profiler.enable()
+        logger.info(f"Profil oturumu başladı ({self.engine})")
+    
+    def stop(self) -> str:
+        """Oturumu durdur, sonucu dosyaya yaz ve dosya yolunu döndür"""
+        profiler, self.profiler = self.profiler, None
+        os.makedirs(self.output_dir, exist_ok=True)
+        stamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        
+        if self.engine == "pyinstrument":
+            profiler.stop()
+            path = os.path.join(self.output_dir, f"profil_{stamp}.html")
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(profiler.output_html())
+        else:
+            profiler.disable()
+            path = os.path.join(self.output_dir, f"profil_{stamp}.prof")
+            profiler.dump_stats(path)
+            report = io.StringIO()
+            pstats.Stats(profiler, stream=report).sort_stats("cumulative").print_stats(25)
+            logger.info(f"Profil özeti (kümülatif süreye göre):\n{report.getvalue()}")
+        
+        logger.info(f"Profil oturumu kaydedildi: {path}")
+        return path
+    
+    def toggle(self) -> Optional[str]:
+        if self.active:
+            return self.stop()
+        self.start()
+        return None
+
+
+class PerformanceOverlay(QLabel):
+    """Pencerenin sağ üst köşesinde gecikme, donma ve widget sayısı katmanı"""
+    
+    def __init__(self, profiler: "Profiler", parent):
+        super().__init__(parent)
+        self.profiler = profiler
+        set_role(self, "overlay")
+        self.setAttribute(Qt.WA_TransparentForMouseEvents)
+        
+        self.timer = QTimer(self)
+        self.timer.setInterval(OVERLAY_REFRESH_MS)
+        self.timer.timeout.connect(self.refresh)
+        self.timer.start()
+        self.refresh()
+    
+    def toggle(self):
+        self.setVisible(not self.isVisible())
+        if self.isVisible():
+            self.refresh()
+    
+    def refresh(self):
+        if not self.isVisible():
+            return
+        profiler = self.profiler
+        db = profiler.db_stats.snapshot()
+        stalls = profiler.stall_stats.snapshot()
+        events = profiler.event_stats.snapshot()
+        widgets = QApplication.allWidgets()
+        windows = sum(1 for widget in widgets if widget.isWindow() and widget.isVisible())
+        
+        lines = [
+            f"DB     : {db['calls']} çağrı | p95 {db['p95_ms']:.1f} ms",
+            f"         en yavaş {db['slowest'] or '-'} {db['slowest_ms']:.1f} ms",
+            f"Donma  : {stalls['calls']} (>{profiler.stall_ms:.0f} ms) | en uzun {stalls['slowest_ms']:.0f} ms",
+            f"Olay   : {profiler.event_count} | yavaş {events['calls']} (>{profiler.slow_event_ms:.0f} ms)",
+            f"Widget : {len(widgets)} ({windows} açık pencere)",
+            f"Profil : {'kaydediliyor' if profiler.session.active else 'kapalı'} [Ctrl+Shift+P]",
+        ]
+        self.setText("\n".join(lines))
+        self.adjustSize()
+        self.move(self.parent().width() - self.width() - 10, 10)
+        self.raise_()
+
+
+class Profiler:
+    """Profil modunun ölçümleri ve araçları"""
+    
+    def __init__(self, stall_ms: float = 200, slow_event_ms: float = 50, slow_db_ms: float = 100,
+                 output_dir: str = "profiles", engine: str = "cprofile"):
+        self.stall_ms = stall_ms
+        self.slow_event_ms = slow_event_ms
+        self.slow_db_ms = slow_db_ms
+        self.db_stats = TimingStats()
+        self.event_stats = TimingStats()
+        self.stall_stats = TimingStats()
+        self.event_count = 0
+        self.session = ProfileSession(output_dir, engine)
+        self.watchdog = None
+        self.overlay = None
+    
+    @classmethod
+    def from_env(cls, argv: List[str]) -> Optional["Profiler"]:
+        """
+        Profil modu açıksa yapılandırılmış Profiler döndür, değilse None
+        
+        --profile argümanı argv'den çıkarılır (Qt'ye geçmez).
+        """
+        enabled = os.environ.get(PROFILE_ENV, "") not in ("", "0")
+        if PROFILE_FLAG in argv:
+            argv.remove(PROFILE_FLAG)
+            enabled = True
+        if not enabled:
+            return None
+        return cls(
+            stall_ms=float(os.environ.get("RESTORAN_STALL_MS", "200")),
+            slow_event_ms=float(os.environ.get("RESTORAN_SLOW_EVENT_MS", "50")),
+            slow_db_ms=float(os.environ.get("RESTORAN_SLOW_DB_MS", "100")),
+            output_dir=os.environ.get("RESTORAN_PROFILE_DIR", "profiles"),
+            engine=os.environ.get("RESTORAN_PROFILER", "cprofile"),
+        )
+    
+    def wrap_database(self, db) -> TimedDatabase:
+        """Database çağrılarını ölçen vekili döndür"""
+        return TimedDatabase(db, self.db_stats, self.slow_db_ms)
+    
+    def record_event(self, receiver, event_type, elapsed: float):
+        # İç içe olaylar da sayılır; sadece yavaş olanlar isimleriyle saklanır
+        self.event_count += 1
+        if elapsed * 1000 < self.slow_event_ms:
+            return
+        name = f"{type(receiver).__name__}/{EVENT_NAMES.get(event_type, int(event_type))}"
+        self.event_stats.record(name, elapsed)
+        logger.warning(f"Yavaş olay: {name} {elapsed * 1000:.1f} ms")
+    
+    def install(self, window):
+        """Donma izleyicisini, katmanı ve kısayolları ana pencereye kur"""
+        self.watchdog = StallWatchdog(self.stall_ms, self.stall_stats, window)
+        self.watchdog.start()
+        self.overlay = PerformanceOverlay(self, window)
+        QShortcut(QKeySequence("Ctrl+Shift+P"), window, self.toggle_session)
+        QShortcut(QKeySequence("Ctrl+Shift+O"), window, self.overlay.toggle)
+        QApplication.instance().aboutToQuit.connect(self.shutdown)
+        logger.info(
+            f"Profil modu açık: donma eşiği {self.stall_ms:.0f} ms, "
+            f"yavaş olay eşiği {self.slow_event_ms:.0f} ms"
+        )
+    
+    def toggle_session(self):
+        self.session.toggle()
+        if self.overlay:
+            self.overlay.refresh()
+    
+    def shutdown(self):
+        """Çıkışta açık oturumu kaydet ve özetleri logla"""
+        if self.watchdog:
+            self.watchdog.stop()
+        if self.session.active:
+            self.session.stop()
+        
+        for title, stats in (("Veritabanı çağrıları", self.db_stats), ("Yavaş olaylar", self.event_stats)):
+            rows = stats.summary()
+            if not rows:
+                continue
+            lines = [
+                f"  {name:<32} {count:>6} kez  toplam {total:>9.1f} ms  en uzun {longest:>8.1f} ms"
+                for name, count, total, longest in rows
+            ]
+            logger.info(f"{title}:\n" + "\n".join(lines))
@@ -0,0 +1,96 @@
+"""
+Kapanmış dönemler için rapor sonuç önbelleği (LRU, isteğe bağlı dosyaya kalıcı)
+"""
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Optional
+import json
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+
+class ReportCache:
+    """
+    Değişmeyecek (tamamen geçmişte kalan) dönemlerin rapor sonuçlarını sakla
+    
+    Önbelleğe sadece sipariş koleksiyonlarından (orders ve aylık arşivler)
+    hesaplanan sonuçlar yazılır. Siparişler sadece eklenir; arşive taşıma
+    içeriklerini değiştirmez ve siparişleri yeniden yazan şema taşımaları
+    önbelleği temizler. Bu yüzden kapanmış bir aralığın sonucu bir kez
+    hesaplandıktan sonra kalıcı olarak geçerlidir. Sonradan güncellenen
+    koleksiyonlardan (payments, tables vb.) hesaplanan raporlar önbelleğe
+    alınmamalıdır.
+    """
+    
+    def __init__(self, max_entries: int = 512, path: Optional[str] = None):
+        """
+        Args:
+            max_entries: Bellekte tutulacak en fazla kayıt sayısı
+            path: Verilirse önbellek bu JSON dosyasına da yazılır
+        """
+        self.max_entries = max_entries
+        self.path = path
+        self._entries: "OrderedDict[str, Any]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self._load()
+    
+    @staticmethod
+    def make_key(*parts) -> str:
+        """Anahtar parçalarından (tarihler dahil) metin anahtar üret"""
+        return "|".join(
+            part.isoformat() if isinstance(part, datetime) else str(part)
+            for part in parts
+        )
+    
+    def get(self, key: str, default=None):
+        """Önbellekten değer getir (en son kullanılan olarak işaretler)"""
+        if key in self._entries:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return self._entries[key]
+        self.misses += 1
+        return default
+    
+    def __contains__(self, key: str) -> bool:
+        return key in self._entries
+    
+    def put(self, key: str, value: Any):
+        """Değeri önbelleğe ekle, gerekirse en eski kaydı çıkar"""
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        self._save()
+    
+    def clear(self):
+        """Tüm kayıtları sil (ör. veri taşıma sonrası)"""
+        self._entries.clear()
+        self._save()
+    
+    def _load(self):
+        """Kalıcı dosyadan kayıtları yükle"""
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                for key, value in json.load(f):
+                    self._entries[key] = value
+            logger.info(f"Rapor önbelleği yüklendi: {len(self._entries)} kayıt")
+        except (OSError, ValueError) as e:
+            logger.warning(f"Rapor önbelleği okunamadı, yok sayılıyor: {e}")
+            self._entries.clear()
+    
+    def _save(self):
+        """Kayıtları dosyaya atomik olarak yaz"""
+        if not self.path:
+            return
+        tmp_path = f"{self.path}.tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(list(self._entries.items()), f, ensure_ascii=False)
+            os.replace(tmp_path, self.path)
+        except (OSError, TypeError) as e:
+            logger.warning(f"Rapor önbelleği yazılamadı: {e}")
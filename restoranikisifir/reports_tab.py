@@ -4,11 +4,33 @@ Ciro ve kazanç raporları ekranı
 from PyQt5.QtWidgets import (
     QWidget, QVBoxLayout, QHBoxLayout, QPushButton, 
     QTableWidget, QTableWidgetItem, QLabel, QHeaderView,
-    QGroupBox, QGridLayout
+    QGroupBox, QGridLayout, QTabWidget, QDateEdit, QComboBox,
+    QCheckBox, QSpinBox, QDoubleSpinBox, QMessageBox
 )
-from PyQt5.QtCore import Qt
+from PyQt5.QtCore import Qt, QDate
 from PyQt5.QtGui import QFont
 from datetime import datetime, timedelta
+from typing import Dict, Optional
+import logging
+from revenue_chart import RevenueChart
+from export_dialog import ExportDialog
+from payment_dialog import SPLIT_LABELS
+from theme import set_role
+from business_day import format_duration
+from money import format_tl, to_tl, to_kurus
+
+logger = logging.getLogger(__name__)
+
+# Sipariş geçmişinde sayfa başına sipariş
+HISTORY_PAGE_SIZE = 50
+
+
+def shift_year_back(moment: datetime) -> datetime:
+    """Tarihi bir yıl geriye al (29 Şubat için 28 Şubat kullanılır)"""
+    try:
+        return moment.replace(year=moment.year - 1)
+    except ValueError:
+        return moment.replace(year=moment.year - 1, day=28)
 
 
 class ReportsTab(QWidget):
@@ -17,8 +39,15 @@ class ReportsTab(QWidget):
     def __init__(self, db):
         super().__init__()
         self.db = db
+        self._loaded = False
         self.init_ui()
-        self.refresh_reports()
+    
+    def showEvent(self, event):
+        # Sayfa ilk gösterildiğinde yüklenir (açılış veritabanını beklemez)
+        super().showEvent(event)
+        if not self._loaded:
+            self._loaded = True
+            self.refresh_reports()
     
     def init_ui(self):
         """Arayüzü oluştur"""
@@ -39,7 +68,7 @@ class ReportsTab(QWidget):
         self.total_revenue_card = self.create_summary_card(
             "Toplam Ciro", 
             "0.00 TL", 
-            "#3498db"
+            "primary"
         )
         summary_layout.addWidget(self.total_revenue_card, 0, 0)
         
@@ -47,7 +76,7 @@ class ReportsTab(QWidget):
         self.today_revenue_card = self.create_summary_card(
             "Bugünkü Ciro", 
             "0.00 TL", 
-            "#27ae60"
+            "success"
         )
         summary_layout.addWidget(self.today_revenue_card, 0, 1)
         
@@ -55,7 +84,7 @@ class ReportsTab(QWidget):
         self.month_revenue_card = self.create_summary_card(
             "Bu Ayki Ciro", 
             "0.00 TL", 
-            "#9b59b6"
+            "accent"
         )
         summary_layout.addWidget(self.month_revenue_card, 0, 2)
         
@@ -63,7 +92,7 @@ class ReportsTab(QWidget):
         self.total_orders_card = self.create_summary_card(
             "Toplam Sipariş", 
             "0", 
-            "#e67e22"
+            "warning"
         )
         summary_layout.addWidget(self.total_orders_card, 1, 0)
         
@@ -71,7 +100,7 @@ class ReportsTab(QWidget):
         self.today_orders_card = self.create_summary_card(
             "Bugünkü Sipariş", 
             "0", 
-            "#1abc9c"
+            "info"
         )
         summary_layout.addWidget(self.today_orders_card, 1, 1)
         
@@ -79,7 +108,7 @@ class ReportsTab(QWidget):
         self.avg_order_card = self.create_summary_card(
             "Ortalama Sipariş", 
             "0.00 TL", 
-            "#e74c3c"
+            "danger"
         )
         summary_layout.addWidget(self.avg_order_card, 1, 2)
         
@@ -93,18 +122,91 @@ class ReportsTab(QWidget):
         btn_refresh.setMinimumHeight(40)
         btn_refresh.setMinimumWidth(150)
         btn_refresh.clicked.connect(self.refresh_reports)
-        self.style_button(btn_refresh, "#3498db")
+        set_role(btn_refresh, "primary")
         btn_layout.addWidget(btn_refresh)
         
+        btn_export = QPushButton("📥 Dışa Aktar")
+        btn_export.setMinimumHeight(40)
+        btn_export.setMinimumWidth(150)
+        btn_export.clicked.connect(self.open_export_dialog)
+        set_role(btn_export, "export")
+        btn_layout.addWidget(btn_export)
+        
         btn_layout.addStretch()
         layout.addLayout(btn_layout)
         
-        # Sipariş geçmişi başlığı
-        history_title = QLabel("Sipariş Geçmişi")
-        history_title.setFont(QFont("Arial", 14, QFont.Bold))
-        layout.addWidget(history_title)
+        # Alt bölüm sekmeleri
+        self.detail_tabs = QTabWidget()
+        self.detail_tabs.setFont(QFont("Arial", 11))
+        layout.addWidget(self.detail_tabs, stretch=1)
+        
+        # Sipariş geçmişi (filtreli, sayfalı)
+        self.detail_tabs.addTab(self.create_history_widget(), "Sipariş Geçmişi")
+        
+        # Ürün/kategori satışları
+        self.detail_tabs.addTab(self.create_sales_widget(), "Ürün Satışları")
+        
+        # Zaman dilimli ciro grafiği
+        self.detail_tabs.addTab(self.create_series_widget(), "Ciro Grafiği")
+        
+        # Ödeme türü ve bölüşüme göre tahsilatlar
+        self.detail_tabs.addTab(self.create_payments_widget(), "Ödemeler")
+        
+        # Gün sonu (Z) raporları
+        self.detail_tabs.addTab(self.create_z_report_widget(), "Gün Sonu")
+        
+        # Masa devri, oturma süresi ve anlık doluluk
+        self.detail_tabs.addTab(self.create_turnover_widget(), "Masa Doluluk")
+    
+    def create_history_widget(self) -> QWidget:
+        """Filtre çubuğu ve sayfalama ile sipariş geçmişi bölümünü oluştur"""
+        widget = QWidget()
+        layout = QVBoxLayout(widget)
+        
+        filter_layout = QHBoxLayout()
+        
+        today = QDate.currentDate()
+        self.history_date_input = QCheckBox("Tarih:")
+        filter_layout.addWidget(self.history_date_input)
+        self.history_start_input = QDateEdit(today.addDays(-7))
+        self.history_start_input.setCalendarPopup(True)
+        self.history_start_input.setDisplayFormat("dd.MM.yyyy")
+        filter_layout.addWidget(self.history_start_input)
+        
+        filter_layout.addWidget(QLabel("-"))
+        self.history_end_input = QDateEdit(today)
+        self.history_end_input.setCalendarPopup(True)
+        self.history_end_input.setDisplayFormat("dd.MM.yyyy")
+        filter_layout.addWidget(self.history_end_input)
+        
+        filter_layout.addWidget(QLabel("Masa:"))
+        self.history_table_input = QSpinBox()
+        self.history_table_input.setRange(0, 9999)
+        self.history_table_input.setSpecialValueText("Tümü")
+        filter_layout.addWidget(self.history_table_input)
+        
+        filter_layout.addWidget(QLabel("En az:"))
+        self.history_min_total_input = QDoubleSpinBox()
+        self.history_min_total_input.setRange(0, 1000000)
+        self.history_min_total_input.setDecimals(2)
+        self.history_min_total_input.setSuffix(" TL")
+        filter_layout.addWidget(self.history_min_total_input)
+        
+        filter_layout.addWidget(QLabel("Ürün:"))
+        self.history_product_input = QComboBox()
+        self.history_product_input.setMinimumWidth(160)
+        filter_layout.addWidget(self.history_product_input)
+        
+        btn_search = QPushButton("🔍 Ara")
+        btn_search.setMinimumHeight(30)
+        btn_search.setMinimumWidth(100)
+        btn_search.clicked.connect(self.load_order_history)
+        set_role(btn_search, "accent")
+        filter_layout.addWidget(btn_search)
+        
+        filter_layout.addStretch()
+        layout.addLayout(filter_layout)
         
-        # Sipariş geçmişi tablosu
         self.orders_table = QTableWidget()
         self.orders_table.setColumnCount(5)
         self.orders_table.setHorizontalHeaderLabels([
@@ -113,13 +215,110 @@ class ReportsTab(QWidget):
         self.orders_table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
         self.orders_table.setAlternatingRowColors(True)
         self.orders_table.setEditTriggers(QTableWidget.NoEditTriggers)
-        layout.addWidget(self.orders_table, stretch=1)
+        layout.addWidget(self.orders_table)
+        
+        # Sayfalama (önceki sayfaların devam anahtarları saklanır)
+        page_layout = QHBoxLayout()
+        page_layout.addStretch()
+        self.btn_prev_page = QPushButton("◀ Önceki")
+        self.btn_prev_page.clicked.connect(lambda: self.show_history_page(self.history_page - 1))
+        page_layout.addWidget(self.btn_prev_page)
+        self.history_page_label = QLabel("")
+        page_layout.addWidget(self.history_page_label)
+        self.btn_next_page = QPushButton("Sonraki ▶")
+        self.btn_next_page.clicked.connect(lambda: self.show_history_page(self.history_page + 1))
+        page_layout.addWidget(self.btn_next_page)
+        page_layout.addStretch()
+        layout.addLayout(page_layout)
+        
+        self.history_cursors = [None]
+        self.history_page = 0
+        
+        return widget
     
-    def create_summary_card(self, title: str, value: str, color: str) -> QGroupBox:
-        """Özet kartı oluştur"""
+    def load_history_products(self):
+        """Ürün filtresi listesini menüden doldur (seçim korunur)"""
+        selected = self.history_product_input.currentData()
+        self.history_product_input.blockSignals(True)
+        self.history_product_input.clear()
+        self.history_product_input.addItem("Tümü", None)
+        for product in self.db.get_all_products():
+            self.history_product_input.addItem(product["name"], product["_id"])
+        index = self.history_product_input.findData(selected)
+        self.history_product_input.setCurrentIndex(max(index, 0))
+        self.history_product_input.blockSignals(False)
+    
+    def history_filters(self) -> Dict:
+        """Filtre çubuğundaki değerleri find_orders argümanlarına çevir"""
+        filters = {
+            "table_number": self.history_table_input.value() or None,
+            "min_total": to_kurus(self.history_min_total_input.value()) or None,
+            "product_id": self.history_product_input.currentData(),
+        }
+        if self.history_date_input.isChecked():
+            start = self.history_start_input.date().toPyDate()
+            end = self.history_end_input.date().toPyDate()
+            filters["start_date"] = self.db.calendar.day_start(start)
+            filters["end_date"] = self.db.calendar.day_start(end + timedelta(days=1))
+        return filters
+    
+    def open_export_dialog(self):
+        """Sipariş geçmişini dosyaya aktarma diyaloğunu aç"""
+        ExportDialog(self.db, self).exec_()
+    
+    def create_sales_widget(self) -> QWidget:
+        """Ürün, kategori ve saat bazlı satış raporu bölümünü oluştur"""
+        widget = QWidget()
+        layout = QVBoxLayout(widget)
+        
+        filter_layout = QHBoxLayout()
+        
+        today = QDate.currentDate()
+        filter_layout.addWidget(QLabel("Başlangıç:"))
+        self.sales_start_input = QDateEdit(QDate(today.year(), today.month(), 1))
+        self.sales_start_input.setCalendarPopup(True)
+        self.sales_start_input.setDisplayFormat("dd.MM.yyyy")
+        filter_layout.addWidget(self.sales_start_input)
+        
+        filter_layout.addWidget(QLabel("Bitiş:"))
+        self.sales_end_input = QDateEdit(today)
+        self.sales_end_input.setCalendarPopup(True)
+        self.sales_end_input.setDisplayFormat("dd.MM.yyyy")
+        filter_layout.addWidget(self.sales_end_input)
+        
+        filter_layout.addWidget(QLabel("Gruplama:"))
+        self.sales_group_input = QComboBox()
+        self.sales_group_input.addItem("Ürün", "product")
+        self.sales_group_input.addItem("Kategori", "category")
+        self.sales_group_input.addItem("Saat", "hour")
+        filter_layout.addWidget(self.sales_group_input)
+        
+        btn_show = QPushButton("📊 Göster")
+        btn_show.setMinimumHeight(30)
+        btn_show.setMinimumWidth(100)
+        btn_show.clicked.connect(self.load_product_sales)
+        set_role(btn_show, "accent")
+        filter_layout.addWidget(btn_show)
+        
+        filter_layout.addStretch()
+        layout.addLayout(filter_layout)
+        
+        self.sales_table = QTableWidget()
+        self.sales_table.setColumnCount(4)
+        self.sales_table.setHorizontalHeaderLabels(["Ürün", "Adet", "Liste Tutarı", "Ciro"])
+        self.sales_table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
+        self.sales_table.setAlternatingRowColors(True)
+        self.sales_table.setEditTriggers(QTableWidget.NoEditTriggers)
+        layout.addWidget(self.sales_table)
+        
+        return widget
+    
+    def create_summary_card(self, title: str, value: str, accent: str) -> QGroupBox:
+        """Özet kartı oluştur (accent: tema vurgu rengi, ör. "primary")"""
         card = QGroupBox(title)
         card.setMinimumHeight(120)
         card.setFont(QFont("Arial", 10, QFont.Bold))
+        set_role(card, "card", accent=accent)
         
         layout = QVBoxLayout(card)
         layout.setContentsMargins(15, 15, 15, 15)
@@ -127,35 +326,18 @@ class ReportsTab(QWidget):
         value_label = QLabel(value)
         value_label.setFont(QFont("Arial", 24, QFont.Bold))
         value_label.setAlignment(Qt.AlignCenter)
-        value_label.setStyleSheet(f"color: {color}; padding: 10px;")
+        set_role(value_label, "card-value", accent=accent)
         layout.addWidget(value_label, stretch=1)
         
-        card.setStyleSheet(f"""
-            QGroupBox {{
-                border: 2px solid {color};
-                border-radius: 10px;
-                background-color: white;
-                font-size: 14px;
-            }}
-            QGroupBox::title {{
-                subcontrol-origin: margin;
-                left: 10px;
-                padding: 0 5px;
-                color: {color};
-            }}
-        """)
-        
         # Value label'ı saklamak için referans ekle
         card.value_label = value_label
         
         return card
     
-    def update_card_value(self, card: QGroupBox, value: str, color: str = None):
+    def update_card_value(self, card: QGroupBox, value: str):
         """Kart değerini güncelle"""
         if hasattr(card, 'value_label'):
             card.value_label.setText(value)
-            if color:
-                card.value_label.setStyleSheet(f"color: {color}; padding: 10px;")
     
     def refresh_reports(self):
         """Raporları yenile"""
@@ -164,59 +346,79 @@ class ReportsTab(QWidget):
             total_revenue = self.db.get_total_revenue()
             self.update_card_value(
                 self.total_revenue_card, 
-                f"{total_revenue:.2f} TL",
-                "#3498db"
+                format_tl(total_revenue)
             )
             
             # Bugünkü ciro
             today_revenue = self.db.get_today_revenue()
             self.update_card_value(
                 self.today_revenue_card, 
-                f"{today_revenue:.2f} TL",
-                "#27ae60"
+                format_tl(today_revenue)
             )
             
             # Bu ayki ciro
             month_revenue = self.db.get_this_month_revenue()
             self.update_card_value(
                 self.month_revenue_card, 
-                f"{month_revenue:.2f} TL",
-                "#9b59b6"
+                format_tl(month_revenue)
             )
             
             # Toplam sipariş sayısı
             total_orders = self.db.get_order_count()
             self.update_card_value(
                 self.total_orders_card, 
-                str(total_orders),
-                "#e67e22"
+                str(total_orders)
             )
             
             # Bugünkü sipariş sayısı
             today_orders = self.db.get_today_order_count()
             self.update_card_value(
                 self.today_orders_card, 
-                str(today_orders),
-                "#1abc9c"
+                str(today_orders)
             )
             
             # Ortalama sipariş tutarı
-            avg_order = total_revenue / total_orders if total_orders > 0 else 0.0
+            avg_order = round(total_revenue / total_orders) if total_orders > 0 else 0
             self.update_card_value(
                 self.avg_order_card, 
-                f"{avg_order:.2f} TL",
-                "#e74c3c"
+                format_tl(avg_order)
             )
             
             # Sipariş geçmişini yükle
+            self.load_history_products()
             self.load_order_history()
-            
+        
         except Exception as e:
             print(f"Rapor yüklenirken hata: {e}")
     
     def load_order_history(self):
-        """Sipariş geçmişini yükle"""
-        orders = self.db.get_all_orders()
+        """Filtrelerle sipariş geçmişinin ilk sayfasını yükle"""
+        self.history_cursors = [None]
+        self.show_history_page(0)
+    
+    def show_history_page(self, page: int):
+        """Sipariş geçmişinin verilen sayfasını veritabanından getir"""
+        if page < 0 or page >= len(self.history_cursors):
+            return
+        
+        try:
+            orders, next_cursor = self.db.find_orders(
+                before=self.history_cursors[page],
+                limit=HISTORY_PAGE_SIZE,
+                **self.history_filters()
+            )
+        except Exception as e:
+            logger.error(f"Sipariş geçmişi yüklenirken hata: {e}")
+            QMessageBox.warning(self, "Uyarı", f"Sipariş geçmişi yüklenemedi:\n{str(e)}")
+            return
+        
+        self.history_page = page
+        del self.history_cursors[page + 1:]
+        if next_cursor is not None:
+            self.history_cursors.append(next_cursor)
+        self.btn_prev_page.setEnabled(page > 0)
+        self.btn_next_page.setEnabled(next_cursor is not None)
+        self.history_page_label.setText(f"Sayfa {page + 1}")
         
         self.orders_table.setRowCount(len(orders))
         
@@ -244,8 +446,8 @@ class ReportsTab(QWidget):
             self.orders_table.setItem(row, 2, items_item)
             
             # Toplam Tutar
-            total = order.get("total", 0.0)
-            total_item = QTableWidgetItem(f"{total:.2f} TL")
+            total = order.get("total", 0)
+            total_item = QTableWidgetItem(format_tl(total))
             total_item.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
             self.orders_table.setItem(row, 3, total_item)
             
@@ -253,35 +455,421 @@ class ReportsTab(QWidget):
             status_item = QTableWidgetItem(order.get("status", "-"))
             status_item.setTextAlignment(Qt.AlignCenter)
             self.orders_table.setItem(row, 4, status_item)
+    
+    def create_series_widget(self) -> QWidget:
+        """Zaman dilimli ciro grafiği bölümünü oluştur"""
+        widget = QWidget()
+        layout = QVBoxLayout(widget)
+        
+        filter_layout = QHBoxLayout()
         
-        # Tarihe göre sırala (en yeni üstte)
-        self.orders_table.sortItems(0, Qt.DescendingOrder)
+        today = QDate.currentDate()
+        filter_layout.addWidget(QLabel("Başlangıç:"))
+        self.series_start_input = QDateEdit(today.addDays(-29))
+        self.series_start_input.setCalendarPopup(True)
+        self.series_start_input.setDisplayFormat("dd.MM.yyyy")
+        filter_layout.addWidget(self.series_start_input)
+        
+        filter_layout.addWidget(QLabel("Bitiş:"))
+        self.series_end_input = QDateEdit(today)
+        self.series_end_input.setCalendarPopup(True)
+        self.series_end_input.setDisplayFormat("dd.MM.yyyy")
+        filter_layout.addWidget(self.series_end_input)
+        
+        filter_layout.addWidget(QLabel("Dilim:"))
+        self.series_bucket_input = QComboBox()
+        self.series_bucket_input.addItem("Saatlik", "hour")
+        self.series_bucket_input.addItem("Günlük", "day")
+        self.series_bucket_input.addItem("Haftalık", "week")
+        self.series_bucket_input.addItem("Aylık", "month")
+        self.series_bucket_input.setCurrentIndex(1)
+        filter_layout.addWidget(self.series_bucket_input)
+        
+        filter_layout.addWidget(QLabel("Karşılaştır:"))
+        self.series_compare_input = QComboBox()
+        self.series_compare_input.addItem("Yok", None)
+        self.series_compare_input.addItem("Geçen hafta", "week")
+        self.series_compare_input.addItem("Geçen yıl", "year")
+        filter_layout.addWidget(self.series_compare_input)
+        
+        btn_show = QPushButton("📈 Göster")
+        btn_show.setMinimumHeight(30)
+        btn_show.setMinimumWidth(100)
+        btn_show.clicked.connect(self.load_revenue_series)
+        set_role(btn_show, "accent")
+        filter_layout.addWidget(btn_show)
+        
+        filter_layout.addStretch()
+        layout.addLayout(filter_layout)
+        
+        self.series_summary_label = QLabel("")
+        self.series_summary_label.setFont(QFont("Arial", 11, QFont.Bold))
+        layout.addWidget(self.series_summary_label)
+        
+        self.revenue_chart = RevenueChart()
+        layout.addWidget(self.revenue_chart, stretch=1)
+        
+        return widget
     
-    def style_button(self, button: QPushButton, color: str):
-        """Buton stilini uygula"""
-        button.setStyleSheet(f"""
-            QPushButton {{
-                background-color: {color};
-                color: white;
-                border: none;
-                border-radius: 5px;
-                font-size: 14px;
-                font-weight: bold;
-            }}
-            QPushButton:hover {{
-                background-color: {self.darken_color(color)};
-            }}
-        """)
+    def load_revenue_series(self):
+        """Seçili aralık için ciro serisini (ve karşılaştırmasını) çiz"""
+        start = self.series_start_input.date().toPyDate()
+        end = self.series_end_input.date().toPyDate()
+        start_date = self.db.calendar.day_start(start)
+        end_date = self.db.calendar.day_start(end + timedelta(days=1))
+        bucket = self.series_bucket_input.currentData()
+        compare = self.series_compare_input.currentData()
+        
+        try:
+            series = self.db.get_revenue_series(start_date, end_date, bucket)
+            compare_series = None
+            if compare == "week":
+                compare_series = self.db.get_revenue_series(
+                    start_date - timedelta(days=7), end_date - timedelta(days=7), bucket
+                )
+            elif compare == "year":
+                compare_series = self.db.get_revenue_series(
+                    shift_year_back(start_date), shift_year_back(end_date), bucket
+                )
+        except Exception as e:
+            logger.error(f"Ciro grafiği yüklenirken hata: {e}")
+            QMessageBox.warning(self, "Uyarı", f"Ciro grafiği yüklenemedi:\n{str(e)}")
+            return
+        
+        label_formats = {"hour": "%d.%m %H:00", "day": "%d.%m", "week": "%d.%m", "month": "%m.%Y"}
+        labels = [point["bucket"].strftime(label_formats[bucket]) for point in series]
+        values = [to_tl(point["revenue"]) for point in series]
+        compare_values = [to_tl(point["revenue"]) for point in compare_series] if compare_series else None
+        self.revenue_chart.set_series(labels, values, compare_values)
+        
+        total = sum(point["revenue"] for point in series)
+        summary = f"Dönem cirosu: {format_tl(total)}"
+        if compare_series:
+            previous = sum(point["revenue"] for point in compare_series)
+            summary += f"  |  Karşılaştırma: {format_tl(previous)}"
+            if previous > 0:
+                summary += f" ({(total - previous) / previous * 100:+.1f}%)"
+        self.series_summary_label.setText(summary)
     
-    def darken_color(self, color: str) -> str:
-        """Rengi koyulaştır"""
-        color_map = {
-            "#3498db": "#2980b9",
-            "#27ae60": "#229954",
-            "#9b59b6": "#8e44ad",
-            "#e67e22": "#d35400",
-            "#1abc9c": "#16a085",
-            "#e74c3c": "#c0392b"
-        }
-        return color_map.get(color, color)
-
+    def load_product_sales(self):
+        """Seçili aralık ve gruplamaya göre satış tablosunu doldur"""
+        start = self.sales_start_input.date().toPyDate()
+        end = self.sales_end_input.date().toPyDate()
+        # İş günü sınırları; bitiş günü dahil olsun (yarı açık aralık)
+        start_date = self.db.calendar.day_start(start)
+        end_date = self.db.calendar.day_start(end + timedelta(days=1))
+        group_by = self.sales_group_input.currentData()
+        
+        try:
+            rows = self.db.get_product_sales(start_date, end_date, group_by)
+        except Exception as e:
+            logger.error(f"Satış raporu yüklenirken hata: {e}")
+            QMessageBox.warning(self, "Uyarı", f"Satış raporu yüklenemedi:\n{str(e)}")
+            return
+        
+        self.sales_table.setHorizontalHeaderLabels(
+            [self.sales_group_input.currentText(), "Adet", "Liste Tutarı", "Ciro"]
+        )
+        self.sales_table.setRowCount(len(rows))
+        
+        for row, data in enumerate(rows):
+            key = data["key"]
+            if group_by == "hour":
+                key = f"{key:02d}:00 - {key:02d}:59"
+            self.sales_table.setItem(row, 0, QTableWidgetItem(str(key)))
+            
+            qty_item = QTableWidgetItem(str(data["quantity"]))
+            qty_item.setTextAlignment(Qt.AlignCenter)
+            self.sales_table.setItem(row, 1, qty_item)
+            
+            # Fiyat kuralları öncesi tutar (önbellekteki eski raporlarda yok)
+            list_item = QTableWidgetItem(format_tl(data.get("list_revenue", data["revenue"])))
+            list_item.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
+            self.sales_table.setItem(row, 2, list_item)
+            
+            revenue_item = QTableWidgetItem(format_tl(data["revenue"]))
+            revenue_item.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
+            self.sales_table.setItem(row, 3, revenue_item)
+    
+    def create_payments_widget(self) -> QWidget:
+        """Ödeme türü ve hesap bölüşümüne göre tahsilat raporu bölümünü oluştur"""
+        widget = QWidget()
+        layout = QVBoxLayout(widget)
+        
+        filter_layout = QHBoxLayout()
+        
+        today = QDate.currentDate()
+        filter_layout.addWidget(QLabel("Başlangıç:"))
+        self.payments_start_input = QDateEdit(today)
+        self.payments_start_input.setCalendarPopup(True)
+        self.payments_start_input.setDisplayFormat("dd.MM.yyyy")
+        filter_layout.addWidget(self.payments_start_input)
+        
+        filter_layout.addWidget(QLabel("Bitiş:"))
+        self.payments_end_input = QDateEdit(today)
+        self.payments_end_input.setCalendarPopup(True)
+        self.payments_end_input.setDisplayFormat("dd.MM.yyyy")
+        filter_layout.addWidget(self.payments_end_input)
+        
+        btn_show = QPushButton("💳 Göster")
+        btn_show.setMinimumHeight(30)
+        btn_show.setMinimumWidth(100)
+        btn_show.clicked.connect(self.load_payment_breakdown)
+        set_role(btn_show, "accent")
+        filter_layout.addWidget(btn_show)
+        
+        filter_layout.addStretch()
+        layout.addLayout(filter_layout)
+        
+        self.payments_summary_label = QLabel("")
+        self.payments_summary_label.setFont(QFont("Arial", 11, QFont.Bold))
+        layout.addWidget(self.payments_summary_label)
+        
+        self.payments_table = QTableWidget()
+        self.payments_table.setColumnCount(4)
+        self.payments_table.setHorizontalHeaderLabels(["Ödeme Türü", "Bölüşüm", "Ödeme Sayısı", "Tutar"])
+        self.payments_table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
+        self.payments_table.setAlternatingRowColors(True)
+        self.payments_table.setEditTriggers(QTableWidget.NoEditTriggers)
+        layout.addWidget(self.payments_table)
+        
+        return widget
+    
+    def load_payment_breakdown(self):
+        """Seçili aralıkta alınan ödemeleri (açık masaların kısmi ödemeleri dahil) listele"""
+        start = self.payments_start_input.date().toPyDate()
+        end = self.payments_end_input.date().toPyDate()
+        start_date = self.db.calendar.day_start(start)
+        end_date = self.db.calendar.day_start(end + timedelta(days=1))
+        
+        try:
+            rows = self.db.get_payment_breakdown(start_date, end_date)
+        except Exception as e:
+            logger.error(f"Ödeme raporu yüklenirken hata: {e}")
+            QMessageBox.warning(self, "Uyarı", f"Ödeme raporu yüklenemedi:\n{str(e)}")
+            return
+        
+        self.payments_table.setRowCount(len(rows))
+        for row, data in enumerate(rows):
+            self.payments_table.setItem(row, 0, QTableWidgetItem(data["method"]))
+            self.payments_table.setItem(
+                row, 1, QTableWidgetItem(SPLIT_LABELS.get(data["split"], data["split"]))
+            )
+            
+            count_item = QTableWidgetItem(str(data["count"]))
+            count_item.setTextAlignment(Qt.AlignCenter)
+            self.payments_table.setItem(row, 2, count_item)
+            
+            amount_item = QTableWidgetItem(format_tl(data["amount"]))
+            amount_item.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
+            self.payments_table.setItem(row, 3, amount_item)
+        
+        by_method = {}
+        for data in rows:
+            by_method[data["method"]] = by_method.get(data["method"], 0) + data["amount"]
+        summary = f"Toplam tahsilat: {format_tl(sum(by_method.values()))}"
+        for method, amount in by_method.items():
+            summary += f"  |  {method}: {format_tl(amount)}"
+        self.payments_summary_label.setText(summary)
+    
+    def create_turnover_widget(self) -> QWidget:
+        """Masa devri ve oturma süreleri raporu bölümünü oluştur"""
+        widget = QWidget()
+        layout = QVBoxLayout(widget)
+        
+        filter_layout = QHBoxLayout()
+        
+        today = QDate.currentDate()
+        filter_layout.addWidget(QLabel("Başlangıç:"))
+        self.turnover_start_input = QDateEdit(today.addDays(-6))
+        self.turnover_start_input.setCalendarPopup(True)
+        self.turnover_start_input.setDisplayFormat("dd.MM.yyyy")
+        filter_layout.addWidget(self.turnover_start_input)
+        
+        filter_layout.addWidget(QLabel("Bitiş:"))
+        self.turnover_end_input = QDateEdit(today)
+        self.turnover_end_input.setCalendarPopup(True)
+        self.turnover_end_input.setDisplayFormat("dd.MM.yyyy")
+        filter_layout.addWidget(self.turnover_end_input)
+        
+        btn_show = QPushButton("🪑 Göster")
+        btn_show.setMinimumHeight(30)
+        btn_show.setMinimumWidth(100)
+        btn_show.clicked.connect(self.load_table_turnover)
+        set_role(btn_show, "accent")
+        filter_layout.addWidget(btn_show)
+        
+        filter_layout.addStretch()
+        layout.addLayout(filter_layout)
+        
+        self.turnover_summary_label = QLabel("")
+        self.turnover_summary_label.setFont(QFont("Arial", 11, QFont.Bold))
+        layout.addWidget(self.turnover_summary_label)
+        
+        self.turnover_table = QTableWidget()
+        self.turnover_table.setColumnCount(4)
+        self.turnover_table.setHorizontalHeaderLabels(["Masa", "Devir", "Ort. Oturma", "Toplam Doluluk"])
+        self.turnover_table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
+        self.turnover_table.setAlternatingRowColors(True)
+        self.turnover_table.setEditTriggers(QTableWidget.NoEditTriggers)
+        layout.addWidget(self.turnover_table)
+        
+        return widget
+    
+    def load_table_turnover(self):
+        """Seçili iş günlerinde masa devri ve oturma sürelerini, anlık doluluğu göster"""
+        start_day = self.turnover_start_input.date().toPyDate().isoformat()
+        end_day = self.turnover_end_input.date().toPyDate().isoformat()
+        try:
+            report = self.db.get_table_turnover(start_day, end_day)
+            occupancy = self.db.get_occupancy()
+        except Exception as e:
+            logger.error(f"Masa doluluk raporu yüklenirken hata: {e}")
+            QMessageBox.warning(self, "Uyarı", f"Masa doluluk raporu yüklenemedi:\n{str(e)}")
+            return
+        
+        self.turnover_summary_label.setText(
+            f"Şu an: {occupancy['occupied']}/{occupancy['tables']} masa "
+            f"(%{occupancy['rate'] * 100:.0f}), {occupancy['occupied_seats']}/{occupancy['seats']} koltuk"
+            f"  |  Devir: {report['turns']}"
+            f"  |  Masa başına günlük devir: {report['turns_per_table_day']:.2f}"
+            f"  |  Ort. oturma: {format_duration(report['average_seconds'])}"
+        )
+        
+        self.turnover_table.setRowCount(len(report["tables"]))
+        for row, data in enumerate(report["tables"]):
+            self.turnover_table.setItem(row, 0, QTableWidgetItem(f"Masa {data['table_number']}"))
+            values = [
+                str(data["turns"]),
+                format_duration(data["average_seconds"]),
+                format_duration(data["occupied_seconds"])
+            ]
+            for column, value in enumerate(values, start=1):
+                item = QTableWidgetItem(value)
+                item.setTextAlignment(Qt.AlignCenter)
+                self.turnover_table.setItem(row, column, item)
+    
+    def create_z_report_widget(self) -> QWidget:
+        """Gün sonu kapatma ve kayıtlı Z raporlarını gösterme bölümünü oluştur"""
+        widget = QWidget()
+        layout = QVBoxLayout(widget)
+        
+        filter_layout = QHBoxLayout()
+        filter_layout.addWidget(QLabel("İş Günü:"))
+        self.z_day_input = QDateEdit(QDate.currentDate())
+        self.z_day_input.setCalendarPopup(True)
+        self.z_day_input.setDisplayFormat("dd.MM.yyyy")
+        filter_layout.addWidget(self.z_day_input)
+        
+        btn_show = QPushButton("🧾 Göster")
+        btn_show.setMinimumHeight(30)
+        btn_show.setMinimumWidth(100)
+        btn_show.clicked.connect(self.load_z_report)
+        set_role(btn_show, "accent")
+        filter_layout.addWidget(btn_show)
+        
+        btn_close_day = QPushButton("🔒 Günü Kapat")
+        btn_close_day.setMinimumHeight(30)
+        btn_close_day.setMinimumWidth(120)
+        btn_close_day.clicked.connect(self.close_business_day)
+        set_role(btn_close_day, "danger")
+        filter_layout.addWidget(btn_close_day)
+        
+        filter_layout.addStretch()
+        layout.addLayout(filter_layout)
+        
+        self.z_summary_label = QLabel("")
+        self.z_summary_label.setFont(QFont("Arial", 11, QFont.Bold))
+        layout.addWidget(self.z_summary_label)
+        
+        self.z_table = QTableWidget()
+        self.z_table.setColumnCount(3)
+        self.z_table.setHorizontalHeaderLabels(["Kategori / Ürün", "Adet", "Tutar"])
+        self.z_table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
+        self.z_table.setAlternatingRowColors(True)
+        self.z_table.setEditTriggers(QTableWidget.NoEditTriggers)
+        layout.addWidget(self.z_table)
+        
+        return widget
+    
+    def load_z_report(self):
+        """Seçili günün Z raporunu göster (kayıtlı rapor, yeniden hesaplanmaz)"""
+        day = self.z_day_input.date().toPyDate().isoformat()
+        try:
+            report = self.db.get_z_report(day)
+        except Exception as e:
+            logger.error(f"Z raporu yüklenirken hata: {e}")
+            QMessageBox.warning(self, "Uyarı", f"Z raporu yüklenemedi:\n{str(e)}")
+            return
+        self.show_z_report(report, day)
+    
+    def show_z_report(self, report: Optional[Dict], day: str):
+        if not report:
+            self.z_summary_label.setText(f"{day} günü henüz kapatılmadı")
+            self.z_table.setRowCount(0)
+            return
+        
+        summary = (
+            f"{day}  |  {report['orders']} sipariş  |  Ciro: {format_tl(report['revenue'])}"
+            f"  |  Ortalama: {format_tl(report['average'])}"
+        )
+        # Fiyat kurallarıyla liste fiyatına göre verilen indirim (bölge farkları düşülmüş)
+        discount = report.get("list_revenue", report["revenue"]) - report["revenue"]
+        if discount:
+            summary += f"  |  Fiyat kuralı farkı: {format_tl(-discount)}"
+        for method, amount in report["payments"].items():
+            summary += f"  |  {method}: {format_tl(amount)}"
+        if report["open_tables"]:
+            summary += f"  |  Açık masa: {len(report['open_tables'])}"
+        self.z_summary_label.setText(summary)
+        
+        rows = [(c["category"], c["quantity"], c["revenue"], True) for c in report["categories"]]
+        rows += [(f"  {p['name']}", p["quantity"], p["revenue"], False) for p in report["products"]]
+        self.z_table.setRowCount(len(rows))
+        for row, (name, quantity, revenue, bold) in enumerate(rows):
+            name_item = QTableWidgetItem(name)
+            if bold:
+                font = name_item.font()
+                font.setBold(True)
+                name_item.setFont(font)
+            self.z_table.setItem(row, 0, name_item)
+            
+            quantity_item = QTableWidgetItem(str(quantity))
+            quantity_item.setTextAlignment(Qt.AlignCenter)
+            self.z_table.setItem(row, 1, quantity_item)
+            
+            revenue_item = QTableWidgetItem(format_tl(revenue))
+            revenue_item.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
+            self.z_table.setItem(row, 2, revenue_item)
+    
+    def close_business_day(self):
+        """Açık iş gününü kapat ve Z raporunu göster"""
+        reply = QMessageBox.question(
+            self,
+            "Onay",
+            "Açık iş günü kapatılacak ve Z raporu oluşturulacak. "
+            "Sonraki satışlar ertesi güne yazılır. Emin misiniz?",
+            QMessageBox.Yes | QMessageBox.No
+        )
+        if reply != QMessageBox.Yes:
+            return
+        
+        try:
+            try:
+                report = self.db.close_business_day()
+            except ValueError as e:
+                # Açık masa varsa onayla yine de kapatılabilir
+                reply = QMessageBox.question(
+                    self, "Uyarı", f"{e}\n\nYine de kapatılsın mı?",
+                    QMessageBox.Yes | QMessageBox.No
+                )
+                if reply != QMessageBox.Yes:
+                    return
+                report = self.db.close_business_day(force=True)
+        except Exception as e:
+            QMessageBox.critical(self, "Hata", f"Gün kapatılırken hata oluştu:\n{str(e)}")
+            return
+        
+        self.z_day_input.setDate(QDate.fromString(report["_id"], "yyyy-MM-dd"))
+        self.show_z_report(report, report["_id"])
+        self.refresh_reports()
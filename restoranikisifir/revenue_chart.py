@@ -0,0 +1,108 @@
+"""
+Hafif ciro grafiği - tüm noktalar tek bir QPainter geçişinde çizilir
+"""
+from PyQt5.QtWidgets import QWidget
+from PyQt5.QtCore import Qt, QRectF, QPointF
+from PyQt5.QtGui import QPainter, QColor, QPen, QFont, QPolygonF
+from typing import List, Optional
+from theme import COLORS
+
+
+class RevenueChart(QWidget):
+    """Ciro serisi için çubuk grafik (isteğe bağlı karşılaştırma çizgisiyle)"""
+    
+    MARGIN_LEFT = 70
+    MARGIN_RIGHT = 20
+    MARGIN_TOP = 20
+    MARGIN_BOTTOM = 40
+    
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.labels: List[str] = []
+        self.values: List[float] = []
+        self.compare_values: Optional[List[float]] = None
+        self.bar_color = QColor(COLORS["primary"])
+        self.compare_color = QColor(COLORS["warning"])
+        self.setMinimumHeight(250)
+    
+    def set_series(self, labels: List[str], values: List[float],
+                   compare_values: Optional[List[float]] = None):
+        """Grafik verisini ayarla ve yeniden çiz"""
+        self.labels = labels
+        self.values = values
+        self.compare_values = compare_values
+        self.update()
+    
+    def paintEvent(self, event):
+        """Eksenleri, çubukları ve karşılaştırma çizgisini çiz"""
+        painter = QPainter(self)
+        painter.setRenderHint(QPainter.Antialiasing)
+        painter.fillRect(self.rect(), Qt.white)
+        
+        plot = QRectF(
+            self.MARGIN_LEFT,
+            self.MARGIN_TOP,
+            max(1, self.width() - self.MARGIN_LEFT - self.MARGIN_RIGHT),
+            max(1, self.height() - self.MARGIN_TOP - self.MARGIN_BOTTOM)
+        )
+        
+        if not self.values:
+            painter.setPen(QColor(COLORS["muted"]))
+            painter.drawText(self.rect(), Qt.AlignCenter, "Gösterilecek veri yok")
+            return
+        
+        max_value = max(self.values + (self.compare_values or []))
+        max_value = max_value if max_value > 0 else 1.0
+        
+        # Yatay kılavuz çizgileri ve değer etiketleri
+        painter.setFont(QFont("Arial", 8))
+        for step in range(5):
+            ratio = step / 4
+            y = plot.bottom() - ratio * plot.height()
+            painter.setPen(QPen(QColor(COLORS["background"]), 1))
+            painter.drawLine(QPointF(plot.left(), y), QPointF(plot.right(), y))
+            painter.setPen(QColor(COLORS["muted"]))
+            painter.drawText(
+                QRectF(0, y - 8, self.MARGIN_LEFT - 6, 16),
+                Qt.AlignRight | Qt.AlignVCenter,
+                f"{max_value * ratio:,.0f}"
+            )
+        
+        count = len(self.values)
+        slot = plot.width() / count
+        bar_width = max(1.0, slot * 0.7)
+        
+        # Çubuklar
+        painter.setPen(Qt.NoPen)
+        painter.setBrush(self.bar_color)
+        for idx, value in enumerate(self.values):
+            height = value / max_value * plot.height()
+            x = plot.left() + idx * slot + (slot - bar_width) / 2
+            painter.drawRect(QRectF(x, plot.bottom() - height, bar_width, height))
+        
+        # Karşılaştırma dönemi çizgisi
+        if self.compare_values:
+            points = QPolygonF([
+                QPointF(
+                    plot.left() + idx * slot + slot / 2,
+                    plot.bottom() - value / max_value * plot.height()
+                )
+                for idx, value in enumerate(self.compare_values[:count])
+            ])
+            painter.setPen(QPen(self.compare_color, 2))
+            painter.setBrush(Qt.NoBrush)
+            painter.drawPolyline(points)
+        
+        # X ekseni etiketleri (üst üste binmeyecek sıklıkta)
+        painter.setPen(QColor(COLORS["dark"]))
+        label_every = max(1, int(60 / slot) + 1)
+        for idx in range(0, count, label_every):
+            x = plot.left() + idx * slot
+            painter.drawText(
+                QRectF(x - 20, plot.bottom() + 4, slot * label_every + 40, 16),
+                Qt.AlignLeft | Qt.AlignTop,
+                self.labels[idx] if idx < len(self.labels) else ""
+            )
+        
+        painter.setPen(QPen(QColor(COLORS["dark"]), 1))
+        painter.drawLine(plot.bottomLeft(), plot.bottomRight())
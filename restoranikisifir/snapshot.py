@@ -0,0 +1,219 @@
+"""
+Terminal anlık görüntüsü - masa planının, adisyon toplamlarının ve ürün kataloğunun yerel kopyası
+
+Terminal yeniden başladığında masa planı önce bu dosyadan çizilir, ardından
+MongoDB ile arka planda sürüm karşılaştırılarak uzlaştırılır: sadece sürümü
+değişen masalar sadece plan alanlarıyla (adisyon kalemleri olmadan) ve
+katalog sürümü değiştiyse ürünler yeniden çekilir.
+Böylece açılıştan kullanılabilir ekrana kadar geçen süre veritabanı
+gecikmesinden bağımsızdır.
+
+Dosya pickle biçimindedir ve sadece bu terminal tarafından yazılır; biçim
+sürümü, veritabanı adı veya şema sürümü uyuşmayan dosya yok sayılır.
+"""
+from typing import Dict, List, Optional, Tuple
+import logging
+import os
+import pickle
+import time
+from database import DEFAULT_ZONE, SCHEMA_VERSION
+
+logger = logging.getLogger(__name__)
+
+# Dosya biçimi sürümü (içerik yapısı değişirse artırılır)
+SNAPSHOT_FORMAT = 3
+# Masa planı çizimi için saklanan masa alanları (bkz. TABLE_LAYOUT_PROJECTION)
+SNAPSHOT_TABLE_FIELDS = (
+    "table_number", "status", "zone", "x", "y", "capacity", "version",
+    "opened_at", "order_id", "paid_total", "total", "item_count"
+)
+
+
+class TerminalSnapshot:
+    """Masa planı ve ürün kataloğunun sürümlü yerel kopyası"""
+    
+    def __init__(self, path: Optional[str] = None, db_name: str = "restoran_db"):
+        """
+        Args:
+            path: Anlık görüntü dosyası; verilmezse sadece bellekte tutulur
+            db_name: Anlık görüntünün ait olduğu veritabanı
+        """
+        self.path = path
+        self.db_name = db_name
+        self.tables: Dict[int, Dict] = {}
+        self.catalog: Dict[str, List[Dict]] = {}
+        self.catalog_version: Optional[int] = None
+        # Stoğu takip edilen ürünler: ürün _id -> stok adedi
+        self.stock: Dict = {}
+        self.schema_version: Optional[int] = None
+        self.saved_at: Optional[float] = None
+        self._load()
+    
+    @classmethod
+    def from_env(cls) -> "TerminalSnapshot":
+        """
+        RESTORAN_SNAPSHOT dosyasını kullan (varsayılan ~/.restoran/<db>.snapshot)
+        
+        RESTORAN_SNAPSHOT=0 ise anlık görüntü dosyaya yazılmaz.
+        """
+        db_name = os.environ.get("RESTORAN_DB", "restoran_db")
+        path = os.environ.get("RESTORAN_SNAPSHOT")
+        if path is None:
+            path = os.path.join(os.path.expanduser("~"), ".restoran", f"{db_name}.snapshot")
+        elif path in ("", "0"):
+            path = None
+        return cls(path, db_name)
+    
+    @property
+    def is_current(self) -> bool:
+        """Dosyadan yüklendi ve veritabanının güncel şemasıyla yazıldı mı"""
+        return self.saved_at is not None and self.schema_version == SCHEMA_VERSION
+    
+    def zones(self) -> List[str]:
+        """Masası bulunan bölgeler (ada göre sıralı; hiç yoksa varsayılan bölge)"""
+        zones = {table.get("zone") for table in self.tables.values() if table.get("zone")}
+        return sorted(zones) or [DEFAULT_ZONE]
+    
+    def zone_tables(self, zone: str) -> List[Dict]:
+        """Bölgenin masalarını plan için konum, durum ve adisyon toplamıyla getir"""
+        return [
+            dict(self.tables[number]) for number in sorted(self.tables)
+            if self.tables[number].get("zone", DEFAULT_ZONE) == zone
+        ]
+    
+    def occupancy(self) -> Tuple[int, int]:
+        """(dolu masa sayısı, toplam masa sayısı)"""
+        occupied = sum(1 for table in self.tables.values() if table.get("status") == "Dolu")
+        return occupied, len(self.tables)
+    
+    def stock_level(self, product: Dict) -> Optional[int]:
+        """Ürünün bilinen son stok adedi (takip edilmiyorsa None)"""
+        return self.stock.get(product.get("_id"), product.get("stock"))
+    
+    def low_stock_products(self) -> List[Dict]:
+        """Stoğu uyarı eşiğine inmiş katalog ürünleri (stok adedi güncel değerle)"""
+        low = []
+        for products in self.catalog.values():
+            for product in products:
+                level = self.stock_level(product)
+                if level is not None and level <= product.get("low_stock", 0):
+                    low.append(dict(product, stock=level))
+        return sorted(low, key=lambda product: product["stock"])
+    
+    def known_versions(self) -> Dict[int, int]:
+        """Masa numarası -> anlık görüntüdeki sürüm"""
+        return {number: table.get("version", 0) for number, table in self.tables.items()}
+    
+    def update_table(self, table_number: int, **fields):
+        """Bu terminalde yapılan değişikliği uzlaştırmayı beklemeden yansıt"""
+        if table_number in self.tables:
+            self.tables[table_number].update(fields)
+    
+    def apply(self, changes: Dict) -> bool:
+        """
+        fetch_changes sonucunu uygula
+        
+        Returns:
+            Masa planı veya katalog değiştiyse True
+        """
+        changed = False
+        for number in changes.get("removed", []):
+            changed = self.tables.pop(number, None) is not None or changed
+        for table in changes.get("tables", []):
+            self.tables[table["table_number"]] = {
+                field: table.get(field) for field in SNAPSHOT_TABLE_FIELDS
+            }
+            changed = True
+        if changes.get("catalog") is not None:
+            self.catalog = changes["catalog"]
+            changed = True
+        self.catalog_version = changes.get("catalog_version", self.catalog_version)
+        if changes.get("stock") is not None and changes["stock"] != self.stock:
+            self.stock = changes["stock"]
+            changed = True
+        return changed
+    
+    def _load(self):
+        """Anlık görüntüyü dosyadan yükle (uyumsuz veya bozuk dosya yok sayılır)"""
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "rb") as f:
+                data = pickle.load(f)
+            if data.get("format") != SNAPSHOT_FORMAT or data.get("db_name") != self.db_name:
+                logger.info("Anlık görüntü bu sürüme/veritabanına ait değil, yok sayılıyor")
+                return
+            self.tables = data["tables"]
+            self.catalog = data["catalog"]
+            self.catalog_version = data["catalog_version"]
+            self.stock = data["stock"]
+            self.schema_version = data["schema_version"]
+            self.saved_at = data["saved_at"]
+            logger.info(
+                f"Anlık görüntü yüklendi: {len(self.tables)} masa, "
+                f"{time.time() - self.saved_at:.0f} sn önce yazılmış"
+            )
+        except (OSError, pickle.UnpicklingError, AttributeError, EOFError,
+                ImportError, KeyError, TypeError) as e:
+            logger.warning(f"Anlık görüntü okunamadı, yok sayılıyor: {e}")
+            self.tables = {}
+            self.catalog = {}
+            self.catalog_version = None
+            self.stock = {}
+    
+    def save(self):
+        """Anlık görüntüyü dosyaya atomik olarak yaz"""
+        if not self.path:
+            return
+        self.saved_at = time.time()
+        self.schema_version = SCHEMA_VERSION
+        tmp_path = f"{self.path}.tmp"
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            with open(tmp_path, "wb") as f:
+                pickle.dump({
+                    "format": SNAPSHOT_FORMAT,
+                    "db_name": self.db_name,
+                    "schema_version": self.schema_version,
+                    "saved_at": self.saved_at,
+                    "tables": self.tables,
+                    "catalog": self.catalog,
+                    "catalog_version": self.catalog_version,
+                    "stock": self.stock,
+                }, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, self.path)
+        except (OSError, pickle.PicklingError) as e:
+            logger.warning(f"Anlık görüntü yazılamadı: {e}")
+
+
+def fetch_changes(db, known_versions: Dict[int, int], catalog_version: Optional[int]) -> Dict:
+    """
+    Veritabanını anlık görüntüyle sürüm üzerinden karşılaştır (arka plan iş parçacığında)
+    
+    Args:
+        db: Database
+        known_versions: Anlık görüntüdeki masa sürümleri
+        catalog_version: Anlık görüntüdeki katalog sürümü
+    
+    Returns:
+        {"tables": [değişen masalar], "removed": [silinen masa numaraları],
+         "catalog": kategorize ürünler veya None, "catalog_version": int,
+         "stock": ürün _id -> stok adedi}
+    """
+    versions = db.get_table_versions()
+    changed = [number for number, version in versions.items() if known_versions.get(number) != version]
+    removed = [number for number in known_versions if number not in versions]
+    
+    current_catalog = db.get_catalog_version()
+    catalog = None
+    if current_catalog != catalog_version:
+        catalog = db.get_products_by_category()
+    
+    return {
+        "tables": db.get_table_layouts(changed) if changed else [],
+        "removed": removed,
+        "catalog": catalog,
+        "catalog_version": current_catalog,
+        # Stok her kapatmada değişir; takip edilen ürünlerin sadece adedi çekilir
+        "stock": db.get_stock_levels(),
+    }
@@ -0,0 +1,204 @@
+"""
+Uygulama teması - tek seferde uygulanan ortak stil sayfası
+
+Widget'lar renk yerine rol/durum dinamik özellikleri taşır, stiller
+uygulama genelinde bir kez derlenen stil sayfasındaki seçicilerle eşleşir:
+
+    set_role(button, "primary")                ->  QPushButton[role="primary"]
+    set_role(card, "ticket", status="Yeni")    ->  QFrame[role="ticket"][status="Yeni"]
+
+Böylece döngülerde oluşturulan widget'lar için stil metni yeniden ayrıştırılmaz.
+"""
+from functools import lru_cache
+
+# Renk paleti
+COLORS = {
+    "primary": "#3498db",
+    "success": "#27ae60",
+    "danger": "#e74c3c",
+    "neutral": "#95a5a6",
+    "accent": "#9b59b6",
+    "warning": "#e67e22",
+    "info": "#1abc9c",
+    "export": "#16a085",
+    "dark": "#2c3e50",
+    "sidebar": "#34495e",
+    "background": "#ecf0f1",
+    "border": "#bdc3c7",
+    "muted": "#7f8c8d",
+}
+
+# Dolgu rengiyle çizilen butonların rolleri
+BUTTON_ROLES = ("primary", "success", "danger", "neutral", "accent", "export")
+# Özet kartlarının vurgu renkleri
+CARD_ACCENTS = ("primary", "success", "accent", "warning", "info", "danger")
+# Mutfak fişi durumlarına göre kenar rengi
+TICKET_STATUS_COLORS = {
+    "Yeni": COLORS["warning"],
+    "Hazırlanıyor": COLORS["primary"],
+}
+
+
+def darken_color(color: str, factor: float = 0.9) -> str:
+    """#rrggbb rengini her kanalı factor ile çarparak koyulaştır"""
+    value = color.lstrip("#")
+    channels = [int(value[i:i + 2], 16) for i in (0, 2, 4)]
+    return "#" + "".join(f"{max(0, min(255, round(c * factor))):02x}" for c in channels)
+
+
+# Masa planında çizilen masaların (dolgu, kenar/hover) renkleri
+STATUS_COLORS = {
+    "Boş": (COLORS["success"], darken_color(COLORS["success"])),
+    "Dolu": (COLORS["danger"], darken_color(COLORS["danger"])),
+}
+
+
+def set_role(widget, role: str, **properties):
+    """Widget'a stil rolü (ve isteğe bağlı ek özellikler) ata"""
+    widget.setProperty("role", role)
+    for name, value in properties.items():
+        widget.setProperty(name, value)
+    return widget
+
+
+@lru_cache(maxsize=1)
+def build_stylesheet() -> str:
+    """Uygulama stil sayfasını oluştur (bir kez)"""
+    c = COLORS
+    rules = [f"""
+        QMainWindow {{
+            background-color: {c["background"]};
+        }}
+        QPushButton[role] {{
+            color: white;
+            border: none;
+            border-radius: 5px;
+            font-size: 14px;
+            font-weight: bold;
+        }}
+        QWidget#sidebar {{
+            background-color: {c["dark"]};
+        }}
+        QLabel[role="sidebar-title"] {{
+            color: white;
+            padding: 10px;
+        }}
+        QPushButton[role="menu"] {{
+            background-color: {c["sidebar"]};
+            padding: 10px;
+            text-align: left;
+            font-weight: normal;
+        }}
+        QPushButton[role="menu"]:hover {{
+            background-color: {c["primary"]};
+        }}
+        QPushButton[role="menu"]:pressed {{
+            background-color: {darken_color(c["primary"])};
+        }}
+        QPushButton[role="product"] {{
+            background-color: {c["background"]};
+            color: black;
+            border: 1px solid {c["border"]};
+            font-size: 10pt;
+            font-weight: normal;
+            text-align: center;
+            padding: 5px;
+        }}
+        QPushButton[role="product"]:hover {{
+            background-color: {c["primary"]};
+            color: white;
+        }}
+        QPushButton[role="product"]:disabled {{
+            background-color: {c["border"]};
+            color: {c["muted"]};
+        }}
+        QLabel[role="total"] {{
+            color: {c["success"]};
+            padding: 10px;
+        }}
+        QGroupBox[role="card"] {{
+            border: 2px solid {c["border"]};
+            border-radius: 10px;
+            background-color: white;
+            font-size: 14px;
+        }}
+        QGroupBox[role="card"]::title {{
+            subcontrol-origin: margin;
+            left: 10px;
+            padding: 0 5px;
+        }}
+        QLabel[role="card-value"] {{
+            padding: 10px;
+        }}
+        QFrame[role="ticket"] {{
+            background-color: white;
+            border: 3px solid {c["border"]};
+            border-radius: 8px;
+        }}
+        QLabel[role="ticket-status"] {{
+            font-weight: bold;
+        }}
+        QLabel[role="alert"] {{
+            color: {c["danger"]};
+            font-weight: bold;
+        }}
+        QLabel[role="overlay"] {{
+            background-color: rgba(44, 62, 80, 210);
+            color: white;
+            font-family: monospace;
+            font-size: 11px;
+            padding: 6px;
+            border-radius: 4px;
+        }}
+    """]
+    
+    for role in BUTTON_ROLES:
+        color = c[role]
+        rules.append(f"""
+        QPushButton[role="{role}"] {{
+            background-color: {color};
+        }}
+        QPushButton[role="{role}"]:hover {{
+            background-color: {darken_color(color)};
+        }}
+        QPushButton[role="{role}"]:pressed {{
+            background-color: {darken_color(color, 0.8)};
+        }}
+        QPushButton[role="{role}"]:disabled {{
+            background-color: {c["border"]};
+        }}
+        QDialog QPushButton[role="{role}"] {{
+            font-size: 12px;
+            padding: 8px 20px;
+        }}
+        """)
+    
+    for accent in CARD_ACCENTS:
+        color = c[accent]
+        rules.append(f"""
+        QGroupBox[role="card"][accent="{accent}"] {{
+            border-color: {color};
+        }}
+        QGroupBox[role="card"][accent="{accent}"]::title,
+        QLabel[role="card-value"][accent="{accent}"] {{
+            color: {color};
+        }}
+        """)
+    
+    for status, color in TICKET_STATUS_COLORS.items():
+        rules.append(f"""
+        QFrame[role="ticket"][status="{status}"] {{
+            border-color: {color};
+        }}
+        QLabel[role="ticket-status"][status="{status}"] {{
+            color: {color};
+        }}
+        """)
+    
+    return "".join(rules)
+
+
+def apply_theme(app):
+    """Stil sayfasını uygulamaya bir kez uygula"""
+    app.setStyle('Fusion')
+    app.setStyleSheet(build_stylesheet())